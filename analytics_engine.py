@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Mesin analitik DuckDB (opsional) untuk halaman Laporan.
+
+Tabel yang dibaca laporan (invoice, item, produk, customer) disalin ke file
+DuckDB ``<db>_analytics.duckdb`` dalam format kolom, lalu ringkasan
+penjualan, analisis produk, umur piutang, dan proyeksi arus kas dihitung
+oleh eksekusi tervektorisasi DuckDB alih-alih scan baris SQLite.
+
+Salinan diperbarui secara inkremental sebelum setiap query: invoice dan item
+baru cukup ditambahkan (berdasarkan ID). Hanya bila kolom yang dipakai
+laporan diubah atau baris dihapus (ubah status, arsip, hitung ulang) tabel
+yang bersangkutan disalin ulang. Perubahan dideteksi dari ``table_versions``.
+
+Aktifkan dengan ``pip install duckdb`` dan ``INVOICE_ANALYTICS_ENGINE=duckdb``;
+tanpa itu laporan tetap memakai SQLite.
+
+Jalankan:  python analytics_engine.py refresh [--full]
+           python analytics_engine.py benchmark --items 10000000
+"""
+
+import argparse
+import importlib.util
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import query_metrics
+from database import OUTSTANDING_STATUSES, Database, merge_sales_summaries
+
+ANALYTICS_ENGINE = os.environ.get('INVOICE_ANALYTICS_ENGINE', 'sqlite')
+
+# Rows copied from SQLite per batch, bounding memory during a full copy
+MIRROR_BATCH_ROWS = 200000
+
+# Bump when the mirror tables change; an older mirror file is rebuilt
+MIRROR_SCHEMA_VERSION = 1
+
+MIRROR_TABLES = {
+    'invoices': '''
+        id BIGINT, customer_id BIGINT, issue_date DATE, due_date DATE, status VARCHAR,
+        subtotal BIGINT, tax_amount BIGINT, total BIGINT
+    ''',
+    'invoice_items': '''
+        id BIGINT, invoice_id BIGINT, product_id BIGINT, product_name VARCHAR,
+        quantity BIGINT, total_price BIGINT
+    ''',
+    'products': 'id BIGINT, name VARCHAR',
+    'customers': 'id BIGINT, name VARCHAR',
+}
+
+# Source query and the cast applied to each copied batch
+MIRROR_SOURCES = {
+    'invoices': (
+        "SELECT id, customer_id, issue_date, due_date, status, subtotal, tax_amount, total FROM invoices",
+        '''SELECT id, customer_id, TRY_CAST(LEFT(issue_date, 10) AS DATE), TRY_CAST(LEFT(due_date, 10) AS DATE),
+                  status, subtotal, tax_amount, total FROM batch'''
+    ),
+    'invoice_items': (
+        "SELECT id, invoice_id, product_id, product_name, quantity, total_price FROM invoice_items",
+        '''SELECT id, invoice_id, CAST(product_id AS BIGINT), product_name, quantity, total_price FROM batch'''
+    ),
+    'products': ("SELECT id, name FROM products", "SELECT id, name FROM batch"),
+    'customers': ("SELECT id, name FROM customers", "SELECT id, name FROM batch"),
+}
+
+
+def duckdb_available():
+    return importlib.util.find_spec('duckdb') is not None
+
+
+def default_mirror_path(db_name):
+    return os.path.splitext(db_name)[0] + "_analytics.duckdb"
+
+
+class DuckDBAnalytics:
+    """Report queries of ``Database`` answered from an incrementally refreshed DuckDB mirror"""
+
+    def __init__(self, db, path=None):
+        import duckdb
+
+        self.db = db
+        self.path = path or default_mirror_path(db.db_name)
+        self.conn = duckdb.connect(self.path)
+        self._lock = threading.Lock()
+        self.last_refresh = None
+
+        self.conn.execute("CREATE TABLE IF NOT EXISTS mirror_state (name VARCHAR PRIMARY KEY, value BIGINT)")
+        if self._state().get('schema') != MIRROR_SCHEMA_VERSION:
+            for table in MIRROR_TABLES:
+                self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self.conn.execute("DELETE FROM mirror_state")
+        for table, columns in MIRROR_TABLES.items():
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+
+    # Mirror maintenance ---------------------------------------------------
+
+    def _state(self):
+        return dict(self.conn.execute("SELECT name, value FROM mirror_state").fetchall())
+
+    def _copy(self, source, table, where="", params=()):
+        """Stream rows from SQLite into a mirror table in bounded batches; returns the row count"""
+        select, cast = MIRROR_SOURCES[table]
+        cursor = source.cursor()
+        cursor.execute(f"{select} {where} ORDER BY id", params)
+        columns = [column[0] for column in cursor.description]
+        copied = 0
+        while True:
+            rows = cursor.fetchmany(MIRROR_BATCH_ROWS)
+            if not rows:
+                break
+            self.conn.register('batch', pd.DataFrame(rows, columns=columns))
+            try:
+                self.conn.execute(f"INSERT INTO {table} {cast}")
+            finally:
+                self.conn.unregister('batch')
+            copied += len(rows)
+        cursor.close()
+        return copied
+
+    def _reload(self, source, table):
+        self.conn.execute(f"DELETE FROM {table}")
+        return self._copy(source, table)
+
+    def _append(self, source, table, state):
+        max_id = state.get(f"{table}_max_id", 0)
+        return self._copy(source, table, "WHERE id > ?", (max_id,))
+
+    def refresh(self, full=False):
+        """Bring the mirror up to date with SQLite; returns what was copied"""
+        with self._lock:
+            started = time.perf_counter()
+            # One read snapshot, so invoices and items are copied from the same point in time
+            source = query_metrics.connect(self.db.db_name, 'analytics_refresh', readonly=True)
+            source.begin_snapshot()
+            try:
+                cursor = source.cursor()
+                cursor.execute("SELECT table_name, version FROM table_versions")
+                # Only the counters of the mirrored tables; e.g. company settings do not matter here
+                versions = {name: version for name, version in cursor.fetchall()
+                            if name.removesuffix('_modified') in MIRROR_TABLES}
+                cursor.close()
+
+                state = self._state()
+                # Counters going backwards mean the database was restored from a backup
+                full = full or any(version < state.get(f"{name}_version", 0) for name, version in versions.items())
+                if not full and all(state.get(f"{name}_version") == version for name, version in versions.items()):
+                    return {'mode': 'current', 'rows': 0, 'seconds': time.perf_counter() - started}
+
+                def changed(name):
+                    return full or state.get(f"{name}_version") != versions.get(name)
+
+                reload_items = full or 'invoice_items_max_id' not in state or changed('invoice_items_modified')
+                reload_invoices = reload_items or 'invoices_max_id' not in state or changed('invoices_modified')
+
+                self.conn.execute("BEGIN TRANSACTION")
+                try:
+                    rows = 0
+                    if reload_invoices:
+                        rows += self._reload(source, 'invoices')
+                    elif changed('invoices'):
+                        rows += self._append(source, 'invoices', state)
+                    if reload_items:
+                        rows += self._reload(source, 'invoice_items')
+                    else:
+                        if reload_invoices:
+                            # Items of deleted (archived) invoices
+                            self.conn.execute(
+                                "DELETE FROM invoice_items WHERE invoice_id NOT IN (SELECT id FROM invoices)"
+                            )
+                        if changed('invoices'):
+                            rows += self._append(source, 'invoice_items', state)
+                    for table in ('products', 'customers'):
+                        if changed(table):
+                            rows += self._reload(source, table)
+
+                    new_state = {f"{name}_version": version for name, version in versions.items()}
+                    new_state['schema'] = MIRROR_SCHEMA_VERSION
+                    for table in ('invoices', 'invoice_items'):
+                        new_state[f"{table}_max_id"] = self.conn.execute(
+                            f"SELECT COALESCE(MAX(id), 0) FROM {table}"
+                        ).fetchone()[0]
+                    self.conn.execute("DELETE FROM mirror_state")
+                    self.conn.executemany("INSERT INTO mirror_state VALUES (?, ?)", list(new_state.items()))
+                    self.conn.execute("COMMIT")
+                except Exception:
+                    self.conn.execute("ROLLBACK")
+                    raise
+            finally:
+                source.close()
+
+            self.last_refresh = {
+                'mode': 'full' if reload_items else 'invoices' if reload_invoices else 'append',
+                'rows': rows,
+                'seconds': time.perf_counter() - started
+            }
+            return self.last_refresh
+
+    def _query(self, query, params=()):
+        self.refresh()
+        with self._lock:
+            return self.conn.execute(query, params).df()
+
+    # Report queries, same results as the Database methods -----------------
+
+    def get_sales_summary(self, start_date=None, end_date=None):
+        """Daily invoice count, sales and tax; archived invoices still come from SQLite"""
+        query = '''
+            SELECT
+                strftime(issue_date, '%Y-%m-%d') as date,
+                COUNT(*) as invoice_count,
+                SUM(total)::BIGINT as total_sales,
+                SUM(tax_amount)::BIGINT as total_tax
+            FROM invoices
+            WHERE 1=1
+        '''
+        params = []
+        if start_date:
+            query += " AND issue_date >= ?::DATE"
+            params.append(str(start_date))
+        if end_date:
+            query += " AND issue_date <= ?::DATE"
+            params.append(str(end_date))
+        query += " GROUP BY ALL ORDER BY date DESC"
+
+        df = self._query(query, params)
+        archived_df = self.db.get_archived_sales_summary(start_date, end_date)
+        if archived_df is not None:
+            df = merge_sales_summaries([df, archived_df])
+        return df
+
+    def get_product_sales(self, start_date=None, end_date=None):
+        """Revenue, quantity, invoice count and average price per product, best sellers first"""
+        query = '''
+            SELECT
+                s.product_id,
+                COALESCE(p.name, s.product_name) as product_name,
+                s.revenue,
+                s.quantity,
+                s.invoice_count,
+                CAST(ROUND(1.0 * s.revenue / s.quantity) AS BIGINT) as avg_price
+            FROM (
+                SELECT
+                    ii.product_id,
+                    MIN(ii.product_name) as product_name,
+                    SUM(ii.total_price)::BIGINT as revenue,
+                    SUM(ii.quantity)::BIGINT as quantity,
+                    COUNT(DISTINCT ii.invoice_id) as invoice_count
+                FROM invoices i
+                JOIN invoice_items ii ON ii.invoice_id = i.id
+                WHERE 1=1
+        '''
+        params = []
+        if start_date:
+            query += " AND i.issue_date >= ?::DATE"
+            params.append(str(start_date))
+        if end_date:
+            query += " AND i.issue_date <= ?::DATE"
+            params.append(str(end_date))
+        query += '''
+                GROUP BY ii.product_id, CASE WHEN ii.product_id IS NULL THEN ii.product_name END
+            ) s
+            LEFT JOIN products p ON p.id = s.product_id
+            ORDER BY s.revenue DESC, product_name
+        '''
+        return self._query(query, params)
+
+    def get_product_sales_by_month(self, start_date=None, end_date=None, product_ids=None):
+        """Monthly revenue and quantity per product, optionally only for some product IDs"""
+        query = '''
+            SELECT
+                strftime(i.issue_date, '%Y-%m') as month,
+                ii.product_id,
+                ANY_VALUE(COALESCE(p.name, ii.product_name)) as product_name,
+                SUM(ii.total_price)::BIGINT as revenue,
+                SUM(ii.quantity)::BIGINT as quantity
+            FROM invoices i
+            JOIN invoice_items ii ON ii.invoice_id = i.id
+            LEFT JOIN products p ON p.id = ii.product_id
+            WHERE 1=1
+        '''
+        params = []
+        if start_date:
+            query += " AND i.issue_date >= ?::DATE"
+            params.append(str(start_date))
+        if end_date:
+            query += " AND i.issue_date <= ?::DATE"
+            params.append(str(end_date))
+        if product_ids is not None:
+            query += f" AND ii.product_id IN ({', '.join('?' * len(product_ids))})"
+            params.extend(int(product_id) for product_id in product_ids)
+        query += '''
+            GROUP BY month, ii.product_id, CASE WHEN ii.product_id IS NULL THEN ii.product_name END
+            ORDER BY month, revenue DESC
+        '''
+        return self._query(query, params)
+
+    def get_receivables_aging(self, as_of=None):
+        """Outstanding amounts per customer in aging buckets (days past due as of ``as_of``)"""
+        as_of = str(as_of or datetime.now().date())
+        query = f'''
+            SELECT
+                o.customer_id,
+                c.name as customer_name,
+                COUNT(*) as invoice_count,
+                SUM(CASE WHEN o.days_overdue <= 0 THEN o.total ELSE 0 END)::BIGINT as current,
+                SUM(CASE WHEN o.days_overdue BETWEEN 1 AND 30 THEN o.total ELSE 0 END)::BIGINT as overdue_1_30,
+                SUM(CASE WHEN o.days_overdue BETWEEN 31 AND 60 THEN o.total ELSE 0 END)::BIGINT as overdue_31_60,
+                SUM(CASE WHEN o.days_overdue BETWEEN 61 AND 90 THEN o.total ELSE 0 END)::BIGINT as overdue_61_90,
+                SUM(CASE WHEN o.days_overdue > 90 THEN o.total ELSE 0 END)::BIGINT as overdue_90_plus,
+                SUM(o.total)::BIGINT as total_outstanding
+            FROM (
+                SELECT
+                    customer_id,
+                    total,
+                    COALESCE(date_diff('day', due_date, ?::DATE), 0) as days_overdue
+                FROM invoices
+                WHERE status IN ({', '.join('?' * len(OUTSTANDING_STATUSES))})
+            ) o
+            LEFT JOIN customers c ON c.id = o.customer_id
+            GROUP BY o.customer_id, c.name
+            ORDER BY total_outstanding DESC
+        '''
+        return self._query(query, [as_of, *OUTSTANDING_STATUSES])
+
+    def get_cash_flow_forecast(self, weeks=12, as_of=None):
+        """Outstanding amounts falling due per week (weeks start on Monday) from ``as_of``"""
+        as_of = str(as_of or datetime.now().date())
+        query = f'''
+            SELECT
+                strftime(date_trunc('week', due_date), '%Y-%m-%d') as week_start,
+                COUNT(*) as invoice_count,
+                SUM(total)::BIGINT as amount_due
+            FROM invoices
+            WHERE status IN ({', '.join('?' * len(OUTSTANDING_STATUSES))})
+              AND due_date >= ?::DATE AND due_date < ?::DATE + ?::INTEGER
+            GROUP BY week_start
+            ORDER BY week_start
+        '''
+        return self._query(query, [*OUTSTANDING_STATUSES, as_of, as_of, int(weeks) * 7])
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def open_analytics(db, engine=ANALYTICS_ENGINE):
+    """The DuckDB mirror when requested and installed, otherwise ``db`` itself.
+
+    Both answer ``get_sales_summary``, ``get_product_sales``,
+    ``get_product_sales_by_month``, ``get_receivables_aging`` and
+    ``get_cash_flow_forecast`` with the same columns.
+    """
+    if engine != 'duckdb' or not duckdb_available():
+        return db
+    import duckdb
+
+    try:
+        return DuckDBAnalytics(db)
+    except duckdb.IOException:
+        # Mirror file held by another process
+        return db
+
+
+def generate_benchmark_data(db_name, items=10_000_000, items_per_invoice=10, products=500, customers=20000):
+    """Fill a new database with synthetic invoices for benchmarking"""
+    db = Database(db_name)
+    invoices = items // items_per_invoice
+    statuses = ('Draft', 'Sent', 'Paid', 'Paid', 'Cancelled')
+    conn = sqlite3.connect(db_name)
+    conn.executemany("INSERT INTO products (name, price) VALUES (?, ?)",
+                     ((f"Produk {number}", 1000 + number) for number in range(products)))
+    conn.executemany("INSERT INTO customers (name) VALUES (?)",
+                     ((f"Customer {number}",) for number in range(customers)))
+
+    def invoice_rows():
+        for invoice_id in range(1, invoices + 1):
+            issue_date = f"{2020 + invoice_id * 6 // (invoices + 1)}-{1 + invoice_id % 12:02d}-{1 + invoice_id % 28:02d}"
+            yield (invoice_id, f"INV-{invoice_id:08d}", 1 + invoice_id % customers, issue_date, issue_date,
+                   100000, 0.11, 11000, 111000, statuses[invoice_id % len(statuses)])
+
+    def item_rows():
+        for invoice_id in range(1, invoices + 1):
+            for line in range(items_per_invoice):
+                product = (invoice_id * 7 + line * 13) % products
+                quantity = 1 + (invoice_id + line) % 5
+                # The last few products are manual (unlinked) lines
+                product_id = product + 1 if product < products - 20 else None
+                yield (invoice_id, f"Produk {product}", quantity, 1000 + product, quantity * (1000 + product), product_id)
+
+    conn.executemany('''
+        INSERT INTO invoices (id, invoice_number, customer_id, issue_date, due_date,
+                              subtotal, tax_rate, tax_amount, total, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', invoice_rows())
+    conn.executemany('''
+        INSERT INTO invoice_items (invoice_id, product_name, quantity, unit_price, total_price, product_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', item_rows())
+    conn.commit()
+    conn.close()
+    return db
+
+
+def run_benchmark(db_name, items=10_000_000, repeat=3):
+    """Seconds per report query on SQLite and on the DuckDB mirror, plus mirror refresh costs"""
+    if not os.path.exists(db_name):
+        generate_benchmark_data(db_name, items)
+    db = Database(db_name)
+    mirror_path = default_mirror_path(db_name)
+
+    results = []
+    started = time.perf_counter()
+    analytics = DuckDBAnalytics(db, mirror_path)
+    refresh = analytics.refresh()
+    results.append({'step': f"mirror: salin awal ({refresh['mode']})",
+                    'sqlite_seconds': None, 'duckdb_seconds': time.perf_counter() - started})
+
+    queries = {
+        'get_sales_summary': lambda engine: engine.get_sales_summary('2021-01-01', '2025-12-31'),
+        'get_product_sales': lambda engine: engine.get_product_sales('2021-01-01', '2025-12-31'),
+        'get_product_sales_by_month': lambda engine: engine.get_product_sales_by_month('2021-01-01', '2025-12-31',
+                                                                                      [1, 2, 3, 4, 5]),
+        'get_receivables_aging': lambda engine: engine.get_receivables_aging('2026-01-01'),
+        'get_cash_flow_forecast': lambda engine: engine.get_cash_flow_forecast(12, '2025-06-01'),
+    }
+    for name, query in queries.items():
+        timings = {}
+        for label, engine in (('sqlite', db), ('duckdb', analytics)):
+            best = float('inf')
+            for _ in range(repeat):
+                started = time.perf_counter()
+                query(engine)
+                best = min(best, time.perf_counter() - started)
+            timings[label] = best
+        results.append({'step': name, 'sqlite_seconds': timings['sqlite'], 'duckdb_seconds': timings['duckdb']})
+
+    customer_id = db.add_customer("Benchmark")
+    db.create_invoice(customer_id, [{'product_name': 'Produk 1', 'quantity': 1, 'unit_price': 1001}],
+                      '2025-06-01', '2025-07-01')
+    refresh = analytics.refresh()
+    results.append({'step': f"mirror: 1 invoice baru ({refresh['mode']})",
+                    'sqlite_seconds': None, 'duckdb_seconds': refresh['seconds']})
+    analytics.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesin analitik DuckDB untuk laporan")
+    parser.add_argument('--db', default="invoice_system.db", help="Path database SQLite")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    refresh_parser = subparsers.add_parser('refresh', help="Perbarui salinan DuckDB")
+    refresh_parser.add_argument('--full', action='store_true', help="Salin ulang semua tabel")
+    benchmark_parser = subparsers.add_parser('benchmark', help="Bandingkan waktu query SQLite dan DuckDB")
+    benchmark_parser.add_argument('--items', type=int, default=10_000_000,
+                                  help="Jumlah item bila database benchmark belum ada")
+    args = parser.parse_args()
+
+    if not duckdb_available():
+        parser.error("duckdb belum terpasang: pip install duckdb")
+
+    if args.command == 'refresh':
+        analytics = DuckDBAnalytics(Database(args.db))
+        result = analytics.refresh(full=args.full)
+        analytics.close()
+        print(f"✅ Mirror diperbarui ({result['mode']}): {result['rows']:,} baris dalam {result['seconds']:.2f} detik")
+        return
+
+    print(f"{'langkah':<38} {'SQLite':>9} {'DuckDB':>9}")
+    for row in run_benchmark(args.db, args.items):
+        sqlite_seconds = f"{row['sqlite_seconds']:.3f}" if row['sqlite_seconds'] is not None else '-'
+        print(f"{row['step']:<38} {sqlite_seconds:>9} {row['duckdb_seconds']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+HTTP API lokal (asyncio) untuk integrasi ERP.
+
+Endpoint:
+    POST /invoices              - buat invoice baru (JSON, lihat di bawah)
+    GET  /invoices?page=&per_page= - daftar invoice per halaman
+    GET  /invoices/{id}         - detail invoice beserta item
+    GET  /invoices/{id}/pdf     - PDF invoice (?template= opsional)
+    GET  /health                - status server
+    GET  /metrics               - metrik render PDF (format teks Prometheus)
+
+Mode multi-tenant (``--tenant-dir``): setiap request /invoices wajib membawa
+header ``X-Tenant-ID``; datanya dibaca dari database tenant tersebut
+(lihat tenancy.py).
+
+Body POST /invoices:
+    {
+        "customer_id": 1,
+        "items": [{"product_name": "Kopi", "quantity": 2, "unit_price": 25000}],
+        "issue_date": "2025-03-01",     # opsional, YYYY-MM-DD, default hari ini
+        "due_date": "2025-03-31",       # opsional, default issue_date + jatuh tempo default
+        "tax_rate": 11.0,               # opsional, dalam PERSEN seperti di Pengaturan
+        "notes": ""                     # opsional
+    }
+
+Query SQLite dijalankan di thread pool dan render PDF di process pool,
+sehingga event loop tetap bebas melayani ratusan koneksi sekaligus.
+
+Jalankan:  python api_server.py --port 8502
+           python api_server.py --tenant-dir tenants --max-open-tenants 64
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from database import Database
+from render_metrics import render_stats
+from tenancy import TENANT_MAX_OPEN, Tenant, TenantRegistry
+
+MAX_BODY_SIZE = 1024 * 1024
+MAX_PER_PAGE = 200
+RENDER_TIMEOUT = 60
+
+logger = logging.getLogger(__name__)
+
+HTTP_REASONS = {
+    200: 'OK',
+    201: 'Created',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+    504: 'Gateway Timeout',
+}
+
+# Generator instance per worker process, created on first render
+_process_pdf_generator = None
+
+
+def render_invoice_pdf(invoice_data, items_records, company_settings, template):
+    """Render an invoice PDF inside a worker process; returns ``(pdf_data, render timings)``"""
+    global _process_pdf_generator
+    if _process_pdf_generator is None:
+        from template_pdf_generator import TemplatedInvoicePDFGenerator
+        # Timings are aggregated by the server process, which serves /metrics
+        _process_pdf_generator = TemplatedInvoicePDFGenerator(metrics=None)
+
+    items_df = pd.DataFrame(items_records, columns=['product_name', 'quantity', 'unit_price', 'total_price'])
+    pdf_data = _process_pdf_generator.create_invoice_pdf(invoice_data, items_df, company_settings, template)
+    return pdf_data, _process_pdf_generator.last_render
+
+
+def _to_records(df):
+    """Convert a DataFrame to JSON-safe records (NaN becomes None)"""
+    return df.astype(object).where(pd.notna(df), None).to_dict('records')
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _parse_date(value, field):
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise HTTPError(400, f"{field} harus berformat YYYY-MM-DD")
+
+
+def parse_invoice_payload(body, company_settings):
+    """Validate a create-invoice request body.
+
+    ``tax_rate`` is a percentage (11.0 = 11%), the same unit as the company
+    settings; the returned dict holds it as a fraction for create_invoice().
+    """
+    try:
+        payload = json.loads(body or b'{}')
+    except ValueError:
+        raise HTTPError(400, "Body harus berupa JSON")
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "Body harus berupa object JSON")
+
+    try:
+        customer_id = int(payload['customer_id'])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPError(400, "customer_id wajib diisi dan berupa angka")
+
+    raw_items = payload.get('items')
+    if not isinstance(raw_items, list) or not raw_items:
+        raise HTTPError(400, "items wajib berisi minimal 1 item")
+
+    items = []
+    for index, item in enumerate(raw_items, start=1):
+        try:
+            product_name = str(item['product_name']).strip()
+            quantity = int(item['quantity'])
+            unit_price = float(item['unit_price'])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(400, f"Item {index}: product_name, quantity dan unit_price wajib diisi dengan benar")
+        if not product_name or quantity <= 0 or unit_price < 0:
+            raise HTTPError(400, f"Item {index}: nama wajib diisi, jumlah harus > 0 dan harga tidak boleh negatif")
+        items.append({'product_name': product_name, 'quantity': quantity, 'unit_price': unit_price})
+
+    settings = company_settings or {}
+    default_tax_rate = settings.get('default_tax_rate') or 11.0
+    default_due_days = settings.get('default_due_days') or 30
+
+    issue_date = _parse_date(payload['issue_date'], 'issue_date') if payload.get('issue_date') else date.today()
+    if payload.get('due_date'):
+        due_date = _parse_date(payload['due_date'], 'due_date')
+    else:
+        due_date = issue_date + timedelta(days=int(default_due_days))
+    if due_date < issue_date:
+        raise HTTPError(400, "due_date tidak boleh sebelum issue_date")
+
+    try:
+        tax_rate = float(payload.get('tax_rate', default_tax_rate))
+    except (TypeError, ValueError):
+        raise HTTPError(400, "tax_rate harus berupa angka persen, misalnya 11.0")
+    if not 0 <= tax_rate <= 100:
+        raise HTTPError(400, "tax_rate harus antara 0 dan 100 (persen)")
+
+    notes = payload.get('notes') or ''
+    if not isinstance(notes, str):
+        raise HTTPError(400, "notes harus berupa teks")
+
+    return {
+        'customer_id': customer_id,
+        'items': items,
+        'issue_date': issue_date.isoformat(),
+        'due_date': due_date.isoformat(),
+        'tax_rate': tax_rate / 100,
+        'notes': notes
+    }
+
+
+class InvoiceAPIServer:
+    """Asyncio HTTP server on top of Database and TemplatedInvoicePDFGenerator"""
+
+    def __init__(self, db_name="invoice_system.db", host="127.0.0.1", port=8502,
+                 db_workers=8, render_workers=2, tenant_dir=None, max_open_tenants=TENANT_MAX_OPEN):
+        # One database, or one per tenant chosen by the X-Tenant-ID header
+        self.tenants = TenantRegistry(tenant_dir, max_open_tenants) if tenant_dir else None
+        self.default_tenant = None if tenant_dir else Tenant('default', Database(db_name))
+        self.host = host
+        self.port = port
+        self.db_executor = ThreadPoolExecutor(max_workers=db_workers, thread_name_prefix="api-db")
+        # Spawned (not forked) workers: forking after the thread pool and event
+        # loop are running can deadlock the child on inherited locks
+        self.render_executor = ProcessPoolExecutor(
+            max_workers=render_workers, mp_context=multiprocessing.get_context('spawn')
+        )
+        self.server = None
+
+    async def _run_db(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.db_executor, lambda: func(*args, **kwargs))
+
+    # Handlers -------------------------------------------------------------
+
+    async def create_invoice(self, tenant, body):
+        company_settings = await self._run_db(tenant.company_settings)
+        invoice = parse_invoice_payload(body, company_settings)
+
+        customer = await self._run_db(tenant.db.get_customer_by_id, invoice['customer_id'])
+        if customer is None:
+            raise HTTPError(400, f"Customer {invoice['customer_id']} tidak ditemukan")
+
+        invoice_id, invoice_number = await self._run_db(tenant.db.create_invoice, **invoice)
+        return 201, {'id': invoice_id, 'invoice_number': invoice_number}
+
+    async def list_invoices(self, tenant, query):
+        try:
+            page = max(int(query.get('page', ['1'])[0]), 1)
+            per_page = min(max(int(query.get('per_page', ['20'])[0]), 1), MAX_PER_PAGE)
+        except ValueError:
+            raise HTTPError(400, "page dan per_page harus berupa angka")
+
+        invoices_df, total_count = await self._run_db(tenant.db.get_invoices_page, page, per_page)
+        return 200, {
+            'page': page,
+            'per_page': per_page,
+            'total': total_count,
+            'invoices': _to_records(invoices_df)
+        }
+
+    async def get_invoice(self, tenant, invoice_id):
+        invoice_data, items_data = await self._run_db(tenant.db.get_invoice_details, invoice_id)
+        if invoice_data is None:
+            raise HTTPError(404, f"Invoice {invoice_id} tidak ditemukan")
+
+        invoice = _to_records(invoice_data.to_frame().T)[0]
+        invoice['items'] = _to_records(items_data)
+        return 200, invoice
+
+    async def get_invoice_pdf(self, tenant, invoice_id, query):
+        invoice_data, items_data = await self._run_db(tenant.db.get_invoice_details, invoice_id)
+        if invoice_data is None:
+            raise HTTPError(404, f"Invoice {invoice_id} tidak ditemukan")
+
+        company_settings = await self._run_db(tenant.company_settings)
+        template = query.get('template', [None])[0] or (
+            company_settings.get('invoice_template', 'classic') if company_settings else 'classic'
+        )
+
+        invoice_dict = _to_records(invoice_data.to_frame().T)[0]
+        items_records = _to_records(items_data[['product_name', 'quantity', 'unit_price', 'total_price']])
+        loop = asyncio.get_running_loop()
+        try:
+            pdf_data, render = await asyncio.wait_for(
+                loop.run_in_executor(
+                    self.render_executor, render_invoice_pdf,
+                    invoice_dict, items_records, company_settings, template
+                ),
+                timeout=RENDER_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            raise HTTPError(504, "Render PDF melebihi batas waktu")
+        render_stats.record(**render)
+        return 200, pdf_data
+
+    async def _acquire_tenant(self, headers):
+        if self.tenants is None:
+            return self.default_tenant
+        tenant_id = headers.get('x-tenant-id')
+        if not tenant_id:
+            raise HTTPError(400, "Header X-Tenant-ID wajib diisi")
+        try:
+            # Opening a tenant for the first time runs its schema checks, so not on the event loop
+            return await self._run_db(self.tenants.acquire, tenant_id)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        except KeyError:
+            raise HTTPError(404, f"Tenant '{tenant_id}' tidak ditemukan")
+
+    async def dispatch(self, method, path, query, body, headers=None):
+        parts = [part for part in path.split('/') if part]
+
+        if parts == ['health']:
+            return 200, {'status': 'ok'}
+
+        if parts == ['metrics']:
+            if method != 'GET':
+                raise HTTPError(405, "Method tidak didukung")
+            return 200, render_stats.prometheus_text()
+
+        if parts[:1] != ['invoices'] or len(parts) > 3:
+            raise HTTPError(404, "Endpoint tidak ditemukan")
+
+        tenant = await self._acquire_tenant(headers or {})
+        try:
+            return await self._dispatch_invoices(tenant, method, parts, query, body)
+        finally:
+            if self.tenants is not None:
+                self.tenants.release(tenant)
+
+    async def _dispatch_invoices(self, tenant, method, parts, query, body):
+        if len(parts) == 1:
+            if method == 'POST':
+                return await self.create_invoice(tenant, body)
+            if method == 'GET':
+                return await self.list_invoices(tenant, query)
+            raise HTTPError(405, "Method tidak didukung")
+
+        if method != 'GET':
+            raise HTTPError(405, "Method tidak didukung")
+        try:
+            invoice_id = int(parts[1])
+        except ValueError:
+            raise HTTPError(404, "Invoice tidak ditemukan")
+
+        if len(parts) == 2:
+            return await self.get_invoice(tenant, invoice_id)
+        if parts[2] == 'pdf':
+            return await self.get_invoice_pdf(tenant, invoice_id, query)
+        raise HTTPError(404, "Endpoint tidak ditemukan")
+
+    # HTTP plumbing ----------------------------------------------------------
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+
+        method, target, version = request_line.decode('latin-1').split()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', 0))
+        if length > MAX_BODY_SIZE:
+            raise HTTPError(413, "Body terlalu besar")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target, version, headers, body
+
+    async def _write_response(self, writer, status, payload, keep_alive):
+        if isinstance(payload, bytes):
+            body, content_type = payload, 'application/pdf'
+        elif isinstance(payload, str):
+            body, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body = json.dumps(payload, default=_json_default).encode('utf-8')
+            content_type = 'application/json'
+
+        head = (
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, version, headers, body = request
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+
+                    url = urlsplit(target)
+                    status, payload = await self.dispatch(method, url.path, parse_qs(url.query), body, headers)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': e.message}
+                except (ValueError, asyncio.IncompleteReadError):
+                    status, payload = 400, {'error': "Request tidak valid"}
+                except Exception:
+                    logger.exception("Unhandled error while serving request")
+                    status, payload = 500, {'error': "Terjadi kesalahan pada server"}
+
+                await self._write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        """Start listening; returns the bound port"""
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port, backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.db_executor.shutdown(wait=True)
+        self.render_executor.shutdown(wait=True)
+        if self.tenants is not None:
+            self.tenants.close()
+        else:
+            self.default_tenant.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Invoice Generator UMKM - HTTP API lokal")
+    parser.add_argument('--db', default="invoice_system.db", help="Path database SQLite")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--db-workers', type=int, default=8)
+    parser.add_argument('--render-workers', type=int, default=2)
+    parser.add_argument('--tenant-dir', help="Folder database per tenant (mengaktifkan mode multi-tenant)")
+    parser.add_argument('--max-open-tenants', type=int, default=TENANT_MAX_OPEN,
+                        help="Jumlah tenant yang tetap terbuka beserta cache-nya")
+    args = parser.parse_args()
+
+    server = InvoiceAPIServer(args.db, args.host, args.port, args.db_workers, args.render_workers,
+                              args.tenant_dir, args.max_open_tenants)
+
+    async def run():
+        port = await server.start()
+        print(f"🚀 Invoice API berjalan di http://{args.host}:{port}")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\n👋 Server dihentikan")
+
+
+if __name__ == "__main__":
+    main()
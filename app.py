@@ -3,9 +3,23 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
 import base64
-from database import Database
+import os
+import time
+import uuid
+from database import Database, INVOICE_STATUSES
 from template_pdf_generator import TemplatedInvoicePDFGenerator
+from job_queue import JobManager
+from product_index import ProductIndex
+from archive import archive_closed_invoices
+from backup import create_snapshot, list_snapshots
+from query_metrics import LATENCY_BUCKETS_MS, SLOW_QUERY_MS, query_stats, read_slow_queries
+from render_metrics import render_stats
+from artifact_spool import ArtifactSpool
+from logo_cache import LOGO_MAX_UPLOAD_BYTES, normalize_logo
+from analytics_engine import open_analytics
+from parquet_export import default_export_dir, export_parquet, pyarrow_available, read_export_state
 
 # Initialize
 if 'db' not in st.session_state:
@@ -21,6 +35,269 @@ st.set_page_config(
     layout="wide"
 )
 
+JOB_STATUS_LABELS = {
+    'queued': '⏳ Menunggu',
+    'running': '⚙️ Diproses',
+    'done': '✅ Selesai',
+    'failed': '❌ Gagal'
+}
+
+# Stop auto-refreshing a page after polling this long; the user can resume manually
+JOB_POLL_MAX_SECONDS = 600
+
+@st.cache_resource
+def get_job_manager():
+    """Process-wide background job manager shared by all sessions"""
+    return JobManager(st.session_state.db.db_name)
+
+@st.cache_resource
+def get_artifact_spool():
+    """Process-wide spool for rendered files; sessions only keep handles"""
+    return ArtifactSpool()
+
+@st.cache_resource(max_entries=2)
+def _build_product_index(db_name, version):
+    return ProductIndex(Database(db_name).get_products(), version)
+
+def get_product_index():
+    """Product picker index, rebuilt only when the products table changes"""
+    db = st.session_state.db
+    return _build_product_index(db.db_name, db.get_table_version('products'))
+
+@st.cache_resource
+def _open_analytics(db_name):
+    return open_analytics(Database(db_name))
+
+def get_analytics():
+    """Report engine: the DuckDB mirror when INVOICE_ANALYTICS_ENGINE=duckdb, else SQLite"""
+    return _open_analytics(st.session_state.db.db_name)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_product_sales(db_name, start_date, end_date, data_version):
+    """Product sales per date range, cached until invoices change"""
+    return _open_analytics(db_name).get_product_sales(start_date, end_date)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_product_sales_by_month(db_name, start_date, end_date, product_ids, data_version):
+    """Monthly sales of the given products, cached until invoices change"""
+    return _open_analytics(db_name).get_product_sales_by_month(start_date, end_date, list(product_ids))
+
+def show_product_analytics(start_date, end_date):
+    """Top products, long-tail share and monthly trend for the selected period"""
+    db = st.session_state.db
+    data_version = db.get_table_version('invoices')
+    product_sales = load_product_sales(db.db_name, str(start_date), str(end_date), data_version)
+    
+    st.subheader("🏆 Analisis Produk")
+    if len(product_sales) == 0:
+        st.info("Belum ada penjualan produk pada periode ini")
+        return
+    
+    top_n = st.slider("Jumlah produk teratas", min_value=5, max_value=50, value=10, step=5, key="product_top_n")
+    top_products = product_sales.head(top_n)
+    long_tail = product_sales.iloc[top_n:]
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Produk Terjual", len(product_sales))
+    with col2:
+        top_share = top_products['revenue'].sum() / product_sales['revenue'].sum() if product_sales['revenue'].sum() else 0
+        st.metric(f"Kontribusi Top {top_n}", f"{top_share:.0%}")
+    with col3:
+        st.metric("Produk Long Tail", len(long_tail))
+    
+    mix_df = top_products[['product_name', 'revenue']].copy()
+    if len(long_tail) > 0:
+        mix_df.loc[len(mix_df)] = [f"Lainnya ({len(long_tail)} produk)", long_tail['revenue'].sum()]
+    fig_mix = px.pie(mix_df, names='product_name', values='revenue', title='Komposisi Pendapatan per Produk')
+    st.plotly_chart(fig_mix, use_container_width=True)
+    
+    display_df = top_products[['product_name', 'revenue', 'quantity', 'invoice_count', 'avg_price']].copy()
+    display_df.columns = ['Produk', 'Pendapatan', 'Jumlah Terjual', 'Jumlah Invoice', 'Harga Rata-rata']
+    st.dataframe(display_df, use_container_width=True, hide_index=True)
+    
+    trend_ids = tuple(int(product_id) for product_id in top_products['product_id'].dropna().head(5))
+    if trend_ids:
+        monthly = load_product_sales_by_month(db.db_name, str(start_date), str(end_date), trend_ids, data_version)
+        fig_trend = px.line(monthly, x='month', y='revenue', color='product_name', markers=True,
+                            title='Tren Bulanan 5 Produk Teratas')
+        st.plotly_chart(fig_trend, use_container_width=True)
+
+def show_receivables():
+    """Receivables aging per customer and upcoming cash flow by due week"""
+    analytics = get_analytics()
+    st.subheader("💰 Piutang & Arus Kas")
+    
+    aging_df = analytics.get_receivables_aging()
+    if len(aging_df) == 0:
+        st.info("Tidak ada invoice yang belum dibayar")
+        return
+    
+    bucket_labels = {
+        'current': 'Belum Jatuh Tempo',
+        'overdue_1_30': '1-30 Hari',
+        'overdue_31_60': '31-60 Hari',
+        'overdue_61_90': '61-90 Hari',
+        'overdue_90_plus': '> 90 Hari'
+    }
+    cols = st.columns(len(bucket_labels))
+    for col, (bucket, label) in zip(cols, bucket_labels.items()):
+        with col:
+            st.metric(label, f"Rp {aging_df[bucket].sum():,.0f}")
+    
+    display_df = aging_df[['customer_name', 'invoice_count', *bucket_labels, 'total_outstanding']].copy()
+    display_df.columns = ['Customer', 'Jumlah Invoice', *bucket_labels.values(), 'Total Piutang']
+    st.dataframe(display_df, use_container_width=True, hide_index=True)
+    
+    weeks = st.slider("Proyeksi arus kas (minggu)", min_value=4, max_value=26, value=12, key="cash_flow_weeks")
+    cash_flow_df = analytics.get_cash_flow_forecast(weeks=weeks)
+    if len(cash_flow_df) > 0:
+        fig = px.bar(cash_flow_df, x='week_start', y='amount_due',
+                     title='Piutang Jatuh Tempo per Minggu',
+                     labels={'week_start': 'Minggu mulai', 'amount_due': 'Jumlah (Rp)'})
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.caption(f"Tidak ada piutang yang jatuh tempo dalam {weeks} minggu ke depan")
+
+def _get_query_param(name):
+    if hasattr(st, "query_params"):
+        return st.query_params.get(name)
+    values = st.experimental_get_query_params().get(name)
+    return values[0] if values else None
+
+def _set_query_param(name, value):
+    if hasattr(st, "query_params"):
+        st.query_params[name] = value
+    else:
+        st.experimental_set_query_params(**{name: value})
+
+def get_session_owner():
+    """Owner token of this browser session, kept in the URL so it survives a refresh"""
+    if 'job_owner' not in st.session_state:
+        owner = _get_query_param("sid")
+        if not owner:
+            owner = uuid.uuid4().hex
+            _set_query_param("sid", owner)
+        st.session_state.job_owner = owner
+    return st.session_state.job_owner
+
+def show_job_status(job_id, label, file_name, mime, key_prefix="job"):
+    """Show progress of a background job, or its download button once done.
+    
+    The result file is only read after the user asks to prepare the download,
+    so finished jobs do not load their files on every rerun.
+    Returns True while the job is still queued or running.
+    """
+    manager = get_job_manager()
+    job = manager.get_job(job_id, owner=get_session_owner())
+    if job is None:
+        st.warning("Job tidak ditemukan")
+        return False
+    
+    if job['status'] in ('queued', 'running'):
+        total = job['total'] or 0
+        fraction = min(job['progress'] / total, 1.0) if total else 0.0
+        st.progress(fraction, text=f"{JOB_STATUS_LABELS[job['status']]} ({job['progress']}/{total})")
+        if manager.is_stale(job):
+            st.warning("⚠️ Job ini belum ada progres cukup lama dan akan dijalankan ulang otomatis")
+        return True
+    
+    if job['status'] == 'done':
+        prepared_key = f"prepared_{key_prefix}_{job_id}"
+        if not st.session_state.get(prepared_key):
+            if st.button("📥 Siapkan Download", key=f"prepare_{key_prefix}_{job_id}", use_container_width=True):
+                st.session_state[prepared_key] = True
+                st.rerun()
+            return False
+        
+        try:
+            with open(job['result_path'], 'rb') as f:
+                st.download_button(
+                    label=label,
+                    data=f.read(),
+                    file_name=file_name,
+                    mime=mime,
+                    type="primary",
+                    use_container_width=True,
+                    key=f"download_{key_prefix}_{job_id}"
+                )
+        except (FileNotFoundError, TypeError):
+            st.warning("File hasil job sudah tidak tersedia")
+    else:
+        st.error(f"❌ Job gagal: {job['error']}")
+    return False
+
+def show_recent_jobs(job_type, title, expanded=False):
+    """List recent jobs of one type with their progress or download button.
+    
+    Returns True if any of them is still active.
+    """
+    jobs_df = get_job_manager().get_recent_jobs(limit=5, job_type=job_type, owner=get_session_owner())
+    if len(jobs_df) == 0:
+        return False
+    
+    any_active = False
+    with st.expander(title, expanded=expanded):
+        for _, job in jobs_df.iterrows():
+            st.caption(f"{job['created_at']} · {JOB_STATUS_LABELS.get(job['status'], job['status'])}")
+            if job_type == 'export_zip':
+                file_name, mime = f"invoice_export_{job['id'][:8]}.zip", "application/zip"
+            elif job_type == 'send_email':
+                file_name, mime = f"laporan_email_{job['id'][:8]}.csv", "text/csv"
+            elif job_type == 'generate_recurring':
+                if (job['result_path'] or '').endswith('.zip'):
+                    file_name, mime = f"invoice_berulang_{job['id'][:8]}.zip", "application/zip"
+                else:
+                    file_name, mime = f"invoice_berulang_{job['id'][:8]}.csv", "text/csv"
+            else:
+                result_name = os.path.basename(job['result_path'] or '')
+                file_name, mime = result_name.split('_', 1)[-1] or "invoice.pdf", "application/pdf"
+            any_active = show_job_status(job['id'], "⬇️ Download", file_name, mime, key_prefix="recent") or any_active
+    return any_active
+
+def spool_artifact(state_key, data, file_name, mime):
+    """Move rendered bytes to the spool, keeping only a handle in session state"""
+    spool = get_artifact_spool()
+    owner = get_session_owner()
+    previous = st.session_state.get(state_key)
+    if previous:
+        spool.discard(owner, previous)
+    st.session_state[state_key] = spool.put(owner, data, file_name, mime)
+
+def show_spooled_download(state_key, label, key=None, **button_kwargs):
+    """Download button for a spooled artifact; clears the handle once the file is gone"""
+    handle = st.session_state.get(state_key)
+    if not handle:
+        return False
+    data = get_artifact_spool().read(get_session_owner(), handle)
+    if data is None:
+        st.session_state.pop(state_key, None)
+        st.info("File sudah kedaluwarsa, silakan buat ulang")
+        return False
+    st.download_button(label=label, data=data, file_name=handle['file_name'], mime=handle['mime'],
+                       key=key or f"download_{state_key}", **button_kwargs)
+    return True
+
+def poll_active_jobs(active, interval=1.0):
+    """Rerun the page periodically while background jobs are in progress.
+    
+    Polling stops after JOB_POLL_MAX_SECONDS; a button lets the user check again.
+    """
+    if not active:
+        st.session_state.pop('job_poll_started', None)
+        return
+    
+    started = st.session_state.setdefault('job_poll_started', time.monotonic())
+    if time.monotonic() - started > JOB_POLL_MAX_SECONDS:
+        st.info("Job masih berjalan. Halaman tidak lagi diperbarui otomatis.")
+        if st.button("🔄 Cek Status Lagi", key="resume_job_poll"):
+            st.session_state.pop('job_poll_started', None)
+            st.rerun()
+        return
+    
+    time.sleep(interval)
+    st.rerun()
+
 def main():
     st.title("🧾 Invoice Generator untuk UMKM")
     st.markdown("---")
@@ -29,7 +306,7 @@ def main():
     st.sidebar.title("Menu")
     page = st.sidebar.selectbox(
         "Pilih Halaman",
-        ["Dashboard", "Buat Invoice", "Data Customer", "Data Produk", "Laporan", "Pengaturan"]
+        ["Dashboard", "Buat Invoice", "Data Customer", "Data Produk", "Laporan", "Pengaturan", "Performa"]
     )
     
     if page == "Dashboard":
@@ -44,6 +321,8 @@ def main():
         reports_page()
     elif page == "Pengaturan":
         company_settings_page()
+    elif page == "Performa":
+        performance_page()
 
 def show_dashboard():
     st.header("📊 Dashboard")
@@ -62,9 +341,9 @@ def show_dashboard():
             total_revenue = invoices_df['total'].sum()
             st.metric("Total Revenue", f"Rp {total_revenue:,.0f}")
         
+        status_counts = st.session_state.db.get_invoice_status_counts()
         with col3:
-            pending_invoices = len(invoices_df[invoices_df['status'] == 'Draft'])
-            st.metric("Invoice Draft", pending_invoices)
+            st.metric("Invoice Draft", status_counts.get('Draft', 0))
         
         with col4:
             avg_invoice = invoices_df['total'].mean()
@@ -103,6 +382,8 @@ def show_dashboard():
         page_invoices = invoices_df.iloc[start_idx:end_idx][['invoice_number', 'customer_name', 'issue_date', 'total', 'status']]
         st.dataframe(page_invoices, use_container_width=True)
         
+        show_status_update(invoices_df.iloc[start_idx:end_idx])
+        
         # Pagination controls at bottom
         if total_invoices_count > st.session_state.dashboard_invoices_per_page:
             st.markdown("---")
@@ -145,14 +426,63 @@ def show_dashboard():
         
         with col2:
             # Status distribution
-            status_dist = invoices_df['status'].value_counts()
-            fig_status = px.pie(values=status_dist.values, names=status_dist.index,
+            fig_status = px.pie(values=list(status_counts.values()), names=list(status_counts.keys()),
                               title='Status Invoice')
             st.plotly_chart(fig_status, use_container_width=True)
     
     else:
         st.info("Belum ada data invoice. Silakan buat invoice pertama Anda!")
 
+def show_status_update(page_invoices):
+    """Change the status of selected invoices, or of all invoices matching a filter"""
+    message = st.session_state.pop('status_update_message', None)
+    if message:
+        st.success(f"✅ {message}")
+    
+    with st.expander("✏️ Ubah Status Invoice"):
+        mode = st.radio("Pilih invoice", ["Dari halaman ini", "Berdasarkan filter"],
+                        horizontal=True, key="status_update_mode")
+        new_status = st.selectbox("Status baru", INVOICE_STATUSES, index=2, key="status_update_new")
+        
+        if mode == "Dari halaman ini":
+            labels = dict(zip(page_invoices['id'], page_invoices['invoice_number']))
+            select_all = st.checkbox("Pilih semua di halaman ini", key="status_update_all")
+            selected_ids = st.multiselect(
+                "Invoice",
+                options=list(labels),
+                default=list(labels) if select_all else [],
+                format_func=lambda invoice_id: labels[invoice_id],
+                key=f"status_update_ids_{select_all}"
+            )
+            if st.button("💾 Simpan Status", key="status_update_selected", disabled=not selected_ids):
+                result = st.session_state.db.bulk_update_invoice_status(new_status, invoice_ids=selected_ids)
+                show_status_update_result(result)
+        else:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                start_date = st.date_input("Dari Tanggal", datetime.now().replace(day=1), key="status_update_start")
+            with col2:
+                end_date = st.date_input("Sampai Tanggal", datetime.now(), key="status_update_end")
+            with col3:
+                current_status = st.selectbox("Status saat ini", ["Semua Status"] + INVOICE_STATUSES,
+                                              key="status_update_current")
+            if st.button("💾 Simpan Status untuk Semua yang Cocok", key="status_update_filter"):
+                result = st.session_state.db.bulk_update_invoice_status(
+                    new_status,
+                    start_date=start_date,
+                    end_date=end_date,
+                    status=None if current_status == "Semua Status" else current_status
+                )
+                show_status_update_result(result)
+
+def show_status_update_result(result):
+    if result['success']:
+        # Shown after the rerun so the table reflects the new statuses
+        st.session_state.status_update_message = result['message']
+        st.rerun()
+    else:
+        st.error(result['message'])
+
 def create_invoice_page():
     st.header("📝 Buat Invoice Baru")
     
@@ -161,46 +491,44 @@ def create_invoice_page():
         st.session_state.invoice_items = []
     
     # Initialize created invoice state
-    if 'created_invoice_pdf' not in st.session_state:
-        st.session_state.created_invoice_pdf = None
+    if 'created_invoice_job_id' not in st.session_state:
+        st.session_state.created_invoice_job_id = None
         st.session_state.created_invoice_number = None
     
     # Section 1: Add Items (Outside of form)
     st.subheader("Tambah Item Invoice")
     with st.expander("Tambah Item Baru", expanded=True):
-        # Get products from database
-        products_df = st.session_state.db.get_products()
+        # Product index is cached and only rebuilt when products change
+        product_index = get_product_index()
         
         # Tab for choosing input method
         tab1, tab2 = st.tabs(["📦 Pilih dari Master Data", "✏️ Input Manual"])
         
         with tab1:
-            if len(products_df) > 0:
+            if len(product_index) > 0:
                 col1, col2, col3 = st.columns([3, 1, 1])
                 
                 with col1:
-                    # Create options for selectbox
-                    product_options = {}
-                    for _, product in products_df.iterrows():
-                        display_name = f"{product['name']} - Rp {product['price']:,.0f}"
-                        product_options[display_name] = {
-                            'name': product['name'],
-                            'price': product['price']
-                        }
+                    search_query = st.text_input("Cari Produk", key="product_search",
+                                                 placeholder="Ketik nama produk...")
+                    product_ids = product_index.search(search_query)
                     
-                    selected_product_display = st.selectbox(
+                    selected_product_id = st.selectbox(
                         "Pilih Produk", 
-                        options=list(product_options.keys()),
+                        options=product_ids,
+                        format_func=product_index.display_name,
                         key="selected_product"
                     )
                     
-                    if selected_product_display:
-                        selected_product = product_options[selected_product_display]
+                    selected_product = product_index.get(selected_product_id) if selected_product_id is not None else None
+                    if selected_product:
                         product_name_master = selected_product['name']
                         unit_price_master = selected_product['price']
                     else:
+                        if search_query:
+                            st.caption("Produk tidak ditemukan")
                         product_name_master = ""
-                        unit_price_master = 0.0
+                        unit_price_master = 0
                 
                 with col2:
                     quantity_master = st.number_input("Jumlah", min_value=1, value=1, key="quantity_master")
@@ -212,7 +540,8 @@ def create_invoice_page():
                             st.session_state.invoice_items.append({
                                 'product_name': product_name_master,
                                 'quantity': quantity_master,
-                                'unit_price': unit_price_master
+                                'unit_price': unit_price_master,
+                                'product_id': selected_product['id']
                             })
                             st.success(f"✅ {product_name_master} berhasil ditambahkan!")
                             st.rerun()
@@ -267,7 +596,8 @@ def create_invoice_page():
                                     st.session_state.invoice_items.append({
                                         'product_name': existing['name'],
                                         'quantity': quantity,
-                                        'unit_price': existing['price']
+                                        'unit_price': existing['price'],
+                                        'product_id': existing['id']
                                     })
                                     st.success(f"✅ {existing['name']} (dari master data) berhasil ditambahkan!")
                                     st.rerun()
@@ -284,7 +614,7 @@ def create_invoice_page():
         items_df['Total'] = items_df['quantity'] * items_df['unit_price']
         
         # Format for display
-        display_df = items_df.copy()
+        display_df = items_df[['product_name', 'quantity', 'unit_price', 'Total']].copy()
         display_df['unit_price'] = display_df['unit_price'].apply(lambda x: f"Rp {x:,.0f}")
         display_df['Total'] = display_df['Total'].apply(lambda x: f"Rp {x:,.0f}")
         display_df.columns = ['Nama Produk', 'Jumlah', 'Harga Satuan', 'Total']
@@ -327,6 +657,8 @@ def create_invoice_page():
             
             # Notes
             notes = st.text_area("Catatan")
+            
+            recurring = st.checkbox("🔁 Tagih ulang item yang sama setiap bulan")
         
         # Submit button
         submitted = st.form_submit_button("🧾 Buat Invoice", type="primary", use_container_width=True)
@@ -349,14 +681,23 @@ def create_invoice_page():
                     
                     st.success(f"✅ Invoice {invoice_number} berhasil dibuat!")
                     
-                    # Generate PDF
-                    invoice_data, items_data = st.session_state.db.get_invoice_details(invoice_id)
-                    company_settings = st.session_state.db.get_company_settings()
-                    selected_template = company_settings.get('invoice_template', 'classic') if company_settings else 'classic'
-                    pdf_data = st.session_state.pdf_generator.create_invoice_pdf(invoice_data, items_data, company_settings, selected_template)
+                    # This invoice covers the current period; the schedule starts with the next one
+                    if recurring:
+                        result = st.session_state.db.add_recurring_schedule(
+                            customer_id=customer_id,
+                            items=st.session_state.invoice_items,
+                            start_date=issue_date + relativedelta(months=1),
+                            due_days=(due_date - issue_date).days,
+                            tax_rate=tax_rate,
+                            notes=notes
+                        )
+                        if not result['success']:
+                            st.error(result['message'])
                     
-                    # Store PDF data in session state
-                    st.session_state.created_invoice_pdf = pdf_data
+                    # Render PDF in the background so the page stays responsive
+                    job_id = get_job_manager().submit('render_invoice', {'invoice_id': invoice_id},
+                                                      owner=get_session_owner())
+                    st.session_state.created_invoice_job_id = job_id
                     st.session_state.created_invoice_number = invoice_number
                     
                     # Clear items after successful creation
@@ -369,34 +710,79 @@ def create_invoice_page():
                     st.error(f"Error: {str(e)}")
     
     # Download button (outside of form)
-    if st.session_state.created_invoice_pdf is not None:
+    job_active = False
+    if st.session_state.created_invoice_job_id is not None:
         st.markdown("---")
         st.subheader("📄 Download Invoice")
         
-        st.download_button(
+        job_active = show_job_status(
+            st.session_state.created_invoice_job_id,
             label="📄 Download PDF Invoice",
-            data=st.session_state.created_invoice_pdf,
             file_name=f"{st.session_state.created_invoice_number}.pdf",
-            mime="application/pdf",
-            type="primary",
-            use_container_width=True
+            mime="application/pdf"
         )
         
-        # Option to clear the PDF data
+        # Option to clear the PDF job
         col1, col2 = st.columns([1, 1])
         with col1:
             if st.button("✨ Buat Invoice Baru", type="secondary", use_container_width=True):
-                st.session_state.created_invoice_pdf = None
+                st.session_state.created_invoice_job_id = None
                 st.session_state.created_invoice_number = None
                 st.rerun()
         
         with col2:
             if st.button("📊 Lihat Dashboard", type="secondary", use_container_width=True):
-                st.session_state.created_invoice_pdf = None
+                st.session_state.created_invoice_job_id = None
                 st.session_state.created_invoice_number = None
                 # This would need to change the page, but since we're using selectbox, 
                 # we'll just clear the state
                 st.info("Silakan pilih 'Dashboard' di menu sidebar")
+    
+    # Recent render jobs stay available after a browser refresh
+    job_active = show_recent_jobs('render_invoice', "🕘 PDF Invoice Terakhir") or job_active
+    job_active = show_recurring_schedules() or job_active
+    poll_active_jobs(job_active)
+
+def show_recurring_schedules():
+    """List recurring schedules and generate the due invoices in a background job.
+    
+    Returns True while a generation job is still active.
+    """
+    st.markdown("---")
+    st.subheader("🔁 Invoice Berulang")
+    
+    schedules_df = st.session_state.db.get_recurring_schedules()
+    if len(schedules_df) == 0:
+        st.info("Belum ada jadwal berulang. Centang \"Tagih ulang\" saat membuat invoice untuk menambahkannya.")
+        return False
+    
+    display_df = schedules_df[['id', 'customer_name', 'interval_months', 'next_run_date', 'item_count',
+                               'subtotal', 'runs', 'active']].copy()
+    display_df['subtotal'] = display_df['subtotal'].apply(lambda x: f"Rp {x:,.0f}")
+    display_df['active'] = display_df['active'].map({1: "Aktif", 0: "Berhenti"})
+    display_df.columns = ['ID', 'Customer', 'Interval (bulan)', 'Invoice Berikutnya', 'Item',
+                          'Subtotal', 'Sudah Dibuat', 'Status']
+    st.dataframe(display_df, use_container_width=True, hide_index=True)
+    
+    col_schedule, col_toggle = st.columns([3, 1])
+    with col_schedule:
+        schedule_id = st.selectbox(
+            "Jadwal", options=schedules_df['id'].tolist(), key="recurring_schedule_id",
+            format_func=lambda value: f"#{value} - {schedules_df.loc[schedules_df['id'] == value, 'customer_name'].iloc[0]}"
+        )
+    with col_toggle:
+        is_active = bool(schedules_df.loc[schedules_df['id'] == schedule_id, 'active'].iloc[0])
+        st.write("")
+        if st.button("⏸️ Hentikan" if is_active else "▶️ Aktifkan", use_container_width=True):
+            st.session_state.db.set_recurring_schedule_active(schedule_id, not is_active)
+            st.rerun()
+    
+    render_pdf = st.checkbox("Sekalian buat PDF (ZIP)", key="recurring_render_pdf")
+    if st.button("🔁 Buat Invoice yang Jatuh Tempo", type="secondary"):
+        get_job_manager().submit('generate_recurring', {'render_pdf': render_pdf}, owner=get_session_owner())
+        st.success("✅ Invoice berulang diproses di background")
+    
+    return show_recent_jobs('generate_recurring', "🕘 Pembuatan Invoice Berulang Terakhir")
 
 def customer_management():
     st.header("👥 Data Customer")
@@ -795,7 +1181,7 @@ def reports_page():
         end_date = st.date_input("Sampai Tanggal", datetime.now())
     
     # Get sales summary
-    sales_df = st.session_state.db.get_sales_summary(start_date, end_date)
+    sales_df = get_analytics().get_sales_summary(start_date, end_date)
     
     if len(sales_df) > 0:
         # Summary metrics
@@ -827,6 +1213,7 @@ def reports_page():
         st.dataframe(sales_df, use_container_width=True)
         
         # Export to Excel (outside of any form)
+        excel_file_name = f"laporan_penjualan_{start_date}_to_{end_date}.xlsx"
         if st.button("Export ke Excel"):
             try:
                 # Create Excel file in memory
@@ -835,18 +1222,110 @@ def reports_page():
                 with pd.ExcelWriter(output, engine='openpyxl') as writer:
                     sales_df.to_excel(writer, index=False, sheet_name='Laporan Penjualan')
                 
-                excel_data = output.getvalue()
-                st.download_button(
-                    label="📊 Download Excel",
-                    data=excel_data,
-                    file_name=f"laporan_penjualan_{start_date}_to_{end_date}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+                spool_artifact("sales_report_excel", output.getvalue(), excel_file_name,
+                               "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
             except Exception as e:
                 st.error(f"Error creating Excel file: {str(e)}")
+        
+        excel_handle = st.session_state.get("sales_report_excel")
+        if excel_handle and excel_handle['file_name'] != excel_file_name:
+            # Report period changed; the spooled file belongs to the old one
+            get_artifact_spool().discard(get_session_owner(), excel_handle)
+            st.session_state.pop("sales_report_excel")
+        show_spooled_download("sales_report_excel", "📊 Download Excel")
     
     else:
         st.info("Tidak ada data untuk periode yang dipilih")
+    
+    st.markdown("---")
+    show_product_analytics(start_date, end_date)
+    
+    st.markdown("---")
+    show_receivables()
+    
+    # Bulk download of invoice PDFs for the selected period
+    st.markdown("---")
+    st.subheader("📦 Download Invoice Massal")
+    st.write("Download semua PDF invoice pada periode di atas dalam satu file ZIP.")
+    
+    col_customer, col_status = st.columns(2)
+    with col_customer:
+        customers_df = st.session_state.db.get_customers()
+        customer_options = {"Semua Customer": None}
+        customer_options.update(dict(zip(customers_df['name'], customers_df['id'])))
+        selected_customer = st.selectbox("Customer", options=list(customer_options.keys()), key="bulk_export_customer")
+    with col_status:
+        status_options = ["Semua Status"] + st.session_state.db.get_invoice_statuses()
+        selected_status = st.selectbox("Status", options=status_options, key="bulk_export_status")
+    
+    if st.button("📦 Siapkan ZIP Invoice", type="secondary"):
+        selected_customer_id = customer_options[selected_customer]
+        get_job_manager().submit('export_zip', {
+            'start_date': str(start_date),
+            'end_date': str(end_date),
+            'customer_id': int(selected_customer_id) if selected_customer_id is not None else None,
+            'status': None if selected_status == "Semua Status" else selected_status
+        }, owner=get_session_owner())
+        st.success("✅ Export ZIP diproses di background")
+    
+    job_active = show_recent_jobs('export_zip', "🕘 Export ZIP Terakhir", expanded=True)
+    
+    # Email the same selection to each customer's address
+    st.markdown("---")
+    st.subheader("📧 Kirim Invoice via Email")
+    st.write("Kirim PDF invoice pada periode dan filter di atas ke alamat email masing-masing customer.")
+    resend = st.checkbox("Kirim ulang invoice yang sudah pernah terkirim", key="bulk_email_resend")
+    
+    if st.button("📧 Kirim Email Invoice", type="secondary"):
+        selected_customer_id = customer_options[selected_customer]
+        get_job_manager().submit('send_email', {
+            'start_date': str(start_date),
+            'end_date': str(end_date),
+            'customer_id': int(selected_customer_id) if selected_customer_id is not None else None,
+            'status': None if selected_status == "Semua Status" else selected_status,
+            'resend': resend
+        }, owner=get_session_owner())
+        st.success("✅ Pengiriman email diproses di background")
+    
+    job_active = show_recent_jobs('send_email', "🕘 Pengiriman Email Terakhir") or job_active
+    
+    email_log_df = st.session_state.db.get_email_log(limit=20)
+    if len(email_log_df) > 0:
+        with st.expander("📜 Log Email Terakhir"):
+            email_log_df = email_log_df.drop(columns=['id', 'batch_id'])
+            email_log_df.columns = ['Waktu', 'No. Invoice', 'Penerima', 'Status', 'Percobaan', 'Keterangan']
+            st.dataframe(email_log_df, use_container_width=True, hide_index=True)
+    
+    poll_active_jobs(job_active)
+
+def show_company_logo(company_info):
+    """Upload, replace or remove the company logo shown on invoice PDFs"""
+    st.subheader("🖼️ Logo Perusahaan")
+    st.write(f"Format PNG atau JPG, maksimal {LOGO_MAX_UPLOAD_BYTES // (1024 * 1024)} MB. "
+             "Logo diperkecil otomatis dan muncul di bagian atas PDF invoice.")
+    
+    col_upload, col_current = st.columns([2, 1])
+    with col_upload:
+        uploaded = st.file_uploader("Pilih file logo", type=['png', 'jpg', 'jpeg'], key="company_logo_upload")
+        if uploaded is not None and st.button("💾 Simpan Logo", key="save_company_logo"):
+            try:
+                result = st.session_state.db.update_company_logo(normalize_logo(uploaded.getvalue()))
+            except ValueError as e:
+                result = {'success': False, 'message': str(e)}
+            if result['success']:
+                st.rerun()
+            st.error(f"❌ {result['message']}")
+    
+    with col_current:
+        if company_info and company_info.get('logo'):
+            st.image(company_info['logo'], caption="Logo saat ini", width=160)
+            if st.button("🗑️ Hapus Logo", key="remove_company_logo"):
+                result = st.session_state.db.update_company_logo(None)
+                if result['success']:
+                    st.rerun()
+                st.error(f"❌ {result['message']}")
+        else:
+            st.caption("Belum ada logo")
 
 def company_settings_page():
     st.header("⚙️ Pengaturan Perusahaan")
@@ -1027,6 +1506,8 @@ def company_settings_page():
             else:
                 st.error("Nama perusahaan wajib diisi")
     
+    show_company_logo(company_info)
+    
     # Preview section
     st.markdown("---")
     st.subheader("👁️ Preview Informasi Perusahaan")
@@ -1090,19 +1571,16 @@ def company_settings_page():
                 sample_invoice_data, sample_items, company_info, current_template
             )
             
-            st.download_button(
-                label="📄 Download Sample Invoice PDF",
-                data=sample_pdf,
-                file_name=f"sample_invoice_{current_template}.pdf",
-                mime="application/pdf",
-                type="primary",
-                use_container_width=True
-            )
-            st.success("✅ Sample invoice PDF berhasil dibuat! Klik tombol di atas untuk download.")
+            spool_artifact("sample_invoice_pdf", sample_pdf, f"sample_invoice_{current_template}.pdf",
+                           "application/pdf")
+            st.success("✅ Sample invoice PDF berhasil dibuat! Klik tombol di bawah untuk download.")
             
         except Exception as e:
             st.error(f"❌ Error generating sample PDF: {str(e)}")
     
+    show_spooled_download("sample_invoice_pdf", "📄 Download Sample Invoice PDF",
+                          type="primary", use_container_width=True)
+    
     st.info("💡 **Tips**: Sample invoice akan menggunakan template dan pengaturan yang saat ini aktif. Untuk melihat perubahan template, simpan pengaturan terlebih dahulu.")
 
     # Template Showcase Section
@@ -1145,6 +1623,150 @@ def company_settings_page():
                 st.success(f"**{icon} {name}** ✅\n\n{desc}\n\n*Template Dipilih*")
             else:
                 st.info(f"**{icon} {name}**\n\n{desc}")
+    
+    st.markdown("---")
+    show_database_maintenance()
+
+def show_database_maintenance():
+    """Online backups and archiving of old closed invoices"""
+    st.subheader("🗄️ Pemeliharaan Database")
+    
+    with st.expander("Backup Database"):
+        st.write("Backup dibuat tanpa menghentikan aplikasi dan diverifikasi dengan checksum. "
+                 "Restore dilakukan lewat `python backup.py restore <file>`.")
+        if st.button("💾 Buat Backup Sekarang", key="backup_now"):
+            with st.spinner("Membuat backup..."):
+                result = create_snapshot(st.session_state.db.db_name)
+            if result['success']:
+                st.success(f"✅ {result['message']}")
+            else:
+                st.error(result['message'])
+        
+        snapshots = list_snapshots(st.session_state.db.db_name)
+        if snapshots:
+            snapshots_df = pd.DataFrame(snapshots)[['name', 'created_at', 'size']]
+            snapshots_df['size'] = snapshots_df['size'].apply(lambda size: f"{size / 1024:,.0f} KB")
+            snapshots_df.columns = ['File', 'Waktu', 'Ukuran']
+            st.dataframe(snapshots_df, use_container_width=True, hide_index=True)
+    
+    with st.expander("Arsip Invoice Lama"):
+        st.write("Invoice berstatus Paid/Cancelled yang lebih lama dari batas di bawah dipindahkan ke "
+                 "file arsip per tahun. Detail invoice dan laporan penjualan tetap membaca arsip secara otomatis.")
+        months = st.number_input("Arsipkan invoice lebih lama dari (bulan)", min_value=1, value=24, key="archive_months")
+        vacuum = st.checkbox("Kecilkan file database setelah arsip (VACUUM)", key="archive_vacuum")
+        
+        archive_years = st.session_state.db.get_archive_years()
+        if archive_years:
+            st.caption("Arsip tersedia: " + ", ".join(str(year) for year in archive_years))
+        
+        if st.button("🗄️ Arsipkan Sekarang", key="archive_now"):
+            with st.spinner("Mengarsipkan invoice..."):
+                result = archive_closed_invoices(st.session_state.db, older_than_months=int(months), vacuum=vacuum)
+            if result['success']:
+                st.success(f"✅ {result['message']}")
+            else:
+                st.error(result['message'])
+    
+    with st.expander("Export Parquet (Lakehouse)"):
+        export_dir = default_export_dir(st.session_state.db.db_name)
+        st.write(f"Invoice dan item ditulis ke `{export_dir}` per partisi tahun/bulan. "
+                 "Setiap export hanya menambahkan invoice yang dibuat sejak export terakhir.")
+        if not pyarrow_available():
+            st.info("Install pyarrow untuk mengaktifkan export Parquet: `pip install pyarrow`")
+        else:
+            export_state = read_export_state(export_dir)
+            if export_state.get('last_export'):
+                invoice_marks = export_state['tables'].get('invoices', {})
+                st.caption(f"Export terakhir: {export_state['last_export']} — "
+                           f"{invoice_marks.get('rows', 0):,} invoice sampai ID {invoice_marks.get('max_id', 0)}")
+            if st.button("📤 Export Sekarang", key="parquet_export_now"):
+                with st.spinner("Mengekspor ke Parquet..."):
+                    result = export_parquet(st.session_state.db.db_name, export_dir)
+                if result['success']:
+                    st.success(f"✅ {result['message']}")
+                else:
+                    st.error(result['message'])
+    
+    with st.expander("Change Log Sinkronisasi"):
+        st.write("Setiap perubahan customer, produk, invoice, dan item dicatat di `change_log`. "
+                 "Sistem lain membaca lewat `Database.get_changes()` lalu mengonfirmasi dengan `ack_changes()`; "
+                 "entri yang sudah dikonfirmasi semua consumer dihapus otomatis.")
+        consumers_df = st.session_state.db.get_change_consumers()
+        if len(consumers_df) > 0:
+            consumers_df = consumers_df[['consumer', 'last_change_id', 'pending', 'updated_at']]
+            consumers_df.columns = ['Consumer', 'Offset', 'Belum Dibaca', 'Terakhir Konfirmasi']
+            st.dataframe(consumers_df, use_container_width=True, hide_index=True)
+        else:
+            st.caption("Belum ada consumer terdaftar (`Database.register_change_consumer()`)")
+
+def performance_page():
+    """Query latency per Database method and the slowest logged queries"""
+    st.header("⏱️ Performa Database")
+    st.caption("Statistik dihitung sejak server Streamlit dijalankan. Query lebih lambat dari "
+               f"{SLOW_QUERY_MS:.0f} ms dicatat ke slow-query log beserta query plan-nya.")
+    
+    summary = query_stats.summary()
+    if summary:
+        st.subheader("Latensi per Method")
+        summary_df = pd.DataFrame(summary)
+        summary_df.columns = ['Method', 'Jumlah Query', 'Total (ms)', 'Rata-rata (ms)', 'p95 (ms)', 'Maks (ms)', 'Rata-rata Baris']
+        st.dataframe(summary_df, use_container_width=True, hide_index=True)
+        
+        method = st.selectbox("Histogram latensi", [row['method'] for row in summary], key="perf_method")
+        histogram = query_stats.histogram(method)
+        labels = [f"≤ {bound:g} ms" if bound != float('inf') else f"> {LATENCY_BUCKETS_MS[-2]:g} ms"
+                  for bound, _ in histogram]
+        fig = px.bar(x=labels, y=[count for _, count in histogram],
+                     labels={'x': 'Latensi', 'y': 'Jumlah query'}, title=f"Latensi {method}")
+        st.plotly_chart(fig, use_container_width=True)
+        
+        if st.button("🔄 Reset Statistik", key="perf_reset"):
+            query_stats.reset()
+            st.rerun()
+    else:
+        st.info("Belum ada query yang tercatat")
+    
+    st.subheader("🐢 Query Paling Lambat")
+    slow_queries = read_slow_queries(st.session_state.db.db_name)
+    if not slow_queries:
+        st.info("Belum ada query lambat")
+    for entry in slow_queries:
+        with st.expander(f"{entry['elapsed_ms']:,.1f} ms · {entry['method']} · {entry['rows']} baris · {entry['time']}"):
+            st.code(entry['sql'], language='sql')
+            if entry['plan']:
+                st.code("\n".join(entry['plan']), language='text')
+    
+    show_render_metrics()
+    
+    spool_usage = get_artifact_spool().usage()
+    st.caption(f"Spool file hasil render: {spool_usage['files']} file, "
+               f"{spool_usage['bytes'] / (1024 * 1024):,.1f} MB")
+
+def show_render_metrics():
+    """PDF render time per phase and output size, per template and item count"""
+    st.subheader("📄 Render PDF")
+    render_summary = render_stats.summary()
+    if not render_summary:
+        st.info("Belum ada PDF yang dirender sejak server dijalankan")
+        return
+    
+    render_df = pd.DataFrame(render_summary)
+    render_df.columns = ['Template', 'Jumlah Item', 'Render', 'Story (ms)', 'Layout (ms)',
+                         'Serialisasi (ms)', 'p95 Total (ms)', 'Maks (ms)', 'Rata-rata (KB)']
+    st.dataframe(render_df, use_container_width=True, hide_index=True)
+    
+    phases_df = render_df.melt(id_vars=['Template', 'Jumlah Item'],
+                               value_vars=['Story (ms)', 'Layout (ms)', 'Serialisasi (ms)'],
+                               var_name='Fase', value_name='Rata-rata (ms)')
+    phases_df['Kelompok'] = phases_df['Template'] + " · " + phases_df['Jumlah Item'] + " item"
+    fig = px.bar(phases_df, x='Kelompok', y='Rata-rata (ms)', color='Fase',
+                 title="Rata-rata Waktu Render per Fase")
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.download_button("📥 Download Metrik (Prometheus)", render_stats.prometheus_text(),
+                       file_name="invoice_render.prom", mime="text/plain")
+    if render_stats.metrics_file:
+        st.caption(f"Metrik juga ditulis berkala ke {render_stats.metrics_file}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
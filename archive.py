@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Arsip invoice lama ke database SQLite per tahun.
+
+Invoice yang sudah ditutup (Paid/Cancelled) dan lebih lama dari N bulan
+dipindahkan beserta item-nya ke ``<db>_archive/invoices_<tahun>.db``.
+Database utama hanya menyimpan catatan kecil di ``archived_invoices``;
+``Database.get_invoice_details`` dan ``get_sales_summary`` meng-ATTACH file
+arsip yang dibutuhkan secara otomatis.
+
+Jalankan:  python archive.py --months 24 --vacuum
+"""
+
+import argparse
+import os
+import sqlite3
+from datetime import date
+
+from database import rename_table_ddl
+
+ARCHIVE_STATUSES = ('Paid', 'Cancelled')
+ARCHIVE_TABLES = ('invoices', 'invoice_items')
+
+
+def _months_ago(months, today=None):
+    today = today or date.today()
+    year, month = divmod(today.year * 12 + today.month - 1 - months, 12)
+    return date(year, month + 1, 1)
+
+
+def _prepare_archive_tables(cursor):
+    """Create archive tables like the main ones and add columns the archive is missing"""
+    for table in ARCHIVE_TABLES:
+        cursor.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        cursor.execute(rename_table_ddl(cursor.fetchone()[0], table, f'archive.{table}'))
+
+        archive_columns = {row[1] for row in cursor.execute(f'PRAGMA archive.table_info({table})')}
+        for row in cursor.execute(f'PRAGMA main.table_info({table})').fetchall():
+            if row[1] not in archive_columns:
+                cursor.execute(f'ALTER TABLE archive.{table} ADD COLUMN {row[1]} {row[2]}')
+
+    cursor.execute('CREATE INDEX IF NOT EXISTS archive.idx_invoice_items_invoice_id ON invoice_items (invoice_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS archive.idx_invoice_items_product_id ON invoice_items (product_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS archive.idx_invoices_issue_date ON invoices (issue_date)')
+
+
+def _move_year(conn, year, cutoff, statuses):
+    cursor = conn.cursor()
+    status_placeholders = ', '.join('?' * len(statuses))
+
+    cursor.execute('BEGIN IMMEDIATE')
+    cursor.execute('CREATE TEMP TABLE IF NOT EXISTS archive_batch (id INTEGER PRIMARY KEY)')
+    cursor.execute('DELETE FROM archive_batch')
+    cursor.execute(f'''
+        INSERT INTO archive_batch (id)
+        SELECT id FROM main.invoices
+        WHERE status IN ({status_placeholders})
+          AND issue_date < ? AND strftime('%Y', issue_date) = ?
+    ''', [*statuses, str(cutoff), f'{int(year):04d}'])
+
+    for table, key in (('invoices', 'id'), ('invoice_items', 'invoice_id')):
+        columns = ', '.join(row[1] for row in cursor.execute(f'PRAGMA main.table_info({table})').fetchall())
+        cursor.execute(f'''
+            INSERT INTO archive.{table} ({columns})
+            SELECT {columns} FROM main.{table} WHERE {key} IN (SELECT id FROM archive_batch)
+        ''')
+
+    cursor.execute('''
+        INSERT INTO main.archived_invoices (id, invoice_number, customer_id, issue_date, archive_year)
+        SELECT id, invoice_number, customer_id, issue_date, ? FROM main.invoices
+        WHERE id IN (SELECT id FROM archive_batch)
+    ''', (int(year),))
+    moved = cursor.rowcount
+
+    # Invoices first: the item delete trigger then sees them gone and keeps the analytics mirror incremental
+    cursor.execute('DELETE FROM main.invoices WHERE id IN (SELECT id FROM archive_batch)')
+    cursor.execute('DELETE FROM main.invoice_items WHERE invoice_id IN (SELECT id FROM archive_batch)')
+    cursor.execute('DELETE FROM archive_batch')
+    conn.commit()
+    return moved
+
+
+def archive_closed_invoices(db, older_than_months=24, statuses=ARCHIVE_STATUSES, vacuum=False, today=None):
+    """Move closed invoices issued before the cutoff into per-year archive databases"""
+    cutoff = _months_ago(older_than_months, today)
+    status_placeholders = ', '.join('?' * len(statuses))
+
+    conn = sqlite3.connect(db.db_name)
+    cursor = conn.cursor()
+    archived = {}
+    try:
+        cursor.execute(f'''
+            SELECT DISTINCT strftime('%Y', issue_date) FROM invoices
+            WHERE status IN ({status_placeholders}) AND issue_date < ?
+        ''', [*statuses, str(cutoff)])
+        years = sorted(int(row[0]) for row in cursor.fetchall() if row[0])
+
+        if years:
+            os.makedirs(db.archive_dir, exist_ok=True)
+        for year in years:
+            db.attach_archive(conn, year)
+            try:
+                _prepare_archive_tables(cursor)
+                conn.commit()
+                archived[year] = _move_year(conn, year, cutoff, statuses)
+            finally:
+                conn.rollback()
+                conn.execute('DETACH DATABASE archive')
+
+        if vacuum and archived:
+            conn.execute('VACUUM')
+    except Exception as e:
+        conn.close()
+        return {
+            'success': False,
+            'message': f"Error mengarsipkan invoice: {str(e)}",
+            'archived': archived
+        }
+
+    conn.close()
+    total = sum(archived.values())
+    return {
+        'success': True,
+        'message': f"{total} invoice sebelum {cutoff} diarsipkan" if total else "Tidak ada invoice yang perlu diarsipkan",
+        'archived': archived
+    }
+
+
+def main():
+    from database import Database
+
+    parser = argparse.ArgumentParser(description="Arsipkan invoice lama ke database per tahun")
+    parser.add_argument('--db', default="invoice_system.db", help="Path database SQLite")
+    parser.add_argument('--months', type=int, default=24, help="Arsipkan invoice yang lebih lama dari N bulan")
+    parser.add_argument('--vacuum', action='store_true', help="VACUUM database utama setelah diarsipkan")
+    args = parser.parse_args()
+
+    result = archive_closed_invoices(Database(args.db), older_than_months=args.months, vacuum=args.vacuum)
+    print(("✅ " if result['success'] else "❌ ") + result['message'])
+    for year, count in result['archived'].items():
+        print(f"   {year}: {count} invoice")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Spool file untuk hasil render (PDF contoh, export Excel) di aplikasi Streamlit.
+
+Byte hasil render ditulis ke folder sementara per sesi; ``st.session_state``
+hanya menyimpan handle kecil (id, nama file, mime, ukuran). File dihapus
+setelah TTL habis, dan bila total ukuran spool melewati batas, file yang
+paling lama tidak diakses dihapus lebih dulu. Dengan begitu memori server
+tidak bertambah seiring jumlah sesi yang aktif.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+SPOOL_DIR = os.path.join(tempfile.gettempdir(), "invoice_spool")
+SPOOL_TTL_SECONDS = 60 * 60
+SPOOL_MAX_BYTES = 256 * 1024 * 1024
+
+_HANDLE_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ArtifactSpool:
+    """Per-session artifact files with TTL and total-size eviction"""
+
+    def __init__(self, directory=SPOOL_DIR, ttl_seconds=SPOOL_TTL_SECONDS, max_bytes=SPOOL_MAX_BYTES):
+        self.directory = os.path.abspath(directory)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _owner_dir(self, owner):
+        # Owner tokens come from the URL, so never use them as a path directly
+        return os.path.join(self.directory, hashlib.sha256(str(owner).encode('utf-8')).hexdigest()[:32])
+
+    def _path(self, owner, handle):
+        if not handle or not _HANDLE_ID.match(str(handle.get('id', ''))):
+            return None
+        return os.path.join(self._owner_dir(owner), handle['id'])
+
+    def put(self, owner, data, file_name, mime='application/pdf'):
+        """Write ``data`` to the spool and return the handle to keep in session state"""
+        owner_dir = self._owner_dir(owner)
+        handle = {'id': uuid.uuid4().hex, 'file_name': file_name, 'mime': mime, 'size': len(data)}
+        path = os.path.join(owner_dir, handle['id'])
+        partial_path = path + '.partial'
+
+        # Under the lock so eviction cannot remove the owner folder mid-write
+        with self._lock:
+            os.makedirs(owner_dir, exist_ok=True)
+            try:
+                with open(partial_path, 'wb') as f:
+                    f.write(data)
+                os.replace(partial_path, path)
+            except Exception:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+                raise
+
+        self.evict()
+        return handle
+
+    def read(self, owner, handle):
+        """Bytes of a spooled artifact, or None once it expired or was evicted"""
+        path = self._path(owner, handle)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Reading counts as use, so active downloads are evicted last
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def discard(self, owner, handle):
+        path = self._path(owner, handle)
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def _entries(self):
+        entries = []
+        for owner_name in os.listdir(self.directory):
+            owner_dir = os.path.join(self.directory, owner_name)
+            if not os.path.isdir(owner_dir):
+                continue
+            for name in os.listdir(owner_dir):
+                path = os.path.join(owner_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Delete expired artifacts, then the least recently used ones above ``max_bytes``"""
+        with self._lock:
+            now = time.time()
+            removed = 0
+            kept = []
+            for mtime, size, path in self._entries():
+                if now - mtime > self.ttl_seconds:
+                    removed += self._remove(path)
+                else:
+                    kept.append((mtime, size, path))
+
+            total = sum(size for _, size, _ in kept)
+            for mtime, size, path in sorted(kept):
+                if total <= self.max_bytes:
+                    break
+                removed += self._remove(path)
+                total -= size
+
+            for owner_name in os.listdir(self.directory):
+                owner_dir = os.path.join(self.directory, owner_name)
+                if os.path.isdir(owner_dir) and not os.listdir(owner_dir):
+                    try:
+                        os.rmdir(owner_dir)
+                    except OSError:
+                        pass
+            return removed
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError:
+            return 0
+
+    def usage(self):
+        """``{'files', 'bytes'}`` currently held in the spool"""
+        entries = self._entries()
+        return {'files': len(entries), 'bytes': sum(size for _, size, _ in entries)}
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Backup online database invoice dengan snapshot berotasi.
+
+Snapshot dibuat dengan ``sqlite3.Connection.backup`` per beberapa halaman,
+dengan jeda singkat di antara langkah sehingga penulis (Streamlit, API)
+tidak terblokir selama backup. Setiap snapshot diverifikasi dengan
+``PRAGMA integrity_check`` dan checksum SHA-256 yang disimpan di file
+``.sha256`` di sebelahnya.
+
+Jalankan:
+    python backup.py snapshot              # buat snapshot baru
+    python backup.py list                  # daftar snapshot
+    python backup.py verify <snapshot>     # cek checksum dan integritas
+    python backup.py restore <snapshot>    # kembalikan database dari snapshot
+    python backup.py benchmark             # ukur throughput dan jeda penulis
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Pages copied per backup step, and pause between steps to let writers in
+BACKUP_STEP_PAGES = 256
+BACKUP_STEP_PAUSE = 0.005
+
+# Number of snapshots kept by rotation
+BACKUP_KEEP = 7
+
+
+def default_backup_dir(db_name):
+    return os.path.splitext(db_name)[0] + "_backups"
+
+
+def file_checksum(path):
+    """SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _copy_database(source, target, pages=BACKUP_STEP_PAGES, pause=BACKUP_STEP_PAUSE):
+    """Page-stepped online copy between two open connections"""
+    def between_steps(status, remaining, total):
+        if remaining and pause:
+            time.sleep(pause)
+
+    source.backup(target, pages=pages, progress=between_steps)
+
+
+def list_snapshots(db_name, backup_dir=None):
+    """Snapshots of a database, newest first"""
+    backup_dir = backup_dir or default_backup_dir(db_name)
+    if not os.path.isdir(backup_dir):
+        return []
+
+    prefix = os.path.splitext(os.path.basename(db_name))[0] + "_"
+    snapshots = []
+    for name in os.listdir(backup_dir):
+        if name.startswith(prefix) and name.endswith('.db'):
+            path = os.path.join(backup_dir, name)
+            snapshots.append({
+                'path': path,
+                'name': name,
+                'size': os.path.getsize(path),
+                'created_at': datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d %H:%M:%S')
+            })
+    return sorted(snapshots, key=lambda snapshot: snapshot['name'], reverse=True)
+
+
+def verify_snapshot(snapshot_path):
+    """Check a snapshot against its stored checksum and SQLite's integrity check"""
+    checksum_path = snapshot_path + '.sha256'
+    if not os.path.exists(checksum_path):
+        return {'success': False, 'message': "File checksum tidak ditemukan"}
+
+    with open(checksum_path) as f:
+        expected = f.read().split()[0]
+    if file_checksum(snapshot_path) != expected:
+        return {'success': False, 'message': "Checksum tidak cocok, snapshot rusak"}
+
+    conn = sqlite3.connect(f"file:{snapshot_path}?mode=ro", uri=True)
+    try:
+        result = conn.execute('PRAGMA integrity_check').fetchone()[0]
+    finally:
+        conn.close()
+    if result != 'ok':
+        return {'success': False, 'message': f"Integrity check gagal: {result}"}
+
+    return {'success': True, 'message': "Snapshot valid"}
+
+
+def rotate_snapshots(db_name, backup_dir=None, keep=BACKUP_KEEP):
+    """Delete all but the newest ``keep`` snapshots; returns the deleted paths"""
+    deleted = []
+    for snapshot in list_snapshots(db_name, backup_dir)[keep:]:
+        for path in (snapshot['path'], snapshot['path'] + '.sha256'):
+            if os.path.exists(path):
+                os.remove(path)
+        deleted.append(snapshot['path'])
+    return deleted
+
+
+def create_snapshot(db_name, backup_dir=None, keep=BACKUP_KEEP, label=None,
+                    pages=BACKUP_STEP_PAGES, pause=BACKUP_STEP_PAUSE):
+    """Copy the live database into a verified, checksummed snapshot and rotate old ones"""
+    backup_dir = backup_dir or default_backup_dir(db_name)
+    os.makedirs(backup_dir, exist_ok=True)
+
+    stem = os.path.splitext(os.path.basename(db_name))[0]
+    name = f"{stem}_{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+    if label:
+        name += f"_{label}"
+    snapshot_path = os.path.join(backup_dir, name + '.db')
+    partial_path = snapshot_path + '.partial'
+
+    started = time.perf_counter()
+    try:
+        source = sqlite3.connect(db_name)
+        target = sqlite3.connect(partial_path)
+        try:
+            _copy_database(source, target, pages, pause)
+            # The live database runs in WAL mode; a snapshot must be a single self-contained file
+            target.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            target.close()
+            source.close()
+
+        os.replace(partial_path, snapshot_path)
+        with open(snapshot_path + '.sha256', 'w') as f:
+            f.write(f"{file_checksum(snapshot_path)}  {os.path.basename(snapshot_path)}\n")
+
+        verification = verify_snapshot(snapshot_path)
+        if not verification['success']:
+            raise RuntimeError(verification['message'])
+    except Exception as e:
+        for path in (partial_path, snapshot_path, snapshot_path + '.sha256'):
+            if os.path.exists(path):
+                os.remove(path)
+        return {
+            'success': False,
+            'message': f"Error membuat backup: {str(e)}"
+        }
+
+    rotate_snapshots(db_name, backup_dir, keep)
+    elapsed = time.perf_counter() - started
+    return {
+        'success': True,
+        'message': f"Backup {os.path.basename(snapshot_path)} dibuat dalam {elapsed:.1f} detik",
+        'path': snapshot_path,
+        'size': os.path.getsize(snapshot_path),
+        'seconds': elapsed
+    }
+
+
+def restore_snapshot(snapshot_path, db_name, backup_dir=None):
+    """Restore the live database from a verified snapshot.
+
+    The current database is snapshotted first (labelled ``pre-restore``) so
+    a restore can itself be undone. Pages are written through the backup
+    API, so other connections see either the old or the restored database.
+    """
+    verification = verify_snapshot(snapshot_path)
+    if not verification['success']:
+        return verification
+
+    safety = create_snapshot(db_name, backup_dir, keep=BACKUP_KEEP + 1, label="pre-restore")
+    if not safety['success']:
+        return safety
+
+    try:
+        source = sqlite3.connect(f"file:{snapshot_path}?mode=ro", uri=True)
+        target = sqlite3.connect(db_name)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+    except Exception as e:
+        return {
+            'success': False,
+            'message': f"Error restore backup: {str(e)}"
+        }
+
+    return {
+        'success': True,
+        'message': f"Database dikembalikan dari {os.path.basename(snapshot_path)} "
+                   f"(kondisi sebelumnya disimpan di {os.path.basename(safety['path'])})"
+    }
+
+
+def run_benchmark(rows=200000, pages=BACKUP_STEP_PAGES, pause=BACKUP_STEP_PAUSE):
+    """Measure snapshot throughput and how long a concurrent writer is stalled"""
+    from database import Database
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_name = os.path.join(workdir, "bench.db")
+        Database(db_name)
+        conn = sqlite3.connect(db_name)
+        conn.executemany(
+            "INSERT INTO invoice_items (invoice_id, product_name, quantity, unit_price, total_price) VALUES (?, ?, ?, ?, ?)",
+            ((i // 5 + 1, f"Produk benchmark {i % 1000}", 1 + i % 9, 1000 + i % 50000, 0) for i in range(rows))
+        )
+        conn.commit()
+        conn.close()
+        size_mb = os.path.getsize(db_name) / (1024 * 1024)
+
+        stop = threading.Event()
+        latencies = []
+
+        def writer():
+            writer_conn = sqlite3.connect(db_name, timeout=30)
+            while not stop.is_set():
+                started = time.perf_counter()
+                writer_conn.execute("UPDATE table_versions SET version = version WHERE table_name = 'products'")
+                writer_conn.commit()
+                latencies.append(time.perf_counter() - started)
+                time.sleep(0.001)
+            writer_conn.close()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        result = create_snapshot(db_name, os.path.join(workdir, "backups"), pages=pages, pause=pause)
+        stop.set()
+        thread.join()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0
+    return {
+        'size_mb': size_mb,
+        'seconds': result.get('seconds', 0.0),
+        'throughput_mb_s': size_mb / result['seconds'] if result.get('seconds') else 0.0,
+        'writes': len(latencies),
+        'writer_p99_ms': p99 * 1000,
+        'writer_max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+        'success': result['success']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backup dan restore database invoice")
+    parser.add_argument('--db', default="invoice_system.db", help="Path database SQLite")
+    parser.add_argument('--backup-dir', help="Folder snapshot (default: <db>_backups)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    snapshot_parser = subparsers.add_parser('snapshot', help="Buat snapshot baru")
+    snapshot_parser.add_argument('--keep', type=int, default=BACKUP_KEEP, help="Jumlah snapshot yang disimpan")
+    subparsers.add_parser('list', help="Daftar snapshot")
+    verify_parser = subparsers.add_parser('verify', help="Verifikasi snapshot")
+    verify_parser.add_argument('snapshot')
+    restore_parser = subparsers.add_parser('restore', help="Kembalikan database dari snapshot")
+    restore_parser.add_argument('snapshot')
+    benchmark_parser = subparsers.add_parser('benchmark', help="Ukur throughput backup dan jeda penulis")
+    benchmark_parser.add_argument('--rows', type=int, default=200000)
+    benchmark_parser.add_argument('--pages', type=int, default=BACKUP_STEP_PAGES)
+    benchmark_parser.add_argument('--pause', type=float, default=BACKUP_STEP_PAUSE)
+    args = parser.parse_args()
+
+    if args.command == 'snapshot':
+        result = create_snapshot(args.db, args.backup_dir, keep=args.keep)
+    elif args.command == 'list':
+        for snapshot in list_snapshots(args.db, args.backup_dir):
+            print(f"{snapshot['created_at']}  {snapshot['size'] / 1024:>10,.0f} KB  {snapshot['path']}")
+        return
+    elif args.command == 'verify':
+        result = verify_snapshot(args.snapshot)
+    elif args.command == 'restore':
+        result = restore_snapshot(args.snapshot, args.db, args.backup_dir)
+    else:
+        stats = run_benchmark(args.rows, args.pages, args.pause)
+        print(f"backup: {stats['size_mb']:.1f} MB in {stats['seconds']:.2f}s "
+              f"({stats['throughput_mb_s']:.1f} MB/s), pages/step={args.pages}, pause={args.pause}s")
+        print(f"writer: {stats['writes']} commits during backup, "
+              f"p99 {stats['writer_p99_ms']:.1f} ms, max {stats['writer_max_ms']:.1f} ms")
+        return
+
+    print(("✅ " if result['success'] else "❌ ") + result['message'])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,87 @@
 import sqlite3
 import pandas as pd
 from datetime import datetime
+import json
 import os
+import re
+import sys
+import uuid
+from money import invoice_totals, to_rupiah
+import query_metrics
+
+# Invoice lifecycle: allowed next statuses for each status
+INVOICE_STATUSES = ['Draft', 'Sent', 'Paid', 'Cancelled']
+STATUS_TRANSITIONS = {
+    'Draft': {'Sent', 'Paid', 'Cancelled'},
+    'Sent': {'Paid', 'Cancelled'},
+    'Paid': {'Sent'},
+    'Cancelled': {'Draft'},
+}
+
+# Invoice statuses that still count as receivables
+OUTSTANDING_STATUSES = ('Draft', 'Sent')
+
+# Money columns stored as whole Rupiah (INTEGER); older databases used REAL
+MONEY_COLUMNS = {
+    'products': ['price'],
+    'invoices': ['subtotal', 'tax_amount', 'total'],
+    'invoice_items': ['unit_price', 'total_price'],
+}
+
+# Columns read by report queries; changing them (not just inserting rows) invalidates report copies
+ANALYTICS_COLUMNS = {
+    'invoices': ['customer_id', 'issue_date', 'due_date', 'status', 'subtotal', 'tax_amount', 'total'],
+    'invoice_items': ['invoice_id', 'product_id', 'product_name', 'quantity', 'total_price'],
+}
+
+# Tables whose inserts, updates and deletes are recorded in change_log
+CHANGE_LOG_TABLES = ('customers', 'products', 'invoices', 'invoice_items')
+
+# Change log entries returned per get_changes call
+CHANGE_BATCH_SIZE = 1000
+
+def merge_sales_summaries(frames):
+    """Add up daily sales summaries from several sources (hot database, archives)"""
+    return (pd.concat(frames, ignore_index=True)
+            .groupby('date', as_index=False)[['invoice_count', 'total_sales', 'total_tax']].sum()
+            .sort_values('date', ascending=False, ignore_index=True))
+
+def rename_table_ddl(table_sql, table, new_name):
+    """Rewrite a CREATE TABLE statement from sqlite_master to create ``new_name`` instead"""
+    return re.sub(r'CREATE TABLE\s+(IF NOT EXISTS\s+)?["`\[]?' + table + r'["`\]]?',
+                  f'CREATE TABLE IF NOT EXISTS {new_name}', table_sql, count=1)
+
 
 class Database:
-    def __init__(self, db_name="invoice_system.db"):
+    def __init__(self, db_name="invoice_system.db", archive_dir=None):
         self.db_name = db_name
+        # Closed invoices moved out by archive.py live in one SQLite file per year here
+        self.archive_dir = archive_dir or os.path.splitext(db_name)[0] + "_archive"
         self.init_database()
     
+    def _connect(self):
+        """Open a read-write connection whose queries are timed under the calling method's name"""
+        return query_metrics.connect(self.db_name, sys._getframe(1).f_code.co_name)
+    
+    def _connect_readonly(self):
+        """Open a read-only connection for reports, holding one consistent snapshot.
+        
+        In WAL mode the snapshot neither blocks nor waits for invoice writes;
+        it lasts until the connection is closed. Use ``_connect()`` for
+        anything that writes.
+        """
+        conn = query_metrics.connect(self.db_name, sys._getframe(1).f_code.co_name, readonly=True)
+        conn.begin_snapshot()
+        return conn
+    
     def init_database(self):
         """Initialize database with required tables"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         cursor = conn.cursor()
         
+        # WAL lets report snapshots (_connect_readonly) read while invoices are written
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         # Customers table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS customers (
@@ -30,7 +99,7 @@ class Database:
             CREATE TABLE IF NOT EXISTS products (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT NOT NULL,
-                price REAL NOT NULL,
+                price INTEGER NOT NULL,
                 description TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
@@ -44,10 +113,10 @@ class Database:
                 customer_id INTEGER,
                 issue_date DATE,
                 due_date DATE,
-                subtotal REAL,
+                subtotal INTEGER,
                 tax_rate REAL DEFAULT 0,
-                tax_amount REAL,
-                total REAL,
+                tax_amount INTEGER,
+                total INTEGER,
                 status TEXT DEFAULT 'Draft',
                 notes TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -62,9 +131,11 @@ class Database:
                 invoice_id INTEGER,
                 product_name TEXT NOT NULL,
                 quantity INTEGER NOT NULL,
-                unit_price REAL NOT NULL,
-                total_price REAL NOT NULL,
-                FOREIGN KEY (invoice_id) REFERENCES invoices (id)
+                unit_price INTEGER NOT NULL,
+                total_price INTEGER NOT NULL,
+                product_id INTEGER,
+                FOREIGN KEY (invoice_id) REFERENCES invoices (id),
+                FOREIGN KEY (product_id) REFERENCES products (id)
             )
         ''')
         
@@ -81,10 +152,208 @@ class Database:
                 default_tax_rate REAL DEFAULT 11.0,
                 default_due_days INTEGER DEFAULT 30,
                 invoice_template TEXT DEFAULT 'classic',
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                logo BLOB,
+                logo_version TEXT
+            )
+        ''')
+        
+        # Background jobs table (PDF render / export jobs)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                job_type TEXT NOT NULL,
+                owner TEXT,
+                status TEXT NOT NULL DEFAULT 'queued',
+                params TEXT,
+                progress INTEGER DEFAULT 0,
+                total INTEGER DEFAULT 0,
+                result_path TEXT,
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
         
+        # Add job owner column if it doesn't exist (for existing databases)
+        try:
+            cursor.execute('ALTER TABLE jobs ADD COLUMN owner TEXT')
+        except sqlite3.OperationalError:
+            # Column already exists
+            pass
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_owner_created ON jobs (owner, created_at)')
+        
+        # Convert REAL money columns to whole Rupiah (for existing databases)
+        for table, columns in MONEY_COLUMNS.items():
+            self._migrate_money_columns(cursor, table, columns)
+        
+        # Change counters so caches (e.g. the product picker index) know when to rebuild
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS table_versions (
+                table_name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        # Invoice items only change together with their invoice, so 'invoices' covers both
+        for table in ('products', 'invoices', 'customers', 'company_settings'):
+            cursor.execute("INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)", (table,))
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()}
+                    AFTER {event} ON {table}
+                    BEGIN
+                        UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                    END
+                ''')
+        
+        # Updates and deletes of the columns reports use, counted apart from inserts so
+        # copies such as the DuckDB mirror (analytics_engine.py) can append new rows only
+        for table, columns in ANALYTICS_COLUMNS.items():
+            cursor.execute("INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)",
+                           (f"{table}_modified",))
+            # Items deleted after their invoice (archiving) are dropped by the mirror's
+            # orphan cleanup, so they do not force a full reload
+            orphan = ' WHEN EXISTS (SELECT 1 FROM invoices WHERE id = OLD.invoice_id)' if table == 'invoice_items' else ''
+            for event, target in (('UPDATE', f"UPDATE OF {', '.join(columns)}"), ('DELETE', 'DELETE')):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_modified_{event.lower()}
+                    AFTER {target} ON {table}{orphan if event == 'DELETE' else ''}
+                    BEGIN
+                        UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}_modified';
+                    END
+                ''')
+        
+        # Items are always read per invoice (details, PDF, bulk recalculation)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_invoice_items_invoice_id ON invoice_items (invoice_id)')
+        
+        # Reports filter invoices by issue date
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_invoices_issue_date ON invoices (issue_date)')
+        
+        # Receivables queries select open statuses by due date
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_invoices_status_due_date ON invoices (status, due_date)')
+        
+        # Where archived invoices went, so lookups attach only the year file they need
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archived_invoices (
+                id INTEGER PRIMARY KEY,
+                invoice_number TEXT NOT NULL,
+                customer_id INTEGER,
+                issue_date DATE,
+                archive_year INTEGER NOT NULL,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_archived_invoices_issue_date ON archived_invoices (issue_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_archived_invoices_customer ON archived_invoices (customer_id)')
+        
+        # One row per invoice email delivery (see email_dispatcher.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS email_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                invoice_id INTEGER NOT NULL,
+                batch_id TEXT,
+                recipient TEXT,
+                status TEXT NOT NULL,
+                attempts INTEGER DEFAULT 0,
+                error TEXT,
+                message_id TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_email_log_invoice ON email_log (invoice_id, status)')
+        
+        # Recurring invoice schedules and their fixed lines (see recurring.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS recurring_schedules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                customer_id INTEGER NOT NULL,
+                start_date DATE NOT NULL,
+                interval_months INTEGER NOT NULL DEFAULT 1,
+                end_date DATE,
+                next_run_date DATE NOT NULL,
+                runs INTEGER NOT NULL DEFAULT 0,
+                due_days INTEGER NOT NULL DEFAULT 30,
+                tax_rate REAL DEFAULT 0,
+                notes TEXT,
+                active INTEGER NOT NULL DEFAULT 1,
+                last_invoice_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (customer_id) REFERENCES customers (id)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS recurring_schedule_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                schedule_id INTEGER NOT NULL,
+                product_id INTEGER,
+                product_name TEXT NOT NULL,
+                quantity INTEGER NOT NULL,
+                unit_price INTEGER NOT NULL,
+                FOREIGN KEY (schedule_id) REFERENCES recurring_schedules (id)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_recurring_schedules_due ON recurring_schedules (active, next_run_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_recurring_schedule_items_schedule ON recurring_schedule_items (schedule_id)')
+        
+        # Append-only change log for downstream sync; consumers keep their own offset
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                parent_id INTEGER,
+                operation TEXT NOT NULL,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_consumers (
+                consumer TEXT PRIMARY KEY,
+                last_change_id INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        for table in CHANGE_LOG_TABLES:
+            # Archiving moves invoices out of the hot database; consumers see 'archive', not 'delete'
+            archived_id = {'invoices': 'OLD.id', 'invoice_items': 'OLD.invoice_id'}.get(table)
+            delete_operation = (f"CASE WHEN EXISTS (SELECT 1 FROM archived_invoices WHERE id = {archived_id}) "
+                                f"THEN 'archive' ELSE 'delete' END" if archived_id else "'delete'")
+            # create_invoice renumbers the row it just inserted; that is still the insert
+            update_filter = " WHEN OLD.invoice_number NOT LIKE 'PENDING-%'" if table == 'invoices' else ''
+            for event, row, operation, condition in (
+                ('INSERT', 'NEW', "'insert'", ''),
+                ('UPDATE', 'NEW', "'update'", update_filter),
+                ('DELETE', 'OLD', delete_operation, ''),
+            ):
+                parent_id = f"{row}.invoice_id" if table == 'invoice_items' else 'NULL'
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_change_log_{event.lower()}
+                    AFTER {event} ON {table}{condition}
+                    BEGIN
+                        INSERT INTO change_log (table_name, row_id, parent_id, operation)
+                        VALUES ('{table}', {row}.id, {parent_id}, {operation});
+                    END
+                ''')
+        
+        # Schema migration markers
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        
+        # Add product link to invoice items if it doesn't exist (for existing databases)
+        try:
+            cursor.execute('ALTER TABLE invoice_items ADD COLUMN product_id INTEGER REFERENCES products (id)')
+        except sqlite3.OperationalError:
+            # Column already exists
+            pass
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_invoice_items_product_id ON invoice_items (product_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_name_lower ON products (LOWER(name))')
+        conn.commit()
+        self._backfill_item_product_ids(conn)
+        
         # Add template column if it doesn't exist (for existing databases)
         try:
             cursor.execute('ALTER TABLE company_settings ADD COLUMN invoice_template TEXT DEFAULT "classic"')
@@ -92,6 +361,14 @@ class Database:
             # Column already exists
             pass
         
+        # Logo image (normalized PNG) and a token that changes with every new logo
+        for column, column_type in (('logo', 'BLOB'), ('logo_version', 'TEXT')):
+            try:
+                cursor.execute(f'ALTER TABLE company_settings ADD COLUMN {column} {column_type}')
+            except sqlite3.OperationalError:
+                # Column already exists
+                pass
+        
         # Insert default company settings if table is empty
         cursor.execute('SELECT COUNT(*) FROM company_settings')
         if cursor.fetchone()[0] == 0:
@@ -103,9 +380,98 @@ class Database:
         conn.commit()
         conn.close()
     
+    def _migrate_money_columns(self, cursor, table, columns):
+        """Rebuild a table so its money columns are INTEGER Rupiah instead of REAL"""
+        column_types = {row[1]: row[2].upper() for row in cursor.execute(f'PRAGMA table_info({table})')}
+        if all(column_types.get(column) != 'REAL' for column in columns):
+            return
+        
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        table_sql = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT sql FROM sqlite_master
+            WHERE type IN ('index', 'trigger') AND tbl_name = ? AND sql IS NOT NULL
+        """, (table,))
+        dependent_sql = [row[0] for row in cursor.fetchall()]
+        
+        new_sql = rename_table_ddl(table_sql, table, f'{table}__new')
+        for column in columns:
+            new_sql = re.sub(r'(\b' + column + r'\s+)REAL\b', r'\1INTEGER', new_sql, count=1)
+        
+        column_names = list(column_types)
+        select_list = ', '.join(
+            f'CAST(ROUND({name}) AS INTEGER)' if name in columns else name for name in column_names
+        )
+        cursor.execute(f'DROP TABLE IF EXISTS {table}__new')
+        cursor.execute(new_sql)
+        cursor.execute(f"INSERT INTO {table}__new ({', '.join(column_names)}) SELECT {select_list} FROM {table}")
+        cursor.execute(f'DROP TABLE {table}')
+        cursor.execute(f'ALTER TABLE {table}__new RENAME TO {table}')
+        for sql in dependent_sql:
+            cursor.execute(sql)
+    
+    def _backfill_item_product_ids(self, conn, chunk_size=50000):
+        """Link existing invoice items to products by name, one committed chunk at a time"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM schema_meta WHERE key = 'invoice_items_product_id_backfilled'")
+        if cursor.fetchone():
+            return
+        
+        # Name -> product lookup table so every item is matched by primary key
+        cursor.execute('DROP TABLE IF EXISTS temp.product_keys')
+        cursor.execute('CREATE TEMP TABLE product_keys (name_key TEXT PRIMARY KEY, product_id INTEGER NOT NULL)')
+        cursor.execute('INSERT OR IGNORE INTO product_keys SELECT LOWER(name), id FROM products ORDER BY id')
+        
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM invoice_items')
+        max_id = cursor.fetchone()[0]
+        for start in range(0, max_id, chunk_size):
+            cursor.execute('''
+                UPDATE invoice_items
+                SET product_id = (
+                    SELECT product_id FROM product_keys
+                    WHERE name_key = LOWER(invoice_items.product_name)
+                )
+                WHERE id > ? AND id <= ? AND product_id IS NULL
+            ''', (start, start + chunk_size))
+            conn.commit()
+        
+        cursor.execute('DROP TABLE temp.product_keys')
+        cursor.execute("INSERT INTO schema_meta (key, value) VALUES ('invoice_items_product_id_backfilled', CURRENT_TIMESTAMP)")
+        conn.commit()
+    
+    def archive_path(self, year):
+        """Path of the archive database holding invoices issued in ``year``"""
+        return os.path.join(self.archive_dir, f"invoices_{int(year)}.db")
+    
+    def attach_archive(self, conn, year, alias="archive"):
+        """ATTACH the archive database of ``year`` to an open connection"""
+        # SQLite cannot ATTACH inside a transaction, so a report snapshot ends here;
+        # archive files only change when archive.py runs
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute(f"ATTACH DATABASE ? AS {alias}", (self.archive_path(year),))
+    
+    def get_archive_years(self, start_date=None, end_date=None):
+        """Get the years that have archived invoices issued within the date range"""
+        conn = self._connect_readonly()
+        cursor = conn.cursor()
+        
+        query = "SELECT DISTINCT archive_year FROM archived_invoices WHERE 1=1"
+        params = []
+        if start_date:
+            query += " AND issue_date >= ?"
+            params.append(str(start_date))
+        if end_date:
+            query += " AND issue_date <= ?"
+            params.append(str(end_date))
+        cursor.execute(query + " ORDER BY archive_year", params)
+        years = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        return [year for year in years if os.path.exists(self.archive_path(year))]
+    
     def add_customer(self, name, email="", phone="", address=""):
         """Add new customer"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -120,14 +486,14 @@ class Database:
     
     def get_customers(self):
         """Get all customers"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         df = pd.read_sql_query("SELECT * FROM customers ORDER BY name", conn)
         conn.close()
         return df
     
     def check_product_exists(self, name):
         """Check if product with same name already exists"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -160,14 +526,14 @@ class Database:
             }
         
         # Add new product
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         cursor = conn.cursor()
         
         try:
             cursor.execute('''
                 INSERT INTO products (name, price, description)
                 VALUES (?, ?, ?)
-            ''', (name, price, description))
+            ''', (name, to_rupiah(price), description))
             
             product_id = cursor.lastrowid
             conn.commit()
@@ -188,64 +554,319 @@ class Database:
     
     def get_products(self):
         """Get all products"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         df = pd.read_sql_query("SELECT * FROM products ORDER BY name", conn)
         conn.close()
         return df
     
+    def get_table_version(self, table_name):
+        """Get the change counter of a table; it increases on every insert, update or delete"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT version FROM table_versions WHERE table_name = ?', (table_name,))
+        result = cursor.fetchone()
+        conn.close()
+        return result[0] if result else 0
+    
     def create_invoice(self, customer_id, items, issue_date, due_date, 
                       tax_rate=0.11, notes=""):
         """Create new invoice with items"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         cursor = conn.cursor()
         
-        # Generate invoice number
-        invoice_number = f"INV-{datetime.now().strftime('%Y%m%d')}-{datetime.now().strftime('%H%M%S')}"
-        
-        # Calculate totals
-        subtotal = sum(item['quantity'] * item['unit_price'] for item in items)
-        tax_amount = subtotal * tax_rate
-        total = subtotal + tax_amount
+        # Calculate totals in whole Rupiah
+        subtotal, tax_amount, total = invoice_totals(items, tax_rate)
         
-        # Insert invoice
+        # Insert invoice with a temporary unique number, then derive the
+        # real number from the row id so concurrent inserts never collide
         cursor.execute('''
             INSERT INTO invoices (invoice_number, customer_id, issue_date, due_date,
                                 subtotal, tax_rate, tax_amount, total, notes)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (invoice_number, customer_id, issue_date, due_date, 
+        ''', (f"PENDING-{uuid.uuid4().hex}", customer_id, issue_date, due_date, 
               subtotal, tax_rate, tax_amount, total, notes))
         
         invoice_id = cursor.lastrowid
+        invoice_number = f"INV-{datetime.now().strftime('%Y%m%d')}-{invoice_id:06d}"
+        cursor.execute('UPDATE invoices SET invoice_number = ? WHERE id = ?', (invoice_number, invoice_id))
         
-        # Insert invoice items
+        # Insert invoice items, linked to master products by ID or by name
         for item in items:
-            total_price = item['quantity'] * item['unit_price']
+            unit_price = to_rupiah(item['unit_price'])
+            product_id = item.get('product_id')
+            if product_id is None:
+                cursor.execute('SELECT id FROM products WHERE LOWER(name) = LOWER(?) ORDER BY id LIMIT 1',
+                               (item['product_name'],))
+                match = cursor.fetchone()
+                product_id = match[0] if match else None
             cursor.execute('''
-                INSERT INTO invoice_items (invoice_id, product_name, quantity, unit_price, total_price)
-                VALUES (?, ?, ?, ?, ?)
+                INSERT INTO invoice_items (invoice_id, product_name, quantity, unit_price, total_price, product_id)
+                VALUES (?, ?, ?, ?, ?, ?)
             ''', (invoice_id, item['product_name'], item['quantity'], 
-                  item['unit_price'], total_price))
+                  unit_price, item['quantity'] * unit_price, product_id))
         
         conn.commit()
         conn.close()
         return invoice_id, invoice_number
     
-    def get_invoices(self):
-        """Get all invoices with customer info"""
-        conn = sqlite3.connect(self.db_name)
+    def add_recurring_schedule(self, customer_id, items, start_date, interval_months=1, due_days=30,
+                               tax_rate=0.11, notes="", end_date=None):
+        """Bill the same items every ``interval_months`` months starting at ``start_date``"""
+        if not items:
+            return {'success': False, 'message': "Jadwal berulang harus punya minimal 1 item"}
+        if interval_months < 1:
+            return {'success': False, 'message': "Interval minimal 1 bulan"}
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('''
+                INSERT INTO recurring_schedules (customer_id, start_date, interval_months, end_date,
+                                                 next_run_date, due_days, tax_rate, notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (customer_id, str(start_date), interval_months, str(end_date) if end_date else None,
+                  str(start_date), due_days, tax_rate, notes))
+            schedule_id = cursor.lastrowid
+            
+            # Lines are linked to master products the same way as in create_invoice
+            for item in items:
+                product_id = item.get('product_id')
+                if product_id is None:
+                    cursor.execute('SELECT id FROM products WHERE LOWER(name) = LOWER(?) ORDER BY id LIMIT 1',
+                                   (item['product_name'],))
+                    match = cursor.fetchone()
+                    product_id = match[0] if match else None
+                cursor.execute('''
+                    INSERT INTO recurring_schedule_items (schedule_id, product_id, product_name, quantity, unit_price)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (schedule_id, product_id, item['product_name'], int(item['quantity']),
+                      to_rupiah(item['unit_price'])))
+            
+            conn.commit()
+            conn.close()
+            return {
+                'success': True,
+                'message': f"Jadwal invoice berulang dibuat, invoice pertama tanggal {start_date}",
+                'schedule_id': schedule_id
+            }
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            return {
+                'success': False,
+                'message': f"Error membuat jadwal berulang: {str(e)}"
+            }
+    
+    def get_recurring_schedules(self, active_only=False):
+        """Recurring schedules with customer name, line count and amount per invoice"""
+        conn = self._connect()
+        query = '''
+            SELECT s.id, c.name as customer_name, s.interval_months, s.next_run_date, s.end_date,
+                   s.runs, s.active, COUNT(si.id) as item_count,
+                   COALESCE(SUM(si.quantity * si.unit_price), 0) as subtotal
+            FROM recurring_schedules s
+            LEFT JOIN customers c ON s.customer_id = c.id
+            LEFT JOIN recurring_schedule_items si ON si.schedule_id = s.id
+        '''
+        if active_only:
+            query += " WHERE s.active = 1"
+        query += " GROUP BY s.id ORDER BY s.next_run_date, s.id"
+        df = pd.read_sql_query(query, conn)
+        conn.close()
+        return df
+    
+    def set_recurring_schedule_active(self, schedule_id, active):
+        """Pause or resume a recurring schedule"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('UPDATE recurring_schedules SET active = ? WHERE id = ?', (1 if active else 0, schedule_id))
+        updated = cursor.rowcount
+        conn.commit()
+        conn.close()
+        
+        if not updated:
+            return {'success': False, 'message': "Jadwal berulang tidak ditemukan"}
+        return {'success': True, 'message': "Jadwal berulang diaktifkan" if active else "Jadwal berulang dihentikan"}
+    
+    def get_invoices(self, start_date=None, end_date=None, customer_id=None, status=None):
+        """Get invoices with customer info, optionally filtered"""
+        conn = self._connect_readonly()
         query = '''
             SELECT i.*, c.name as customer_name 
             FROM invoices i
             LEFT JOIN customers c ON i.customer_id = c.id
-            ORDER BY i.created_at DESC
+            WHERE 1=1
         '''
-        df = pd.read_sql_query(query, conn)
+        
+        params = []
+        if start_date:
+            query += " AND i.issue_date >= ?"
+            params.append(start_date)
+        if end_date:
+            query += " AND i.issue_date <= ?"
+            params.append(end_date)
+        if customer_id:
+            query += " AND i.customer_id = ?"
+            params.append(customer_id)
+        if status:
+            query += " AND i.status = ?"
+            params.append(status)
+        
+        query += " ORDER BY i.created_at DESC"
+        
+        df = pd.read_sql_query(query, conn, params=params)
         conn.close()
         return df
     
+    def get_invoice_statuses(self):
+        """Get the distinct statuses currently used by invoices"""
+        conn = self._connect_readonly()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT DISTINCT status FROM invoices WHERE status IS NOT NULL ORDER BY status')
+        statuses = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        return statuses
+    
+    def get_invoice_status_counts(self):
+        """Get number of invoices per status"""
+        conn = self._connect_readonly()
+        cursor = conn.cursor()
+        cursor.execute('SELECT status, COUNT(*) FROM invoices GROUP BY status ORDER BY status')
+        counts = dict(cursor.fetchall())
+        conn.close()
+        return counts
+    
+    def update_invoice_status(self, invoice_id, new_status):
+        """Change the status of one invoice"""
+        return self.bulk_update_invoice_status(new_status, invoice_ids=[invoice_id])
+    
+    def bulk_update_invoice_status(self, new_status, invoice_ids=None, start_date=None, end_date=None,
+                                   customer_id=None, status=None):
+        """Change the status of many invoices in one set-based UPDATE.
+        
+        Targets are the given ``invoice_ids`` or, when None, all invoices
+        matching the filters (same filters as get_invoices). Invoices whose
+        current status cannot move to ``new_status`` are skipped.
+        """
+        if new_status not in INVOICE_STATUSES:
+            return {
+                'success': False,
+                'message': f"Status '{new_status}' tidak dikenal"
+            }
+        allowed_from = [current for current, targets in STATUS_TRANSITIONS.items() if new_status in targets]
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('CREATE TEMP TABLE IF NOT EXISTS status_targets (invoice_id INTEGER PRIMARY KEY)')
+            cursor.execute('DELETE FROM status_targets')
+            
+            if invoice_ids is not None:
+                cursor.executemany('INSERT OR IGNORE INTO status_targets (invoice_id) VALUES (?)',
+                                   [(int(invoice_id),) for invoice_id in invoice_ids])
+            else:
+                query = "INSERT INTO status_targets (invoice_id) SELECT id FROM invoices WHERE 1=1"
+                params = []
+                if start_date:
+                    query += " AND issue_date >= ?"
+                    params.append(str(start_date))
+                if end_date:
+                    query += " AND issue_date <= ?"
+                    params.append(str(end_date))
+                if customer_id:
+                    query += " AND customer_id = ?"
+                    params.append(customer_id)
+                if status:
+                    query += " AND status = ?"
+                    params.append(status)
+                cursor.execute(query, params)
+            
+            cursor.execute('''
+                SELECT COUNT(*) FROM invoices
+                WHERE id IN (SELECT invoice_id FROM status_targets)
+            ''')
+            target_count = cursor.fetchone()[0]
+            
+            cursor.execute(f'''
+                UPDATE invoices SET status = ?
+                WHERE id IN (SELECT invoice_id FROM status_targets)
+                  AND status IN ({', '.join('?' * len(allowed_from))})
+            ''', [new_status, *allowed_from])
+            updated = cursor.rowcount
+            
+            cursor.execute('DELETE FROM status_targets')
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            return {
+                'success': False,
+                'message': f"Error mengubah status invoice: {str(e)}"
+            }
+        
+        if target_count == 0:
+            return {
+                'success': False,
+                'message': "Tidak ada invoice yang dipilih atau cocok dengan filter",
+                'updated': 0,
+                'skipped': 0
+            }
+        
+        skipped = target_count - updated
+        message = f"{updated} invoice diubah menjadi {new_status}"
+        if skipped:
+            message += f", {skipped} invoice dilewati karena statusnya tidak bisa diubah ke {new_status}"
+        return {
+            'success': updated > 0,
+            'message': message,
+            'updated': updated,
+            'skipped': skipped
+        }
+    
+    def get_invoices_by_ids(self, invoice_ids):
+        """Get the given invoices with customer names, in ID order"""
+        conn = self._connect_readonly()
+        frames = []
+        # Stay well below SQLite's bound-parameter limit (an empty list still yields the columns)
+        for start in range(0, max(len(invoice_ids), 1), 500):
+            chunk = [int(invoice_id) for invoice_id in invoice_ids[start:start + 500]]
+            frames.append(pd.read_sql_query(f'''
+                SELECT i.*, c.name as customer_name
+                FROM invoices i
+                LEFT JOIN customers c ON i.customer_id = c.id
+                WHERE i.id IN ({",".join("?" * len(chunk))})
+                ORDER BY i.id
+            ''', conn, params=chunk))
+        conn.close()
+        return pd.concat(frames, ignore_index=True)
+    
+    def get_invoices_page(self, page=1, per_page=20):
+        """Get one page of invoices (newest first) and the total invoice count"""
+        conn = self._connect_readonly()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT COUNT(*) FROM invoices')
+        total_count = cursor.fetchone()[0]
+        
+        query = '''
+            SELECT i.*, c.name as customer_name 
+            FROM invoices i
+            LEFT JOIN customers c ON i.customer_id = c.id
+            ORDER BY i.created_at DESC, i.id DESC
+            LIMIT ? OFFSET ?
+        '''
+        df = pd.read_sql_query(query, conn, params=(per_page, (page - 1) * per_page))
+        conn.close()
+        return df, total_count
+    
     def get_invoice_details(self, invoice_id):
         """Get invoice with items and customer details"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect_readonly()
         
         # Get invoice info
         invoice_query = '''
@@ -260,22 +881,31 @@ class Database:
         items_query = '''
             SELECT * FROM invoice_items WHERE invoice_id = ?
         '''
+        
+        # Not in the hot database: read it from its yearly archive
+        if len(invoice_df) == 0:
+            cursor = conn.cursor()
+            cursor.execute('SELECT archive_year FROM archived_invoices WHERE id = ?', (invoice_id,))
+            archived = cursor.fetchone()
+            if archived and os.path.exists(self.archive_path(archived[0])):
+                self.attach_archive(conn, archived[0])
+                invoice_query = invoice_query.replace("FROM invoices i", "FROM archive.invoices i")
+                items_query = items_query.replace("FROM invoice_items", "FROM archive.invoice_items")
+                invoice_df = pd.read_sql_query(invoice_query, conn, params=(invoice_id,))
+        
         items_df = pd.read_sql_query(items_query, conn, params=(invoice_id,))
         
         conn.close()
         return invoice_df.iloc[0] if len(invoice_df) > 0 else None, items_df
     
-    def get_sales_summary(self, start_date=None, end_date=None):
-        """Get sales summary for reporting"""
-        conn = sqlite3.connect(self.db_name)
-        
-        query = '''
+    def _sales_summary_query(self, start_date=None, end_date=None, table="invoices"):
+        query = f'''
             SELECT 
                 DATE(issue_date) as date,
                 COUNT(*) as invoice_count,
                 SUM(total) as total_sales,
                 SUM(tax_amount) as total_tax
-            FROM invoices
+            FROM {table}
             WHERE 1=1
         '''
         
@@ -288,14 +918,178 @@ class Database:
             params.append(end_date)
             
         query += " GROUP BY DATE(issue_date) ORDER BY date DESC"
+        return query, params
+    
+    def get_sales_summary(self, start_date=None, end_date=None):
+        """Get sales summary for reporting"""
+        conn = self._connect_readonly()
+        query, params = self._sales_summary_query(start_date, end_date)
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        
+        archived_df = self.get_archived_sales_summary(start_date, end_date)
+        if archived_df is not None:
+            df = merge_sales_summaries([df, archived_df])
+        return df
+    
+    def get_archived_sales_summary(self, start_date=None, end_date=None):
+        """Sales summary of archived invoices only; None when no archive covers the range"""
+        archive_years = self.get_archive_years(start_date, end_date)
+        if not archive_years:
+            return None
+        
+        # Attach one year file at a time
+        conn = self._connect_readonly()
+        query, params = self._sales_summary_query(start_date, end_date, table="archive.invoices")
+        frames = []
+        for year in archive_years:
+            self.attach_archive(conn, year)
+            frames.append(pd.read_sql_query(query, conn, params=params))
+            conn.execute("DETACH DATABASE archive")
+        conn.close()
+        return merge_sales_summaries(frames)
+    
+    def get_product_sales(self, start_date=None, end_date=None):
+        """Get revenue, quantity, invoice count and average price per product, best sellers first.
+        
+        Items linked to a master product are grouped by product_id; unlinked
+        (manual) items are grouped by their name.
+        """
+        conn = self._connect_readonly()
+        
+        query = '''
+            SELECT
+                s.product_id,
+                COALESCE(p.name, s.product_name) as product_name,
+                s.revenue,
+                s.quantity,
+                s.invoice_count,
+                CAST(ROUND(1.0 * s.revenue / s.quantity) AS INTEGER) as avg_price
+            FROM (
+                SELECT
+                    ii.product_id,
+                    MIN(ii.product_name) as product_name,
+                    SUM(ii.total_price) as revenue,
+                    SUM(ii.quantity) as quantity,
+                    COUNT(DISTINCT ii.invoice_id) as invoice_count
+                FROM invoices i
+                JOIN invoice_items ii ON ii.invoice_id = i.id
+                WHERE 1=1
+        '''
+        
+        params = []
+        if start_date:
+            query += " AND i.issue_date >= ?"
+            params.append(str(start_date))
+        if end_date:
+            query += " AND i.issue_date <= ?"
+            params.append(str(end_date))
+        
+        query += '''
+                GROUP BY ii.product_id, CASE WHEN ii.product_id IS NULL THEN ii.product_name END
+            ) s
+            LEFT JOIN products p ON p.id = s.product_id
+            ORDER BY s.revenue DESC, product_name
+        '''
         
         df = pd.read_sql_query(query, conn, params=params)
         conn.close()
         return df
     
+    def get_product_sales_by_month(self, start_date=None, end_date=None, product_ids=None):
+        """Get monthly revenue and quantity per product, optionally only for some product IDs"""
+        conn = self._connect_readonly()
+        
+        query = '''
+            SELECT
+                strftime('%Y-%m', i.issue_date) as month,
+                ii.product_id,
+                COALESCE(p.name, ii.product_name) as product_name,
+                SUM(ii.total_price) as revenue,
+                SUM(ii.quantity) as quantity
+            FROM invoices i
+            JOIN invoice_items ii ON ii.invoice_id = i.id
+            LEFT JOIN products p ON p.id = ii.product_id
+            WHERE 1=1
+        '''
+        
+        params = []
+        if start_date:
+            query += " AND i.issue_date >= ?"
+            params.append(str(start_date))
+        if end_date:
+            query += " AND i.issue_date <= ?"
+            params.append(str(end_date))
+        if product_ids is not None:
+            query += f" AND ii.product_id IN ({', '.join('?' * len(product_ids))})"
+            params.extend(int(product_id) for product_id in product_ids)
+        
+        query += " GROUP BY month, ii.product_id, CASE WHEN ii.product_id IS NULL THEN ii.product_name END"
+        query += " ORDER BY month, revenue DESC"
+        
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        return df
+    
+    def get_receivables_aging(self, as_of=None):
+        """Get outstanding amounts per customer in aging buckets (days past due as of ``as_of``)"""
+        as_of = str(as_of or datetime.now().date())
+        status_placeholders = ', '.join('?' * len(OUTSTANDING_STATUSES))
+        conn = self._connect_readonly()
+        
+        query = f'''
+            SELECT
+                o.customer_id,
+                c.name as customer_name,
+                COUNT(*) as invoice_count,
+                SUM(CASE WHEN o.days_overdue <= 0 THEN o.total ELSE 0 END) as current,
+                SUM(CASE WHEN o.days_overdue BETWEEN 1 AND 30 THEN o.total ELSE 0 END) as overdue_1_30,
+                SUM(CASE WHEN o.days_overdue BETWEEN 31 AND 60 THEN o.total ELSE 0 END) as overdue_31_60,
+                SUM(CASE WHEN o.days_overdue BETWEEN 61 AND 90 THEN o.total ELSE 0 END) as overdue_61_90,
+                SUM(CASE WHEN o.days_overdue > 90 THEN o.total ELSE 0 END) as overdue_90_plus,
+                SUM(o.total) as total_outstanding
+            FROM (
+                SELECT
+                    customer_id,
+                    total,
+                    COALESCE(CAST(julianday(?) - julianday(due_date) AS INTEGER), 0) as days_overdue
+                FROM invoices
+                WHERE status IN ({status_placeholders})
+            ) o
+            LEFT JOIN customers c ON c.id = o.customer_id
+            GROUP BY o.customer_id
+            ORDER BY total_outstanding DESC
+        '''
+        
+        df = pd.read_sql_query(query, conn, params=[as_of, *OUTSTANDING_STATUSES])
+        conn.close()
+        return df
+    
+    def get_cash_flow_forecast(self, weeks=12, as_of=None):
+        """Get outstanding amounts falling due per week (weeks start on Monday) from ``as_of``"""
+        as_of = str(as_of or datetime.now().date())
+        status_placeholders = ', '.join('?' * len(OUTSTANDING_STATUSES))
+        conn = self._connect_readonly()
+        
+        query = f'''
+            SELECT
+                date(due_date, 'weekday 0', '-6 days') as week_start,
+                COUNT(*) as invoice_count,
+                SUM(total) as amount_due
+            FROM invoices
+            WHERE status IN ({status_placeholders})
+              AND due_date >= ? AND due_date < date(?, ?)
+            GROUP BY week_start
+            ORDER BY week_start
+        '''
+        
+        df = pd.read_sql_query(query, conn, params=[*OUTSTANDING_STATUSES, as_of, as_of, f'+{int(weeks) * 7} days'])
+        conn.close()
+        return df
+    
     def update_customer(self, customer_id, name, email="", phone="", address=""):
         """Update existing customer"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         cursor = conn.cursor()
         
         try:
@@ -328,12 +1122,15 @@ class Database:
     
     def delete_customer(self, customer_id):
         """Delete customer if not used in invoices"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         cursor = conn.cursor()
         
         try:
             # Check if customer is used in invoices
-            cursor.execute('SELECT COUNT(*) FROM invoices WHERE customer_id = ?', (customer_id,))
+            cursor.execute('''
+                SELECT (SELECT COUNT(*) FROM invoices WHERE customer_id = ?)
+                     + (SELECT COUNT(*) FROM archived_invoices WHERE customer_id = ?)
+            ''', (customer_id, customer_id))
             invoice_count = cursor.fetchone()[0]
             
             if invoice_count > 0:
@@ -375,7 +1172,7 @@ class Database:
     
     def get_customer_by_id(self, customer_id):
         """Get customer details by ID"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('SELECT * FROM customers WHERE id = ?', (customer_id,))
@@ -395,7 +1192,7 @@ class Database:
     
     def update_product(self, product_id, name, price, description=""):
         """Update existing product"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         cursor = conn.cursor()
         
         try:
@@ -403,7 +1200,7 @@ class Database:
                 UPDATE products 
                 SET name = ?, price = ?, description = ?
                 WHERE id = ?
-            ''', (name, price, description, product_id))
+            ''', (name, to_rupiah(price), description, product_id))
             
             if cursor.rowcount > 0:
                 conn.commit()
@@ -428,7 +1225,7 @@ class Database:
     
     def delete_product(self, product_id):
         """Delete product if not used in invoices"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         cursor = conn.cursor()
         
         try:
@@ -444,9 +1241,15 @@ class Database:
             
             product_name = result[0]
             
-            # Check if product is used in invoice items (by name matching)
-            cursor.execute('SELECT COUNT(*) FROM invoice_items WHERE product_name = ?', (product_name,))
+            # Check if product is used in invoice items
+            cursor.execute('SELECT COUNT(DISTINCT invoice_id) FROM invoice_items WHERE product_id = ?', (product_id,))
             usage_count = cursor.fetchone()[0]
+            for year in self.get_archive_years():
+                self.attach_archive(conn, year)
+                cursor.execute('SELECT COUNT(DISTINCT invoice_id) FROM archive.invoice_items WHERE product_id = ?',
+                               (product_id,))
+                usage_count += cursor.fetchone()[0]
+                cursor.execute('DETACH DATABASE archive')
             
             if usage_count > 0:
                 conn.close()
@@ -475,7 +1278,7 @@ class Database:
     
     def get_product_by_id(self, product_id):
         """Get product details by ID"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('SELECT * FROM products WHERE id = ?', (product_id,))
@@ -494,42 +1297,37 @@ class Database:
     
     def get_company_settings(self):
         """Get company settings"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('SELECT * FROM company_settings ORDER BY id DESC LIMIT 1')
         result = cursor.fetchone()
+        # Look columns up by name: older databases gained some of them via ALTER TABLE
+        columns = [column[0] for column in cursor.description]
         conn.close()
         
         if result:
-            # Handle different column counts for backward compatibility
-            settings = {
-                'id': result[0],
-                'name': result[1],
-                'address': result[2],
-                'phone': result[3],
-                'email': result[4],
-                'website': result[5] if len(result) > 5 else '',
-                'npwp': result[6] if len(result) > 6 else '',
-                'default_tax_rate': result[7] if len(result) > 7 else 11.0,
-                'default_due_days': result[8] if len(result) > 8 else 30,
-                'invoice_template': 'classic',  # Default value
-                'updated_at': result[-1]  # Last column is always updated_at
+            row = dict(zip(columns, result))
+            return {
+                'id': row['id'],
+                'name': row['name'],
+                'address': row['address'],
+                'phone': row['phone'],
+                'email': row['email'],
+                'website': row.get('website') or '',
+                'npwp': row.get('npwp') or '',
+                'default_tax_rate': row['default_tax_rate'] if row.get('default_tax_rate') is not None else 11.0,
+                'default_due_days': row['default_due_days'] if row.get('default_due_days') is not None else 30,
+                'invoice_template': row.get('invoice_template') or 'classic',
+                'logo': row.get('logo'),
+                'logo_version': row.get('logo_version'),
+                'updated_at': row.get('updated_at')
             }
-            
-            # Try to get invoice_template from the correct position
-            if len(result) >= 11:  # All columns including invoice_template
-                settings['invoice_template'] = result[10] if result[10] else 'classic'  # Fixed: invoice_template is at index 10
-                settings['updated_at'] = result[9]  # updated_at is at index 9
-            elif len(result) == 10:  # Missing invoice_template (old structure)
-                settings['updated_at'] = result[9]
-            
-            return settings
         return None
     
     def update_company_settings(self, name, address, phone, email, website="", npwp="", default_tax_rate=11.0, default_due_days=30, invoice_template="classic"):
         """Update company settings"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         cursor = conn.cursor()
         
         try:
@@ -568,4 +1366,357 @@ class Database:
             return {
                 'success': False,
                 'message': f'Error: {str(e)}'
-            }
\ No newline at end of file
+            }
+    
+    def update_company_logo(self, logo):
+        """Store a normalized logo image, or remove it when ``logo`` is None"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('SELECT id FROM company_settings ORDER BY id DESC LIMIT 1')
+            result = cursor.fetchone()
+            if result:
+                settings_id = result[0]
+            else:
+                cursor.execute('INSERT INTO company_settings (name) VALUES (?)', ('Nama Perusahaan Anda',))
+                settings_id = cursor.lastrowid
+            
+            cursor.execute('''
+                UPDATE company_settings
+                SET logo = ?, logo_version = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (sqlite3.Binary(logo) if logo else None, uuid.uuid4().hex if logo else None, settings_id))
+            conn.commit()
+            conn.close()
+            
+            return {
+                'success': True,
+                'message': 'Logo perusahaan berhasil disimpan!' if logo else 'Logo perusahaan dihapus'
+            }
+            
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            return {
+                'success': False,
+                'message': f'Error: {str(e)}'
+            }
+    
+    def create_job(self, job_type, params=None, owner=None):
+        """Register a new background job and return its ID"""
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            INSERT INTO jobs (id, job_type, owner, status, params)
+            VALUES (?, ?, ?, 'queued', ?)
+        ''', (job_id, job_type, owner, json.dumps(params or {}, default=str)))
+        
+        conn.commit()
+        conn.close()
+        return job_id
+    
+    def update_job(self, job_id, status=None, progress=None, total=None, result_path=None, error=None):
+        """Update status, progress or result of a background job"""
+        fields = {
+            'status': status,
+            'progress': progress,
+            'total': total,
+            'result_path': result_path,
+            'error': error
+        }
+        assignments = [f"{column} = ?" for column, value in fields.items() if value is not None]
+        params = [value for value in fields.values() if value is not None]
+        if not assignments:
+            return
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            UPDATE jobs
+            SET {', '.join(assignments)}, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', params + [job_id])
+        conn.commit()
+        conn.close()
+    
+    def claim_job(self, job_id):
+        """Atomically move a queued job to running; False if another worker took it"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE jobs SET status = 'running', updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'queued'
+        ''', (job_id,))
+        claimed = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return claimed
+    
+    def get_job(self, job_id):
+        """Get background job details by ID"""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+        result = cursor.fetchone()
+        conn.close()
+        
+        if result:
+            job = dict(result)
+            job['params'] = json.loads(job['params']) if job['params'] else {}
+            return job
+        return None
+    
+    def get_jobs(self, limit=20, job_type=None, owner=None):
+        """Get most recent background jobs, optionally only those of one owner"""
+        conn = self._connect()
+        query = "SELECT * FROM jobs WHERE 1=1"
+        params = []
+        if job_type:
+            query += " AND job_type = ?"
+            params.append(job_type)
+        if owner:
+            query += " AND owner = ?"
+            params.append(owner)
+        query += " ORDER BY created_at DESC, rowid DESC LIMIT ?"
+        params.append(limit)
+        
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        return df
+    
+    def log_email(self, invoice_id, recipient, status, attempts=1, error=None, message_id=None, batch_id=None):
+        """Record one invoice email delivery attempt and return its log ID"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO email_log (invoice_id, batch_id, recipient, status, attempts, error, message_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (invoice_id, batch_id, recipient, status, attempts, error, message_id))
+        log_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return log_id
+    
+    def get_email_log(self, limit=50, invoice_id=None, batch_id=None):
+        """Most recent email deliveries with their invoice numbers"""
+        conn = self._connect()
+        query = '''
+            SELECT l.id, l.created_at, i.invoice_number, l.recipient, l.status, l.attempts, l.error, l.batch_id
+            FROM email_log l
+            LEFT JOIN invoices i ON l.invoice_id = i.id
+            WHERE 1=1
+        '''
+        params = []
+        if invoice_id:
+            query += " AND l.invoice_id = ?"
+            params.append(invoice_id)
+        if batch_id:
+            query += " AND l.batch_id = ?"
+            params.append(batch_id)
+        query += " ORDER BY l.id DESC LIMIT ?"
+        params.append(limit)
+        
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        return df
+    
+    def get_emailed_invoice_ids(self, invoice_ids):
+        """Subset of ``invoice_ids`` that were already emailed successfully"""
+        if not invoice_ids:
+            return set()
+        conn = self._connect()
+        cursor = conn.cursor()
+        found = set()
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(invoice_ids), 500):
+            chunk = [int(invoice_id) for invoice_id in invoice_ids[start:start + 500]]
+            cursor.execute(f'''
+                SELECT DISTINCT invoice_id FROM email_log
+                WHERE status = 'sent' AND invoice_id IN ({",".join("?" * len(chunk))})
+            ''', chunk)
+            found.update(row[0] for row in cursor.fetchall())
+        conn.close()
+        return found
+    
+    def requeue_interrupted_jobs(self, stale_seconds=300):
+        """Requeue jobs whose worker stopped reporting and return their IDs.
+        
+        Only jobs not updated for ``stale_seconds`` are touched, so jobs still
+        being rendered by a live worker are never picked up twice.
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT id FROM jobs
+            WHERE status IN ('queued', 'running')
+              AND updated_at < datetime('now', ?)
+            ORDER BY created_at, rowid
+        ''', (f'-{int(stale_seconds)} seconds',))
+        candidates = [row[0] for row in cursor.fetchall()]
+        
+        # Re-check staleness per row so two managers never requeue the same job
+        job_ids = []
+        for job_id in candidates:
+            cursor.execute('''
+                UPDATE jobs SET status = 'queued', updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status IN ('queued', 'running')
+                  AND updated_at < datetime('now', ?)
+            ''', (job_id, f'-{int(stale_seconds)} seconds'))
+            if cursor.rowcount > 0:
+                job_ids.append(job_id)
+        
+        conn.commit()
+        conn.close()
+        return job_ids
+    
+    def seconds_since_job_update(self, job_id):
+        """Seconds elapsed since a background job last reported progress"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT (julianday('now') - julianday(updated_at)) * 86400
+            FROM jobs WHERE id = ?
+        ''', (job_id,))
+        result = cursor.fetchone()
+        conn.close()
+        return result[0] if result and result[0] is not None else 0.0
+    
+    def delete_expired_jobs(self, max_age_days=7, keep_latest=200):
+        """Delete finished jobs older than ``max_age_days`` or beyond the newest ``keep_latest``.
+        
+        Returns the result file paths of the deleted jobs so the caller can remove them.
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT id, result_path FROM jobs
+            WHERE status IN ('done', 'failed')
+              AND (created_at < datetime('now', ?)
+                   OR id NOT IN (
+                       SELECT id FROM jobs
+                       ORDER BY created_at DESC, rowid DESC
+                       LIMIT ?
+                   ))
+        ''', (f'-{int(max_age_days)} days', keep_latest))
+        expired = cursor.fetchall()
+        
+        cursor.executemany('DELETE FROM jobs WHERE id = ?', [(job_id,) for job_id, _ in expired])
+        conn.commit()
+        conn.close()
+        return [result_path for _, result_path in expired if result_path]
+    
+    def register_change_consumer(self, consumer, from_latest=False):
+        """Register a change log consumer; it reads from the start of the log or only new changes"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO change_consumers (consumer, last_change_id)
+            SELECT ?, CASE WHEN ? THEN COALESCE(MAX(id), 0) ELSE 0 END FROM change_log
+        ''', (consumer, bool(from_latest)))
+        created = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return {
+            'success': True,
+            'message': f"Consumer '{consumer}' terdaftar" if created else f"Consumer '{consumer}' sudah terdaftar"
+        }
+    
+    def unregister_change_consumer(self, consumer):
+        """Remove a consumer so its offset no longer holds back compaction"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM change_consumers WHERE consumer = ?', (consumer,))
+        removed = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return {
+            'success': removed,
+            'message': f"Consumer '{consumer}' dihapus" if removed else f"Consumer '{consumer}' tidak ditemukan"
+        }
+    
+    def get_changes(self, consumer, limit=CHANGE_BATCH_SIZE):
+        """Next change log entries after the consumer's acknowledged offset, oldest first.
+        
+        Entries name the changed row (``table_name``, ``row_id``, and the invoice
+        in ``parent_id`` for items); read the current row to sync it. Call
+        ``ack_changes`` with the last ``id`` once the batch is processed.
+        """
+        conn = self._connect()
+        df = pd.read_sql_query('''
+            SELECT id, table_name, row_id, parent_id, operation, changed_at
+            FROM change_log
+            WHERE id > COALESCE((SELECT last_change_id FROM change_consumers WHERE consumer = ?), 0)
+            ORDER BY id
+            LIMIT ?
+        ''', conn, params=(consumer, limit))
+        conn.close()
+        return df
+    
+    def ack_changes(self, consumer, change_id):
+        """Store the consumer's offset; entries up to ``change_id`` are not returned again"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        # Offsets only move forward, so a late or repeated ack cannot replay changes
+        cursor.execute('''
+            UPDATE change_consumers
+            SET last_change_id = MAX(last_change_id, ?), updated_at = CURRENT_TIMESTAMP
+            WHERE consumer = ?
+        ''', (int(change_id), consumer))
+        updated = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        
+        if not updated:
+            return {
+                'success': False,
+                'message': f"Consumer '{consumer}' belum terdaftar"
+            }
+        return {
+            'success': True,
+            'message': f"Perubahan sampai ID {int(change_id)} dikonfirmasi"
+        }
+    
+    def get_change_consumers(self):
+        """Registered consumers with their offset and number of pending changes"""
+        conn = self._connect()
+        df = pd.read_sql_query('''
+            SELECT c.consumer, c.last_change_id, c.updated_at,
+                   (SELECT COUNT(*) FROM change_log l WHERE l.id > c.last_change_id) AS pending
+            FROM change_consumers c
+            ORDER BY c.consumer
+        ''', conn)
+        conn.close()
+        return df
+    
+    def compact_change_log(self, batch_size=50000):
+        """Delete entries acknowledged by every registered consumer; returns how many were removed.
+        
+        Without any registered consumer nothing is removed, so a consumer
+        registered later can still read the log from the start.
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT MIN(last_change_id) FROM change_consumers')
+        acknowledged = cursor.fetchone()[0]
+        removed = 0
+        
+        # Short transactions, so writers are not held up by a large backlog
+        while acknowledged:
+            cursor.execute('''
+                DELETE FROM change_log
+                WHERE id IN (SELECT id FROM change_log WHERE id <= ? ORDER BY id LIMIT ?)
+            ''', (acknowledged, batch_size))
+            conn.commit()
+            removed += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                break
+        conn.close()
+        return removed
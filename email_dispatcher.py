@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Pengiriman invoice massal lewat email.
+
+``EmailDispatcher`` mengirim PDF invoice ke alamat email customer melalui
+beberapa koneksi SMTP yang dibuka sekali dan dipakai ulang untuk banyak pesan
+(bukan satu koneksi + login per email). Laju kirim dibatasi token bucket,
+kegagalan sementara (4xx, koneksi putus) dicoba ulang dengan jeda yang makin
+panjang, dan setiap hasil dicatat di tabel ``email_log``. Invoice yang sudah
+pernah terkirim dilewati kecuali diminta kirim ulang.
+
+Konfigurasi SMTP lewat environment variable:
+    INVOICE_SMTP_HOST, INVOICE_SMTP_PORT, INVOICE_SMTP_USER, INVOICE_SMTP_PASSWORD,
+    INVOICE_SMTP_STARTTLS=1, INVOICE_SMTP_SENDER (default: email perusahaan),
+    INVOICE_SMTP_POOL_SIZE, INVOICE_SMTP_RATE (pesan per detik, 0 = tanpa batas)
+
+Jalankan:  python email_dispatcher.py send --status Sent
+           python email_dispatcher.py benchmark --invoices 200   (memakai smtp_debug_server.py)
+"""
+
+import argparse
+import os
+import queue
+import smtplib
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from email.message import EmailMessage
+from email.utils import formataddr, make_msgid
+
+from database import Database
+from invoice_export import safe_pdf_filename
+
+SMTP_HOST = os.environ.get('INVOICE_SMTP_HOST', 'localhost')
+SMTP_PORT = int(os.environ.get('INVOICE_SMTP_PORT', '25'))
+SMTP_USER = os.environ.get('INVOICE_SMTP_USER') or None
+SMTP_PASSWORD = os.environ.get('INVOICE_SMTP_PASSWORD') or None
+SMTP_STARTTLS = os.environ.get('INVOICE_SMTP_STARTTLS', '0') == '1'
+SMTP_SENDER = os.environ.get('INVOICE_SMTP_SENDER') or None
+SMTP_POOL_SIZE = int(os.environ.get('INVOICE_SMTP_POOL_SIZE', '3'))
+SMTP_RATE_PER_SECOND = float(os.environ.get('INVOICE_SMTP_RATE', '5'))
+SMTP_TIMEOUT_SECONDS = 30
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY_SECONDS = 1.0
+
+# Pooled connections idle longer than this are checked with NOOP before reuse
+IDLE_CHECK_SECONDS = 30
+
+# Attachments are rendered with the small output profile
+EMAIL_PDF_PROFILE = 'compact'
+
+
+class RateLimiter:
+    """Token bucket shared by all sending threads"""
+
+    def __init__(self, rate_per_second, burst=None):
+        self.rate = rate_per_second
+        self.capacity = burst or max(1.0, rate_per_second)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until one message may be sent"""
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SMTPConnectionPool:
+    """A fixed number of SMTP connections, opened on first use and then reused"""
+
+    def __init__(self, host, port, size=SMTP_POOL_SIZE, username=None, password=None,
+                 starttls=False, timeout=SMTP_TIMEOUT_SECONDS):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.opened = 0
+        # Each slot holds (connection, last_used) or None until it is first needed
+        self._slots = queue.Queue()
+        for _ in range(size):
+            self._slots.put(None)
+
+    def _open(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.starttls:
+                smtp.starttls()
+                smtp.ehlo()
+            if self.username:
+                smtp.login(self.username, self.password or '')
+        except Exception:
+            _close_quietly(smtp)
+            raise
+        self.opened += 1
+        return smtp
+
+    def _is_alive(self, smtp):
+        try:
+            return smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection; it is dropped instead of returned if it broke"""
+        slot = self._slots.get()
+        smtp = None
+        try:
+            if slot is not None:
+                smtp, last_used = slot
+                if time.monotonic() - last_used > IDLE_CHECK_SECONDS and not self._is_alive(smtp):
+                    _close_quietly(smtp)
+                    smtp = None
+            if smtp is None:
+                smtp = self._open()
+            yield smtp
+        except (smtplib.SMTPServerDisconnected, OSError):
+            _close_quietly(smtp)
+            smtp = None
+            raise
+        finally:
+            self._slots.put((smtp, time.monotonic()) if smtp is not None else None)
+
+    def close(self):
+        """QUIT every open connection"""
+        slots = []
+        while True:
+            try:
+                slots.append(self._slots.get_nowait())
+            except queue.Empty:
+                break
+        for slot in slots:
+            if slot is not None:
+                _close_quietly(slot[0], quit=True)
+            self._slots.put(None)
+
+
+def _close_quietly(smtp, quit=False):
+    if smtp is None:
+        return
+    try:
+        if quit:
+            smtp.quit()
+        else:
+            smtp.close()
+    except (smtplib.SMTPException, OSError):
+        smtp.close()
+
+
+def is_transient_error(error):
+    """True if sending may succeed when retried later"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, OSError))
+
+
+def build_invoice_email(invoice_data, recipient, company_settings, sender, pdf_data):
+    """Email with a short Indonesian message and the invoice PDF attached"""
+    company_name = (company_settings or {}).get('name') or "Kami"
+    invoice_number = invoice_data['invoice_number']
+
+    message = EmailMessage()
+    message['From'] = formataddr((company_name, sender))
+    message['To'] = formataddr((invoice_data.get('customer_name') or '', recipient))
+    message['Subject'] = f"Invoice {invoice_number} dari {company_name}"
+    message['Message-ID'] = make_msgid(domain=sender.rpartition('@')[2] or None)
+    message.set_content(
+        f"Yth. {invoice_data.get('customer_name') or 'Pelanggan'},\n\n"
+        f"Terlampir invoice {invoice_number} tanggal {invoice_data['issue_date']} "
+        f"sebesar Rp {invoice_data['total']:,.0f}, jatuh tempo {invoice_data['due_date']}.\n\n"
+        f"Terima kasih atas kepercayaan Anda.\n\n"
+        f"Hormat kami,\n{company_name}\n"
+    )
+    message.add_attachment(pdf_data, maintype='application', subtype='pdf',
+                           filename=safe_pdf_filename(invoice_number))
+    return message
+
+
+class EmailDispatcher:
+    """Send invoice PDFs to customers over a pool of persistent SMTP connections"""
+
+    def __init__(self, db, host=SMTP_HOST, port=SMTP_PORT, sender=SMTP_SENDER, username=SMTP_USER,
+                 password=SMTP_PASSWORD, starttls=SMTP_STARTTLS, pool_size=SMTP_POOL_SIZE,
+                 rate_per_second=SMTP_RATE_PER_SECOND, max_attempts=MAX_ATTEMPTS,
+                 retry_delay=RETRY_DELAY_SECONDS):
+        self.db = db
+        self.sender = sender
+        self.pool_size = max(1, pool_size)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.rate_limiter = RateLimiter(rate_per_second)
+        self.pool = SMTPConnectionPool(host, port, self.pool_size, username, password, starttls)
+        self._local = threading.local()
+
+    def _generator(self):
+        # Generators keep per-render state, so each sending thread gets its own
+        generator = getattr(self._local, 'generator', None)
+        if generator is None:
+            from template_pdf_generator import TemplatedInvoicePDFGenerator
+            generator = self._local.generator = TemplatedInvoicePDFGenerator()
+        return generator
+
+    def _send(self, message):
+        """Send one message with retries; returns ``(status, attempts, error)``"""
+        for attempt in range(1, self.max_attempts + 1):
+            self.rate_limiter.acquire()
+            try:
+                with self.pool.connection() as smtp:
+                    smtp.send_message(message)
+                return 'sent', attempt, None
+            except (smtplib.SMTPException, OSError) as e:
+                error = e
+                if not is_transient_error(e) or attempt == self.max_attempts:
+                    break
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+        return 'failed', attempt, _describe_error(error)
+
+    def _deliver(self, invoice_id, company_settings, template, sender, pdf_data=None):
+        invoice_data, items_data = self.db.get_invoice_details(invoice_id)
+        if invoice_data is None:
+            return {'invoice_id': invoice_id, 'invoice_number': None, 'recipient': None,
+                    'status': 'failed', 'attempts': 0, 'error': "Invoice tidak ditemukan", 'message_id': None}
+
+        email = invoice_data.get('email')
+        result = {'invoice_id': invoice_id, 'invoice_number': invoice_data['invoice_number'],
+                  'recipient': email.strip() if isinstance(email, str) and email.strip() else None,
+                  'status': 'skipped', 'attempts': 0,
+                  'error': None, 'message_id': None}
+        if not result['recipient']:
+            result['error'] = "Customer belum punya alamat email"
+            return result
+
+        # Rendered once per invoice; retries resend the same bytes
+        if pdf_data is None:
+            pdf_data = self._generator().create_invoice_pdf(invoice_data, items_data, company_settings,
+                                                            template, profile=EMAIL_PDF_PROFILE)
+        message = build_invoice_email(invoice_data, result['recipient'], company_settings, sender, pdf_data)
+        result['message_id'] = message['Message-ID']
+        result['status'], result['attempts'], result['error'] = self._send(message)
+        return result
+
+    def dispatch(self, invoice_ids, template=None, resend=False, pdfs=None, progress_callback=None):
+        """Email the given invoices and record every outcome in ``email_log``.
+
+        ``pdfs`` maps invoice IDs to already rendered PDFs that are reused as is.
+        Invoices that were emailed before are skipped unless ``resend`` is set.
+        """
+        invoice_ids = [int(invoice_id) for invoice_id in dict.fromkeys(invoice_ids)]
+        company_settings = self.db.get_company_settings()
+        sender = self.sender or (company_settings or {}).get('email')
+        if not sender:
+            return {'success': False, 'message': "Alamat email pengirim belum diatur"}
+        if template is None:
+            template = company_settings.get('invoice_template', 'classic') if company_settings else 'classic'
+        pdfs = pdfs or {}
+
+        batch_id = uuid.uuid4().hex
+        already_sent = set() if resend else self.db.get_emailed_invoice_ids(invoice_ids)
+        results = []
+
+        def record(result):
+            results.append(result)
+            self.db.log_email(result['invoice_id'], result['recipient'], result['status'], result['attempts'],
+                              result['error'], result['message_id'], batch_id=batch_id)
+            if progress_callback:
+                progress_callback(len(results), len(invoice_ids))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="email") as executor:
+            futures = {}
+            for invoice_id in invoice_ids:
+                if invoice_id in already_sent:
+                    record({'invoice_id': invoice_id, 'invoice_number': None, 'recipient': None,
+                            'status': 'skipped', 'attempts': 0, 'error': "Sudah pernah dikirim",
+                            'message_id': None})
+                    continue
+                future = executor.submit(self._deliver, invoice_id, company_settings, template,
+                                         sender, pdfs.get(invoice_id))
+                futures[future] = invoice_id
+
+            # Results are logged from this thread only, so SQLite sees one writer
+            for future in as_completed(futures):
+                try:
+                    record(future.result())
+                except Exception as e:
+                    record({'invoice_id': futures[future], 'invoice_number': None, 'recipient': None, 'status': 'failed',
+                            'attempts': 0, 'error': str(e), 'message_id': None})
+        seconds = time.perf_counter() - started
+
+        counts = {status: sum(1 for result in results if result['status'] == status)
+                  for status in ('sent', 'failed', 'skipped')}
+        return {
+            'success': counts['failed'] == 0,
+            'message': f"{counts['sent']} email terkirim, {counts['failed']} gagal, {counts['skipped']} dilewati",
+            'batch_id': batch_id,
+            **counts,
+            'results': results,
+            'seconds': seconds,
+            'messages_per_second': counts['sent'] / seconds if seconds > 0 else 0.0,
+            'connections_opened': self.pool.opened
+        }
+
+    def close(self):
+        self.pool.close()
+
+
+def _describe_error(error):
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return "; ".join(f"{address}: {code} {reply.decode('utf-8', 'replace')}"
+                         for address, (code, reply) in error.recipients.items())
+    if isinstance(error, smtplib.SMTPResponseException):
+        reply = error.smtp_error
+        return f"{error.smtp_code} {reply.decode('utf-8', 'replace') if isinstance(reply, bytes) else reply}"
+    return str(error) or error.__class__.__name__
+
+
+def run_benchmark(invoices=100, items=10, pool_sizes=(1, 2, 4), rate_per_second=0):
+    """Messages per second against a local debug SMTP server for each pool size"""
+    from smtp_debug_server import SMTPDebugServer, start_in_thread
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, "benchmark.db"))
+        db.update_company_settings("CV Sumber Rejeki", "Surabaya", "+62 31 555 0101", "halo@sumberrejeki.co.id")
+        line_items = [{'product_name': f"Kopi Arabika {line + 1} kg", 'quantity': 1 + line % 4,
+                       'unit_price': 85000} for line in range(items)]
+        invoice_ids = []
+        for number in range(invoices):
+            customer_id = db.add_customer(f"PT Pelanggan {number}", f"pelanggan{number}@example.com")
+            invoice_ids.append(db.create_invoice(customer_id, line_items, '2025-03-01', '2025-03-31')[0])
+
+        for pool_size in pool_sizes:
+            server = SMTPDebugServer(port=0)
+            stop = start_in_thread(server)
+            dispatcher = EmailDispatcher(db, '127.0.0.1', server.port, pool_size=pool_size,
+                                         rate_per_second=rate_per_second)
+            try:
+                outcome = dispatcher.dispatch(invoice_ids, resend=True)
+            finally:
+                dispatcher.close()
+                stop()
+            results.append({
+                'pool_size': pool_size,
+                'sent': outcome['sent'],
+                'messages_per_second': outcome['messages_per_second'],
+                'connections': server.connections
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kirim invoice lewat email")
+    parser.add_argument('--db', default="invoice_system.db", help="Path database SQLite")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    send_parser = subparsers.add_parser('send', help="Kirim invoice sesuai filter")
+    send_parser.add_argument('--start-date')
+    send_parser.add_argument('--end-date')
+    send_parser.add_argument('--customer-id', type=int)
+    send_parser.add_argument('--status')
+    send_parser.add_argument('--template')
+    send_parser.add_argument('--resend', action='store_true', help="Kirim ulang invoice yang sudah terkirim")
+
+    benchmark_parser = subparsers.add_parser('benchmark', help="Ukur pesan per detik ke SMTP debug server")
+    benchmark_parser.add_argument('--invoices', type=int, default=100)
+    benchmark_parser.add_argument('--items', type=int, default=10)
+    benchmark_parser.add_argument('--pool-sizes', default="1,2,4")
+    args = parser.parse_args()
+
+    if args.command == 'benchmark':
+        pool_sizes = [int(size) for size in args.pool_sizes.split(',')]
+        print(f"{'pool':>4} {'terkirim':>9} {'pesan/detik':>12} {'koneksi':>8}")
+        for row in run_benchmark(args.invoices, args.items, pool_sizes):
+            print(f"{row['pool_size']:>4} {row['sent']:>9} {row['messages_per_second']:>12.1f} {row['connections']:>8}")
+        return
+
+    db = Database(args.db)
+    invoices_df = db.get_invoices(start_date=args.start_date, end_date=args.end_date,
+                                  customer_id=args.customer_id, status=args.status)
+    dispatcher = EmailDispatcher(db)
+    try:
+        outcome = dispatcher.dispatch(invoices_df['id'].tolist(), template=args.template, resend=args.resend)
+    finally:
+        dispatcher.close()
+    print(("✅ " if outcome['success'] else "❌ ") + outcome['message'])
+    if 'seconds' in outcome:
+        print(f"⏱️ {outcome['seconds']:.1f} detik, {outcome['messages_per_second']:.1f} pesan/detik")
+    for result in outcome.get('results', []):
+        if result['status'] == 'failed':
+            print(f"  - {result['invoice_number'] or result['invoice_id']}: {result['error']}")
+
+
+if __name__ == "__main__":
+    main()
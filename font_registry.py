@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Font TrueType untuk PDF invoice.
+
+Font base-14 (Helvetica) hanya mendukung Latin-1, sehingga sebagian karakter
+pada nama dan alamat customer tidak tercetak. Modul ini mendaftarkan satu
+keluarga font TrueType (DejaVu Sans, Noto Sans, atau Vera bawaan ReportLab)
+sekali per proses; metrik font yang sudah di-parse dipakai ulang oleh semua
+generator. ReportLab hanya menanamkan glyph yang benar-benar dipakai
+(subset), sehingga ukuran PDF tetap kecil.
+
+Pilih font lewat environment variable ``INVOICE_PDF_FONT``: ``auto``
+(default), nama keluarga (``DejaVuSans``, ``NotoSans``, ``Vera``), atau
+``Helvetica`` untuk font base-14 tanpa embedding. Folder font tambahan
+bisa diberikan lewat ``INVOICE_FONT_DIR``.
+
+Jalankan:  python font_registry.py benchmark --renders 20
+"""
+
+import argparse
+import os
+import threading
+import time
+from collections import namedtuple
+
+import reportlab
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+
+FontFamily = namedtuple('FontFamily', ['name', 'regular', 'bold', 'italic', 'bold_italic', 'embedded'])
+
+BASE14_FAMILY = FontFamily('Helvetica', 'Helvetica', 'Helvetica-Bold', 'Helvetica-Oblique',
+                           'Helvetica-BoldOblique', False)
+
+# Preferred families first; Vera ships with ReportLab so one is always available
+FONT_FAMILIES = {
+    'DejaVuSans': ('DejaVuSans.ttf', 'DejaVuSans-Bold.ttf', 'DejaVuSans-Oblique.ttf', 'DejaVuSans-BoldOblique.ttf'),
+    'NotoSans': ('NotoSans-Regular.ttf', 'NotoSans-Bold.ttf', 'NotoSans-Italic.ttf', 'NotoSans-BoldItalic.ttf'),
+    'Vera': ('Vera.ttf', 'VeraBd.ttf', 'VeraIt.ttf', 'VeraBI.ttf'),
+}
+
+FONT_DIRS = [
+    os.environ.get('INVOICE_FONT_DIR', ''),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fonts'),
+    '/usr/share/fonts/truetype/dejavu',
+    '/usr/share/fonts/truetype/noto',
+    '/usr/share/fonts/dejavu',
+    '/usr/share/fonts/noto',
+    '/usr/share/fonts/TTF',
+    '/Library/Fonts',
+    os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts'),
+    os.path.join(os.path.dirname(reportlab.__file__), 'fonts'),
+]
+
+PDF_FONT = os.environ.get('INVOICE_PDF_FONT', 'auto')
+
+_lock = threading.Lock()
+_families = {}
+
+
+def find_font_file(file_name):
+    """Path of a font file in the first font folder that has it, or None"""
+    for directory in FONT_DIRS:
+        if directory:
+            path = os.path.join(directory, file_name)
+            if os.path.isfile(path):
+                return path
+    return None
+
+
+def _register_family(name):
+    files = [find_font_file(file_name) for file_name in FONT_FAMILIES[name]]
+    if files[0] is None:
+        return None
+
+    # Missing styles fall back to the regular (or bold) face
+    regular_path, bold_path, italic_path, bold_italic_path = files
+    bold_path = bold_path or regular_path
+    italic_path = italic_path or regular_path
+    bold_italic_path = bold_italic_path or bold_path
+
+    family = FontFamily(name, name, f"{name}-Bold", f"{name}-Italic", f"{name}-BoldItalic", True)
+    try:
+        for font_name, path in zip(family[1:5], (regular_path, bold_path, italic_path, bold_italic_path)):
+            pdfmetrics.registerFont(TTFont(font_name, path))
+    except (TTFError, OSError):
+        return None
+
+    # Also maps <b>/<i> in paragraphs to the matching face
+    pdfmetrics.registerFontFamily(name, normal=family.regular, bold=family.bold,
+                                  italic=family.italic, boldItalic=family.bold_italic)
+    return family
+
+
+def get_font_family(preference=None):
+    """Registered font family for PDFs; TrueType files are parsed once per process"""
+    preference = preference or PDF_FONT
+    with _lock:
+        if preference in _families:
+            return _families[preference]
+
+        if preference.lower() == 'helvetica':
+            family = BASE14_FAMILY
+        else:
+            names = [preference] if preference in FONT_FAMILIES else list(FONT_FAMILIES)
+            family = None
+            for name in names:
+                family = _families.get(name) or _register_family(name)
+                if family:
+                    _families[name] = family
+                    break
+            family = family or BASE14_FAMILY
+
+        _families[preference] = family
+        return family
+
+
+def apply_font_family(styles, family):
+    """Point a ReportLab stylesheet's base-14 Helvetica styles at ``family``"""
+    replacements = {
+        BASE14_FAMILY.regular: family.regular,
+        BASE14_FAMILY.bold: family.bold,
+        BASE14_FAMILY.italic: family.italic,
+        BASE14_FAMILY.bold_italic: family.bold_italic,
+    }
+    for style in styles.byName.values():
+        font_name = getattr(style, 'fontName', None)
+        if font_name in replacements:
+            style.fontName = replacements[font_name]
+    return styles
+
+
+def run_benchmark(renders=20, items=30, templates=None):
+    """Average render time and PDF size per template, base-14 versus TrueType fonts"""
+    import pandas as pd
+    from template_pdf_generator import TemplatedInvoicePDFGenerator
+
+    invoice_data = {
+        'invoice_number': 'INV-BENCH-0001', 'issue_date': '2025-01-01', 'due_date': '2025-01-31',
+        'customer_name': 'CV Ŝukses Jaya — Ibu Siti Nurhaliza', 'customer_address': 'Jl. Merdeka № 17, Bandung',
+        'customer_email': 'siti@example.com', 'customer_phone': '+62 812 0000 0000',
+        'subtotal': items * 25000, 'tax_rate': 0.11, 'tax_amount': items * 2750, 'total': items * 27750,
+        'notes': 'Pembayaran via transfer', 'status': 'Sent'
+    }
+    items_data = pd.DataFrame([
+        {'product_name': f"Kopi Arabika Gayo №{i}", 'quantity': 1, 'unit_price': 25000, 'total_price': 25000}
+        for i in range(items)
+    ])
+
+    results = []
+    for family in (BASE14_FAMILY, get_font_family()):
+        generator = TemplatedInvoicePDFGenerator(metrics=None, font_family=family)
+        for template in templates or list(generator.templates):
+            generator.create_invoice_pdf(invoice_data, items_data, None, template)
+            started = time.perf_counter()
+            for _ in range(renders):
+                pdf_data = generator.create_invoice_pdf(invoice_data, items_data, None, template)
+            results.append({
+                'font': family.name,
+                'template': template,
+                'render_ms': (time.perf_counter() - started) / renders * 1000,
+                'size_kb': len(pdf_data) / 1024
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Font PDF invoice")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('show', help="Tampilkan font yang dipakai")
+    benchmark_parser = subparsers.add_parser('benchmark', help="Bandingkan waktu render dan ukuran PDF")
+    benchmark_parser.add_argument('--renders', type=int, default=20)
+    benchmark_parser.add_argument('--items', type=int, default=30)
+    args = parser.parse_args()
+
+    if args.command == 'show':
+        family = get_font_family()
+        print(f"{family.name}: {family.regular}, {family.bold}" + (" (TrueType, subset)" if family.embedded else ""))
+        return
+
+    for row in run_benchmark(args.renders, args.items):
+        print(f"{row['font']:<12} {row['template']:<10} {row['render_ms']:>7.1f} ms  {row['size_kb']:>7.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Bulk export invoice PDF ke arsip ZIP.
+
+PDF dirender satu per satu dan langsung ditulis ke stream ZIP di atas
+SpooledTemporaryFile, sehingga pemakaian memori tetap terbatas dan byte
+pertama arsip sudah tersedia sebelum invoice terakhir selesai dirender.
+"""
+
+import io
+import re
+import tempfile
+import zipfile
+
+# Arsip pindah dari memori ke file temporary setelah melewati batas ini
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+
+class _ZipStreamSink(io.RawIOBase):
+    """Writable, non-seekable view of a spool file.
+
+    Because seek() is unsupported, zipfile writes each entry sequentially
+    with a trailing data descriptor and never rewrites bytes that were
+    already handed out to the consumer.
+    """
+
+    def __init__(self, spool):
+        self.spool = spool
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.spool.seek(self.position)
+        written = self.spool.write(data)
+        self.position += written
+        return written
+
+    def tell(self):
+        return self.position
+
+    def seekable(self):
+        return False
+
+    def seek(self, *args):
+        raise io.UnsupportedOperation("seek")
+
+    def flush(self):
+        self.spool.flush()
+
+
+def safe_pdf_filename(invoice_number):
+    """Make invoice number safe to use as a ZIP entry name"""
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', str(invoice_number)) + '.pdf'
+
+
+def iter_invoice_zip(db, pdf_generator, invoices_df, company_settings=None, template=None,
+                     spool=None, progress_callback=None):
+    """Render invoices into a ZIP stream, yielding new archive bytes after each entry.
+
+    The complete archive is also kept in ``spool`` (a SpooledTemporaryFile is
+    created when not given) so callers can offer it as a single download.
+    The generator's return value is the number of PDFs actually written;
+    invoices that no longer exist are skipped.
+    """
+    if spool is None:
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    if company_settings is None:
+        company_settings = db.get_company_settings()
+    if template is None:
+        template = company_settings.get('invoice_template', 'classic') if company_settings else 'classic'
+
+    sink = _ZipStreamSink(spool)
+    read_position = 0
+    total = len(invoices_df)
+    written = 0
+
+    def drain():
+        nonlocal read_position
+        spool.seek(read_position)
+        chunk = spool.read(sink.position - read_position)
+        read_position = sink.position
+        return chunk
+
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for done, invoice_id in enumerate(invoices_df['id'], start=1):
+            invoice_data, items_data = db.get_invoice_details(int(invoice_id))
+            if invoice_data is None:
+                if progress_callback:
+                    progress_callback(done, total)
+                continue
+
+            pdf_data = pdf_generator.create_invoice_pdf(invoice_data, items_data, company_settings, template)
+            archive.writestr(safe_pdf_filename(invoice_data['invoice_number']), pdf_data)
+            written += 1
+
+            if progress_callback:
+                progress_callback(done, total)
+
+            chunk = drain()
+            if chunk:
+                yield chunk
+
+    # Central directory is written when the archive is closed
+    chunk = drain()
+    if chunk:
+        yield chunk
+
+    return written
+
+
+def write_invoice_zip(db, pdf_generator, invoices_df, spool, template=None, progress_callback=None):
+    """Write the whole archive into ``spool`` and return the number of PDFs written"""
+    stream = iter_invoice_zip(db, pdf_generator, invoices_df, template=template,
+                              spool=spool, progress_callback=progress_callback)
+    while True:
+        try:
+            next(stream)
+        except StopIteration as finished:
+            return finished.value
+
+
+def build_invoice_zip(db, pdf_generator, start_date=None, end_date=None, customer_id=None,
+                      status=None, template=None, progress_callback=None):
+    """Export filtered invoices as a ZIP archive.
+
+    Returns ``(spool, invoice_count)`` where ``spool`` is a file object
+    positioned at the start of the archive and ``invoice_count`` is the
+    number of PDFs it contains.
+    """
+    invoices_df = db.get_invoices(start_date=start_date, end_date=end_date,
+                                  customer_id=customer_id, status=status)
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+
+    invoice_count = write_invoice_zip(db, pdf_generator, invoices_df, spool,
+                                      template=template, progress_callback=progress_callback)
+
+    spool.seek(0)
+    return spool, invoice_count
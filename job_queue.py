@@ -0,0 +1,266 @@
+"""
+Background job subsystem untuk render PDF, export dan pengiriman email invoice.
+
+Job disimpan di tabel ``jobs`` sehingga status, progress, dan hasilnya tetap
+bisa dibaca setelah browser di-refresh. Setiap job punya ``owner`` (token
+sesi browser) supaya sesi lain tidak bisa melihat atau mengunduh hasilnya.
+Worker berjalan di thread pool (atau process pool) di luar script run
+Streamlit.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from database import Database
+from invoice_export import safe_pdf_filename, write_invoice_zip
+
+JOB_OUTPUT_DIR = "job_output"
+
+# Queued/running jobs without any update for this long are considered orphaned
+STALE_JOB_SECONDS = 300
+
+# Finished jobs (and their files) are kept this long, up to this many jobs
+JOB_RETENTION_DAYS = 7
+JOB_RETENTION_COUNT = 200
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _render_invoice_job(db, job_id, params, output_dir):
+    """Render a single invoice PDF to the job output directory"""
+    from template_pdf_generator import TemplatedInvoicePDFGenerator
+
+    db.update_job(job_id, total=1)
+    invoice_data, items_data = db.get_invoice_details(params['invoice_id'])
+    if invoice_data is None:
+        raise ValueError(f"Invoice {params['invoice_id']} tidak ditemukan")
+
+    company_settings = db.get_company_settings()
+    template = params.get('template') or (
+        company_settings.get('invoice_template', 'classic') if company_settings else 'classic'
+    )
+    pdf_data = TemplatedInvoicePDFGenerator().create_invoice_pdf(
+        invoice_data, items_data, company_settings, template
+    )
+
+    result_path = os.path.join(output_dir, f"{job_id}_{safe_pdf_filename(invoice_data['invoice_number'])}")
+    try:
+        with open(result_path, 'wb') as f:
+            f.write(pdf_data)
+    except Exception:
+        _remove_file(result_path)
+        raise
+
+    db.update_job(job_id, progress=1)
+    return result_path
+
+
+def _export_zip_job(db, job_id, params, output_dir):
+    """Render filtered invoices into a ZIP archive in the job output directory"""
+    from template_pdf_generator import TemplatedInvoicePDFGenerator
+
+    invoices_df = db.get_invoices(
+        start_date=params.get('start_date'),
+        end_date=params.get('end_date'),
+        customer_id=params.get('customer_id'),
+        status=params.get('status')
+    )
+    db.update_job(job_id, total=len(invoices_df))
+
+    def report_progress(done, total):
+        db.update_job(job_id, progress=done)
+
+    result_path = os.path.join(output_dir, f"{job_id}.zip")
+    try:
+        with open(result_path, 'w+b') as f:
+            write_invoice_zip(db, TemplatedInvoicePDFGenerator(), invoices_df, f,
+                              template=params.get('template'), progress_callback=report_progress)
+    except Exception:
+        # Never leave a truncated archive behind
+        _remove_file(result_path)
+        raise
+
+    return result_path
+
+
+def _send_email_job(db, job_id, params, output_dir):
+    """Email filtered invoices and write the per-invoice delivery report as CSV"""
+    import pandas as pd
+
+    from email_dispatcher import EmailDispatcher
+
+    invoices_df = db.get_invoices(
+        start_date=params.get('start_date'),
+        end_date=params.get('end_date'),
+        customer_id=params.get('customer_id'),
+        status=params.get('status')
+    )
+    db.update_job(job_id, total=len(invoices_df))
+
+    def report_progress(done, total):
+        db.update_job(job_id, progress=done)
+
+    dispatcher = EmailDispatcher(db)
+    try:
+        outcome = dispatcher.dispatch(invoices_df['id'].tolist(), template=params.get('template'),
+                                      resend=params.get('resend', False), progress_callback=report_progress)
+    finally:
+        dispatcher.close()
+    if 'results' not in outcome:
+        raise ValueError(outcome['message'])
+
+    result_path = os.path.join(output_dir, f"{job_id}_email.csv")
+    try:
+        pd.DataFrame(outcome['results'], columns=[
+            'invoice_number', 'recipient', 'status', 'attempts', 'error', 'message_id'
+        ]).to_csv(result_path, index=False)
+    except Exception:
+        _remove_file(result_path)
+        raise
+    return result_path
+
+
+def _generate_recurring_job(db, job_id, params, output_dir):
+    """Generate due recurring invoices; with ``render_pdf`` their PDFs are zipped too"""
+    import pandas as pd
+
+    from recurring import generate_recurring_invoices
+
+    result = generate_recurring_invoices(db, params.get('as_of'))
+    if not result['success']:
+        raise ValueError(result['message'])
+    invoice_ids = result['invoice_ids']
+    db.update_job(job_id, total=len(invoice_ids))
+
+    if params.get('render_pdf') and invoice_ids:
+        from template_pdf_generator import TemplatedInvoicePDFGenerator
+
+        def report_progress(done, total):
+            db.update_job(job_id, progress=done)
+
+        result_path = os.path.join(output_dir, f"{job_id}.zip")
+        try:
+            with open(result_path, 'w+b') as f:
+                write_invoice_zip(db, TemplatedInvoicePDFGenerator(), pd.DataFrame({'id': invoice_ids}), f,
+                                  template=params.get('template'), progress_callback=report_progress)
+        except Exception:
+            _remove_file(result_path)
+            raise
+        return result_path
+
+    result_path = os.path.join(output_dir, f"{job_id}_recurring.csv")
+    try:
+        db.get_invoices_by_ids(invoice_ids)[
+            ['invoice_number', 'customer_name', 'issue_date', 'due_date', 'total']
+        ].to_csv(result_path, index=False)
+    except Exception:
+        _remove_file(result_path)
+        raise
+    db.update_job(job_id, progress=len(invoice_ids))
+    return result_path
+
+
+JOB_HANDLERS = {
+    'render_invoice': _render_invoice_job,
+    'export_zip': _export_zip_job,
+    'send_email': _send_email_job,
+    'generate_recurring': _generate_recurring_job,
+}
+
+
+def run_job(db_name, job_id, output_dir=JOB_OUTPUT_DIR):
+    """Execute one queued job; module-level so it can run in a worker process"""
+    db = Database(db_name)
+    if not db.claim_job(job_id):
+        return
+
+    job = db.get_job(job_id)
+    try:
+        handler = JOB_HANDLERS[job['job_type']]
+        result_path = handler(db, job_id, job['params'], output_dir)
+        db.update_job(job_id, status='done', result_path=result_path)
+    except Exception as e:
+        db.update_job(job_id, status='failed', error=str(e))
+
+
+class JobManager:
+    """Accept render/export jobs and run them on background workers"""
+
+    def __init__(self, db_name="invoice_system.db", output_dir=JOB_OUTPUT_DIR,
+                 max_workers=2, use_processes=False, stale_seconds=STALE_JOB_SECONDS,
+                 retention_days=JOB_RETENTION_DAYS, retention_count=JOB_RETENTION_COUNT):
+        self.db_name = db_name
+        self.output_dir = os.path.abspath(output_dir)
+        self.db = Database(db_name)
+        self.stale_seconds = stale_seconds
+        self.retention_days = retention_days
+        self.retention_count = retention_count
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self.executor = executor_class(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._last_maintenance = 0.0
+
+        self.run_maintenance()
+
+    def _dispatch(self, job_id):
+        with self._lock:
+            self.executor.submit(run_job, self.db_name, job_id, self.output_dir)
+
+    def run_maintenance(self):
+        """Requeue orphaned jobs, delete expired jobs with their result files and compact the change log"""
+        self._last_maintenance = time.monotonic()
+
+        # Only jobs nobody has touched for stale_seconds, so a manager rebuilt
+        # while the old executor is still rendering does not render twice
+        for job_id in self.db.requeue_interrupted_jobs(self.stale_seconds):
+            self._dispatch(job_id)
+
+        for result_path in self.db.delete_expired_jobs(self.retention_days, self.retention_count):
+            _remove_file(result_path)
+
+        self.db.compact_change_log()
+
+    def _maybe_run_maintenance(self, interval=60):
+        if time.monotonic() - self._last_maintenance >= interval:
+            self.run_maintenance()
+
+    def submit(self, job_type, params=None, owner=None):
+        """Queue a job and return its ID"""
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"Tipe job tidak dikenal: {job_type}")
+
+        self._maybe_run_maintenance()
+        job_id = self.db.create_job(job_type, params, owner=owner)
+        self._dispatch(job_id)
+        return job_id
+
+    def get_job(self, job_id, owner=None):
+        """Get current status of a job; None if it belongs to another owner"""
+        job = self.db.get_job(job_id)
+        if job is None or (owner is not None and job['owner'] != owner):
+            return None
+        return job
+
+    def get_recent_jobs(self, limit=20, job_type=None, owner=None):
+        """Get most recent jobs as a DataFrame"""
+        self._maybe_run_maintenance()
+        return self.db.get_jobs(limit=limit, job_type=job_type, owner=owner)
+
+    def is_stale(self, job):
+        """True if a queued/running job has not reported progress recently"""
+        if job['status'] not in ('queued', 'running'):
+            return False
+        return self.db.seconds_since_job_update(job['id']) >= self.stale_seconds
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs and wait for running ones"""
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,135 @@
+"""
+Logo perusahaan untuk PDF invoice.
+
+Logo yang diunggah dinormalisasi sekali (PNG, sisi terpanjang dibatasi) lalu
+disimpan di ``company_settings``. Saat render, logo di-decode dan diperkecil
+dengan Pillow sesuai ukuran cetaknya hanya sekali per ``logo_version``;
+objek ``ImageReader`` yang sama dipakai ulang oleh semua render berikutnya,
+termasuk ratusan invoice dalam satu export ZIP.
+"""
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+from PIL import Image as PILImage, UnidentifiedImageError
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Flowable
+
+LOGO_MAX_UPLOAD_BYTES = 2 * 1024 * 1024
+LOGO_MAX_PIXELS = 800
+
+# Logos are downsampled to this resolution at their printed size
+LOGO_RENDER_DPI = 150
+
+LOGO_CACHE_ENTRIES = 16
+
+# Embedded as JPEG so documents copy the bytes instead of re-compressing raw pixels
+LOGO_JPEG_QUALITY = 92
+
+
+class _LogoReader(ImageReader):
+    """ImageReader that hands ReportLab a pre-encoded JPEG stream"""
+
+    def __init__(self, image, jpeg_data):
+        super().__init__(image)
+        self._jpeg_data = jpeg_data
+
+    def jpeg_fh(self):
+        # A fresh handle per call, as the reader is shared between threads
+        return io.BytesIO(self._jpeg_data)
+
+
+def normalize_logo(data):
+    """Validate an uploaded image and return it as a downscaled PNG"""
+    if len(data) > LOGO_MAX_UPLOAD_BYTES:
+        raise ValueError(f"Ukuran logo maksimal {LOGO_MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+    try:
+        image = PILImage.open(io.BytesIO(data))
+        image.load()
+    except (UnidentifiedImageError, OSError):
+        raise ValueError("File logo bukan gambar yang valid")
+
+    image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+    image.thumbnail((LOGO_MAX_PIXELS, LOGO_MAX_PIXELS), PILImage.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format='PNG', optimize=True)
+    return output.getvalue()
+
+
+class LogoCache:
+    """Decoded, downsampled logos keyed by logo version and printed size"""
+
+    def __init__(self, max_entries=LOGO_CACHE_ENTRIES, dpi=LOGO_RENDER_DPI):
+        self.max_entries = max_entries
+        self.dpi = dpi
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.decodes = 0
+
+    def get(self, logo, version, max_width, max_height):
+        """``(ImageReader, width, height)`` fitting a ``max_width`` x ``max_height`` points box"""
+        # Logos passed without a version (not from company_settings) are keyed by content
+        key = (version or hashlib.sha1(logo).hexdigest(), round(max_width, 2), round(max_height, 2))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._prepare(logo, max_width, max_height)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _prepare(self, logo, max_width, max_height):
+        image = PILImage.open(io.BytesIO(logo))
+        image.load()
+        self.decodes += 1
+
+        scale = min(max_width / image.width, max_height / image.height, 1.0)
+        width, height = image.width * scale, image.height * scale
+        pixels = (max(1, round(width / 72 * self.dpi)), max(1, round(height / 72 * self.dpi)))
+        if pixels[0] < image.width:
+            image = image.resize(pixels, PILImage.LANCZOS)
+
+        # Logos always sit on the white page, so transparency is flattened once here
+        if image.mode != 'RGB':
+            background = PILImage.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+            image = background
+        encoded = io.BytesIO()
+        image.save(encoded, format='JPEG', quality=LOGO_JPEG_QUALITY, subsampling=0)
+
+        reader = _LogoReader(image, encoded.getvalue())
+        # Decode to raw RGB once here rather than in every document that draws it
+        reader.getRGBData()
+        return reader, width, height
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+logo_cache = LogoCache()
+
+
+class LogoImage(Flowable):
+    """Draws a cached logo; the same ImageReader is shared by every render"""
+
+    def __init__(self, reader, width, height, h_align='CENTER'):
+        super().__init__()
+        self.reader = reader
+        self.width = width
+        self.height = height
+        self.hAlign = h_align
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height, mask='auto')
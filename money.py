@@ -0,0 +1,45 @@
+"""
+Perhitungan nominal uang dalam Rupiah bulat.
+
+Semua nominal disimpan sebagai INTEGER Rupiah, sehingga SUM di SQLite dan
+total di NumPy (int64) selalu eksak tanpa pembulatan float di laporan.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+# Tax rates are applied as integer parts-per-million, never as float products
+RATE_SCALE = 1_000_000
+
+
+def to_rupiah(value):
+    """Round an amount to whole Rupiah (half up)"""
+    if value is None:
+        return 0
+    return int(Decimal(str(value)).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def rate_to_ppm(tax_rate):
+    """Convert a tax rate fraction (0.11 = 11%) to integer parts-per-million"""
+    return to_rupiah(Decimal(str(tax_rate)) * RATE_SCALE)
+
+
+def compute_tax(subtotal, tax_rate):
+    """Tax in whole Rupiah for an integer subtotal, rounded half up"""
+    return (int(subtotal) * rate_to_ppm(tax_rate) + RATE_SCALE // 2) // RATE_SCALE
+
+
+def line_totals(quantities, unit_prices):
+    """Vectorized quantity x unit price as int64"""
+    return np.asarray(quantities, dtype=np.int64) * np.asarray(unit_prices, dtype=np.int64)
+
+
+def invoice_totals(items, tax_rate):
+    """Return ``(subtotal, tax_amount, total)`` in whole Rupiah for a list of item dicts"""
+    quantities = np.fromiter((int(item['quantity']) for item in items), dtype=np.int64, count=len(items))
+    unit_prices = np.fromiter((to_rupiah(item['unit_price']) for item in items), dtype=np.int64, count=len(items))
+
+    subtotal = int(line_totals(quantities, unit_prices).sum())
+    tax_amount = compute_tax(subtotal, tax_rate)
+    return subtotal, tax_amount, subtotal + tax_amount
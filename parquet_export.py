@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Export inkremental invoice dan item invoice ke Parquet untuk lakehouse.
+
+File ditulis per partisi tahun/bulan ``issue_date`` dengan layout Hive::
+
+    <out>/invoices/year=2025/month=03/part-000001.parquet
+    <out>/invoice_items/year=2025/month=03/part-000001.parquet
+
+Item ikut partisi invoice induknya. Setiap run hanya mengekspor baris dengan
+ID di atas high-water mark run sebelumnya, yang disimpan di
+``<out>/_export_state.json`` bersama ``created_at`` terakhir. ID dialokasikan
+berurutan di dalam lock tulis SQLite, sehingga tidak ada baris yang
+terlewat. Perubahan pada baris lama (misalnya status) tidak diekspor ulang.
+
+Data dibaca dari satu snapshot read-only per ``PARQUET_BATCH_ROWS`` baris
+dan setiap batch langsung ditulis sebagai row group, sehingga memori tetap
+terbatas berapa pun jumlah barisnya. File baru ditulis dengan nama
+sementara dan baru diganti namanya setelah semua partisi selesai; run yang
+gagal bisa diulang tanpa duplikasi karena nomor run baru naik setelah state
+tersimpan.
+
+Membutuhkan ``pip install pyarrow``.
+
+Jalankan:  python parquet_export.py --out invoice_system_parquet
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import time
+
+import query_metrics
+
+# Rows fetched from SQLite and written as one row group
+PARQUET_BATCH_ROWS = 100000
+
+PARQUET_STATE_FILE = "_export_state.json"
+
+# Columns per table; the partition month comes from the invoice issue date
+PARQUET_SOURCES = {
+    'invoices': '''
+        SELECT id, invoice_number, customer_id, issue_date, due_date, subtotal, tax_rate,
+               tax_amount, total, status, notes, created_at,
+               COALESCE(substr(issue_date, 1, 7), '0000-00') AS partition_month
+        FROM invoices
+        WHERE id > ? AND id <= ?
+        ORDER BY partition_month, id
+    ''',
+    'invoice_items': '''
+        SELECT ii.id, ii.invoice_id, ii.product_id, ii.product_name, ii.quantity, ii.unit_price,
+               ii.total_price, COALESCE(substr(i.issue_date, 1, 7), '0000-00') AS partition_month
+        FROM invoice_items ii
+        JOIN invoices i ON i.id = ii.invoice_id
+        WHERE ii.id > ? AND ii.id <= ?
+        ORDER BY partition_month, ii.id
+    ''',
+}
+
+
+def pyarrow_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def default_export_dir(db_name):
+    return os.path.splitext(db_name)[0] + "_parquet"
+
+
+def _schemas():
+    import pyarrow as pa
+
+    return {
+        'invoices': pa.schema([
+            ('id', pa.int64()), ('invoice_number', pa.string()), ('customer_id', pa.int64()),
+            ('issue_date', pa.date32()), ('due_date', pa.date32()), ('subtotal', pa.int64()),
+            ('tax_rate', pa.float64()), ('tax_amount', pa.int64()), ('total', pa.int64()),
+            ('status', pa.string()), ('notes', pa.string()), ('created_at', pa.timestamp('s')),
+        ]),
+        'invoice_items': pa.schema([
+            ('id', pa.int64()), ('invoice_id', pa.int64()), ('product_id', pa.int64()),
+            ('product_name', pa.string()), ('quantity', pa.int64()), ('unit_price', pa.int64()),
+            ('total_price', pa.int64()),
+        ]),
+    }
+
+
+def _column(values, field):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if pa.types.is_date32(field.type) or pa.types.is_timestamp(field.type):
+        # SQLite keeps dates as text; malformed values become null instead of failing the run
+        text = pa.array(values, pa.string())
+        if pa.types.is_date32(field.type):
+            text = pc.utf8_slice_codeunits(text, 0, 10)
+            parsed = pc.strptime(text, format='%Y-%m-%d', unit='s', error_is_null=True)
+        else:
+            parsed = pc.strptime(text, format='%Y-%m-%d %H:%M:%S', unit='s', error_is_null=True)
+        return parsed.cast(field.type)
+    return pa.array(values, field.type)
+
+
+def read_export_state(out_dir):
+    """High-water marks of the previous runs, or an empty state"""
+    path = os.path.join(out_dir, PARQUET_STATE_FILE)
+    if not os.path.exists(path):
+        return {'runs': 0, 'tables': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_state(out_dir, state):
+    path = os.path.join(out_dir, PARQUET_STATE_FILE)
+    with open(path + ".tmp", 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _export_table(cursor, table, schema, out_dir, run, low_id, high_id, batch_rows):
+    """Write the rows in (low_id, high_id] to one new file per partition; returns the pending files"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    cursor.execute(PARQUET_SOURCES[table], (low_id, high_id))
+    created_at_index = schema.get_field_index('created_at')
+    pending = []
+    writer = None
+    month = None
+    rows = 0
+    max_created_at = None
+
+    try:
+        while True:
+            batch = cursor.fetchmany(batch_rows)
+            if not batch:
+                break
+            start = 0
+            # Rows arrive sorted by month, so only one partition file is open at a time
+            while start < len(batch):
+                batch_month = batch[start][-1]
+                end = start
+                while end < len(batch) and batch[end][-1] == batch_month:
+                    end += 1
+
+                if batch_month != month:
+                    if writer:
+                        writer.close()
+                    month = batch_month
+                    year, month_number = month.split('-')
+                    partition_dir = os.path.join(out_dir, table, f"year={year}", f"month={month_number}")
+                    os.makedirs(partition_dir, exist_ok=True)
+                    path = os.path.join(partition_dir, f"part-{run:06d}.parquet")
+                    # Readers skip files starting with '.', so partial files are never picked up
+                    temp_path = os.path.join(partition_dir, f".part-{run:06d}.parquet.tmp")
+                    pending.append((temp_path, path))
+                    writer = pq.ParquetWriter(temp_path, schema, compression='zstd')
+
+                rows_slice = batch[start:end]
+                columns = [_column([row[index] for row in rows_slice], field)
+                           for index, field in enumerate(schema)]
+                writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+                if created_at_index >= 0:
+                    max_created_at = max(filter(None, [max_created_at] + [row[created_at_index] for row in rows_slice]),
+                                         default=None)
+                rows += end - start
+                start = end
+    except Exception:
+        if writer:
+            writer.close()
+        for temp_path, _ in pending:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        raise
+
+    if writer:
+        writer.close()
+    return pending, rows, max_created_at
+
+
+def export_parquet(db_name, out_dir=None, batch_rows=PARQUET_BATCH_ROWS):
+    """Append invoices and items created since the last run to the Parquet dataset in ``out_dir``"""
+    if not pyarrow_available():
+        return {
+            'success': False,
+            'message': "Export Parquet membutuhkan pyarrow (pip install pyarrow)"
+        }
+
+    out_dir = out_dir or default_export_dir(db_name)
+    os.makedirs(out_dir, exist_ok=True)
+    state = read_export_state(out_dir)
+    run = state['runs'] + 1
+    schemas = _schemas()
+    started = time.perf_counter()
+
+    # Invoices and items come from the same point in time
+    conn = query_metrics.connect(db_name, 'parquet_export', readonly=True)
+    conn.begin_snapshot()
+    pending = []
+    exported = {}
+    try:
+        cursor = conn.cursor()
+        for table in PARQUET_SOURCES:
+            marks = state['tables'].get(table, {})
+            low_id = marks.get('max_id', 0)
+            cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+            high_id = max(cursor.fetchone()[0], low_id)
+            files, rows, max_created_at = _export_table(
+                cursor, table, schemas[table], out_dir, run, low_id, high_id, batch_rows
+            )
+            pending.extend(files)
+            exported[table] = rows
+            state['tables'][table] = {
+                'max_id': high_id,
+                'max_created_at': max_created_at or marks.get('max_created_at'),
+                'rows': marks.get('rows', 0) + rows,
+            }
+    except Exception as e:
+        for temp_path, _ in pending:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return {
+            'success': False,
+            'message': f"Error export Parquet: {str(e)}"
+        }
+    finally:
+        conn.close()
+
+    for temp_path, path in pending:
+        os.replace(temp_path, path)
+    if pending:
+        state['runs'] = run
+    state['last_export'] = time.strftime('%Y-%m-%d %H:%M:%S')
+    _write_state(out_dir, state)
+
+    return {
+        'success': True,
+        'message': (f"{exported['invoices']:,} invoice dan {exported['invoice_items']:,} item "
+                    f"diekspor ke {out_dir}" if pending else "Tidak ada invoice baru untuk diekspor"),
+        'rows': exported,
+        'files': [path for _, path in pending],
+        'seconds': time.perf_counter() - started
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export inkremental invoice ke Parquet")
+    parser.add_argument('--db', default="invoice_system.db", help="Path database SQLite")
+    parser.add_argument('--out', help="Folder dataset Parquet (default: <db>_parquet)")
+    parser.add_argument('--batch-rows', type=int, default=PARQUET_BATCH_ROWS, help="Baris per row group")
+    args = parser.parse_args()
+
+    result = export_parquet(args.db, args.out, args.batch_rows)
+    print(("✅ " if result['success'] else "❌ ") + result['message'])
+    if result['success'] and result['files']:
+        print(f"   {len(result['files'])} file dalam {result['seconds']:.2f} detik")
+
+
+if __name__ == "__main__":
+    main()
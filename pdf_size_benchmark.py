@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark ukuran PDF invoice per template dan profil output.
+
+Setiap template dirender dengan profil ``default`` dan ``compact`` untuk
+sekumpulan invoice contoh (teks Latin biasa dan, opsional, teks dengan
+karakter di luar WinAnsi), lalu dilaporkan rata-rata byte per invoice.
+
+Jalankan:  python pdf_size_benchmark.py --invoices 20 --items 15
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from template_pdf_generator import PDF_PROFILES, TemplatedInvoicePDFGenerator
+
+SAMPLE_COMPANY = {
+    'name': 'CV Sumber Rejeki', 'address': 'Jl. Pahlawan No. 8\nSurabaya 60111',
+    'phone': '+62 31 555 0101', 'email': 'halo@sumberrejeki.co.id', 'npwp': '01.234.567.8-901.000'
+}
+
+
+def sample_invoices(count, items, unicode_text=False):
+    """``(invoice_data, items_data)`` pairs with realistic Indonesian content"""
+    customer_suffix = " — Ibu Siti Nurhaliza №" if unicode_text else " - Ibu Siti Nurhaliza No."
+    invoices = []
+    for number in range(1, count + 1):
+        items_data = pd.DataFrame([
+            {'product_name': f"Kopi Arabika Gayo {line + 1} kg", 'quantity': 1 + line % 4,
+             'unit_price': 85000 + line * 500, 'total_price': (1 + line % 4) * (85000 + line * 500)}
+            for line in range(items)
+        ])
+        subtotal = int(items_data['total_price'].sum())
+        invoices.append(({
+            'invoice_number': f"INV-20250301-{number:06d}", 'issue_date': '2025-03-01', 'due_date': '2025-03-31',
+            'status': 'Sent', 'customer_name': f"PT Pelanggan {number}{customer_suffix}{number}",
+            'address': f"Jl. Merdeka No. {number}, Bandung", 'phone': '+62 812 0000 0000',
+            'email': f"pelanggan{number}@example.com", 'subtotal': subtotal, 'tax_rate': 0.11,
+            'tax_amount': round(subtotal * 0.11), 'total': subtotal + round(subtotal * 0.11),
+            'notes': 'Pembayaran melalui transfer bank'
+        }, items_data))
+    return invoices
+
+
+def run_benchmark(invoices=20, items=15, unicode_text=False):
+    """Average bytes and milliseconds per invoice for every template and profile"""
+    generator = TemplatedInvoicePDFGenerator(metrics=None)
+    samples = sample_invoices(invoices, items, unicode_text)
+
+    results = []
+    for template in generator.templates:
+        for profile in PDF_PROFILES:
+            total_bytes = 0
+            started = time.perf_counter()
+            for invoice_data, items_data in samples:
+                total_bytes += len(generator.create_invoice_pdf(invoice_data, items_data, SAMPLE_COMPANY,
+                                                                template, profile=profile))
+            results.append({
+                'template': template,
+                'profile': profile,
+                'bytes_per_invoice': total_bytes / len(samples),
+                'ms_per_invoice': (time.perf_counter() - started) / len(samples) * 1000
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ukuran PDF invoice per template")
+    parser.add_argument('--invoices', type=int, default=20)
+    parser.add_argument('--items', type=int, default=15)
+    parser.add_argument('--unicode', action='store_true', help="Pakai teks di luar WinAnsi (font harus ditanam)")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.invoices, args.items, args.unicode)
+    default_sizes = {row['template']: row['bytes_per_invoice'] for row in results if row['profile'] == 'default'}
+    print(f"{'template':<10} {'profile':<8} {'bytes/invoice':>14} {'ms/invoice':>11} {'vs default':>11}")
+    for row in results:
+        ratio = row['bytes_per_invoice'] / default_sizes[row['template']]
+        print(f"{row['template']:<10} {row['profile']:<8} {row['bytes_per_invoice']:>14,.0f} "
+              f"{row['ms_per_invoice']:>11.1f} {ratio:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
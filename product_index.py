@@ -0,0 +1,92 @@
+"""
+Index produk untuk pencarian cepat di halaman Buat Invoice.
+
+Index dibangun sekali dari master produk (array terurut + index trigram)
+dan hanya dibangun ulang ketika versi tabel ``products`` berubah. Pencarian
+mengembalikan top-k produk; harga dicari per ID dalam O(1).
+"""
+
+from bisect import bisect_left
+
+import numpy as np
+
+DEFAULT_LIMIT = 20
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ProductIndex:
+    """Sorted product arrays with prefix and trigram lookup"""
+
+    def __init__(self, products_df, version=None):
+        self.version = version
+        order = products_df['name'].str.lower().argsort(kind='stable').to_numpy()
+
+        self.ids = products_df['id'].to_numpy(dtype=np.int64)[order]
+        self.names = products_df['name'].to_numpy(dtype=object)[order].tolist()
+        self.prices = products_df['price'].to_numpy(dtype=np.int64)[order]
+        self.keys = [name.lower() for name in self.names]
+        self.positions = {int(product_id): position for position, product_id in enumerate(self.ids)}
+
+        postings = {}
+        for position, key in enumerate(self.keys):
+            for trigram in _trigrams(key):
+                postings.setdefault(trigram, []).append(position)
+        self.trigrams = {trigram: np.array(found, dtype=np.int64) for trigram, found in postings.items()}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _prefix_positions(self, query, limit):
+        start = bisect_left(self.keys, query)
+        found = []
+        for position in range(start, min(start + limit, len(self.keys))):
+            if not self.keys[position].startswith(query):
+                break
+            found.append(position)
+        return found
+
+    def _substring_positions(self, query):
+        if len(query) < 3:
+            return []
+        lists = []
+        for trigram in _trigrams(query):
+            if trigram not in self.trigrams:
+                return []
+            lists.append(self.trigrams[trigram])
+        lists.sort(key=len)
+        candidates = lists[0]
+        for other in lists[1:]:
+            candidates = np.intersect1d(candidates, other, assume_unique=True)
+        # Trigram hits are candidates only; confirm the full substring
+        return [int(position) for position in candidates if query in self.keys[position]]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Return up to ``limit`` product IDs: prefix matches first, then substring matches"""
+        query = (query or '').strip().lower()
+        if not query:
+            return self.ids[:limit].tolist()
+
+        found = self._prefix_positions(query, limit)
+        if len(found) < limit:
+            seen = set(found)
+            for position in self._substring_positions(query):
+                if position not in seen:
+                    found.append(position)
+                    if len(found) == limit:
+                        break
+        return [int(self.ids[position]) for position in found]
+
+    def get(self, product_id):
+        """Return ``{'id', 'name', 'price'}`` for a product ID, or None"""
+        position = self.positions.get(int(product_id))
+        if position is None:
+            return None
+        return {'id': int(self.ids[position]), 'name': self.names[position], 'price': int(self.prices[position])}
+
+    def display_name(self, product_id):
+        """Label for the product picker"""
+        product = self.get(product_id)
+        return f"{product['name']} - Rp {product['price']:,.0f}" if product else str(product_id)
@@ -0,0 +1,245 @@
+"""
+Instrumentasi query SQLite untuk ``Database``.
+
+Setiap koneksi dari ``Database._connect()`` memakai ``InstrumentedConnection``
+sehingga latensi (eksekusi + fetch) dan jumlah baris setiap query tercatat
+per method ``Database``. Query yang lebih lambat dari ambang batas ditulis
+ke slow-query log (JSON Lines) beserta ``EXPLAIN QUERY PLAN``-nya.
+
+Ambang batas diatur lewat environment variable ``INVOICE_SLOW_QUERY_MS``
+(default 100 ms).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+SLOW_QUERY_MS = float(os.environ.get('INVOICE_SLOW_QUERY_MS', 100))
+
+# Latency histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf'))
+
+# Slow-query log is rotated to ``.1`` beyond this size
+SLOW_LOG_MAX_BYTES = 5 * 1024 * 1024
+
+
+def slow_log_path(db_name):
+    return os.path.splitext(db_name)[0] + "_slow_queries.jsonl"
+
+
+class QueryStats:
+    """Thread-safe per-method latency histograms and row counts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._methods = {}
+
+    def record(self, method, elapsed_ms, rows):
+        with self._lock:
+            stats = self._methods.get(method)
+            if stats is None:
+                stats = self._methods[method] = {
+                    'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                    'buckets': [0] * len(LATENCY_BUCKETS_MS)
+                }
+            stats['calls'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['rows'] += max(rows, 0)
+            for index, bound in enumerate(LATENCY_BUCKETS_MS):
+                if elapsed_ms <= bound:
+                    stats['buckets'][index] += 1
+                    break
+
+    @staticmethod
+    def _percentile(stats, fraction):
+        target = stats['calls'] * fraction
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, stats['buckets']):
+            seen += count
+            if seen >= target:
+                return min(bound, stats['max_ms'])
+        return stats['max_ms']
+
+    def summary(self):
+        """One row per method, slowest total time first"""
+        with self._lock:
+            rows = [
+                {
+                    'method': method,
+                    'calls': stats['calls'],
+                    'total_ms': round(stats['total_ms'], 2),
+                    'avg_ms': round(stats['total_ms'] / stats['calls'], 3),
+                    'p95_ms': round(self._percentile(stats, 0.95), 3),
+                    'max_ms': round(stats['max_ms'], 3),
+                    'avg_rows': round(stats['rows'] / stats['calls'], 1)
+                }
+                for method, stats in self._methods.items()
+            ]
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+    def histogram(self, method):
+        """``(bucket upper bound ms, count)`` pairs for one method"""
+        with self._lock:
+            stats = self._methods.get(method)
+            return list(zip(LATENCY_BUCKETS_MS, stats['buckets'])) if stats else []
+
+    def reset(self):
+        with self._lock:
+            self._methods.clear()
+
+
+query_stats = QueryStats()
+_log_lock = threading.Lock()
+
+
+def _write_slow_query(path, entry):
+    with _log_lock:
+        if os.path.exists(path) and os.path.getsize(path) > SLOW_LOG_MAX_BYTES:
+            os.replace(path, path + '.1')
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+
+
+def read_slow_queries(db_name, limit=20):
+    """Slowest logged queries first"""
+    path = slow_log_path(db_name)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return sorted(entries, key=lambda entry: entry['elapsed_ms'], reverse=True)[:limit]
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times each statement from execute until its rows are fetched"""
+
+    def _start(self, sql, params, many=False):
+        self._finish()
+        self._sql = sql
+        self._params = None if many else params
+        self._rows = 0
+        self._elapsed = 0.0
+
+    def _timed(self, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self._elapsed += time.perf_counter() - started
+
+    def _finish(self):
+        sql = getattr(self, '_sql', None)
+        if sql is None:
+            return
+        self._sql = None
+
+        rows = self._rows if self._rows else self.rowcount
+        elapsed_ms = self._elapsed * 1000
+        conn = self.connection
+        query_stats.record(conn.method, elapsed_ms, rows)
+        if elapsed_ms >= conn.slow_query_ms:
+            conn.log_slow_query(sql, self._params, elapsed_ms, rows)
+
+    def execute(self, sql, params=()):
+        self._start(sql, params)
+        return self._timed(super().execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        self._start(sql, None, many=True)
+        return self._timed(super().executemany, sql, seq_of_params)
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is not None:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, size if size is not None else self.arraysize)
+        self._rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._rows += len(rows)
+        return rows
+
+    def __next__(self):
+        row = self._timed(super().__next__)
+        self._rows += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors report to ``query_stats`` under the calling method's name"""
+
+    db_name = ''
+    method = 'unknown'
+    slow_query_ms = SLOW_QUERY_MS
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cursors = []
+
+    def cursor(self, factory=InstrumentedCursor):
+        cursor = super().cursor(factory)
+        self._cursors.append(cursor)
+        return cursor
+
+    def log_slow_query(self, sql, params, elapsed_ms, rows):
+        # Plain cursor so the EXPLAIN itself is not measured
+        plain_cursor = sqlite3.Connection.cursor(self, sqlite3.Cursor)
+        try:
+            plan = [row[3] for row in plain_cursor.execute('EXPLAIN QUERY PLAN ' + sql, params or ())]
+        except sqlite3.Error:
+            plan = []
+        finally:
+            plain_cursor.close()
+        _write_slow_query(slow_log_path(self.db_name), {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'method': self.method,
+            'elapsed_ms': round(elapsed_ms, 3),
+            'rows': rows,
+            'sql': ' '.join(sql.split()),
+            'plan': plan
+        })
+
+    def begin_snapshot(self):
+        """Start a read transaction so every following query sees the same snapshot"""
+        # Plain cursor so BEGIN is not counted as a query of the calling method
+        plain_cursor = sqlite3.Connection.cursor(self, sqlite3.Cursor)
+        try:
+            plain_cursor.execute('BEGIN')
+        finally:
+            plain_cursor.close()
+
+    def close(self):
+        for cursor in self._cursors:
+            cursor._finish()
+        self._cursors = []
+        super().close()
+
+
+def connect(db_name, method, readonly=False, **kwargs):
+    """Open an instrumented connection whose queries are attributed to ``method``.
+
+    ``readonly`` opens the file through a ``mode=ro`` URI, so SQLite itself
+    rejects any write on that connection.
+    """
+    if readonly:
+        target = Path(os.path.abspath(db_name)).as_uri() + "?mode=ro"
+        conn = sqlite3.connect(target, factory=InstrumentedConnection, uri=True, **kwargs)
+    else:
+        conn = sqlite3.connect(db_name, factory=InstrumentedConnection, **kwargs)
+    conn.db_name = db_name
+    conn.method = method
+    return conn
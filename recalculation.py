@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Hitung ulang total invoice secara massal.
+
+Item dibaca per chunk invoice ke array NumPy int64, total baris dan subtotal
+per invoice dihitung tervektorisasi (``np.add.reduceat``), lalu hanya baris
+yang berubah ditulis kembali dengan ``executemany``.
+
+Jalankan:  python recalculation.py --tax-rate 12 --status Draft
+"""
+
+import argparse
+import sqlite3
+
+import numpy as np
+
+from money import RATE_SCALE
+
+# Invoices processed per transaction
+RECALC_CHUNK_SIZE = 20000
+
+
+def _tax_amounts(subtotals, tax_rates):
+    """Vectorized whole-Rupiah tax, same half-up rounding as money.compute_tax"""
+    ppm = np.rint(tax_rates * RATE_SCALE).astype(np.int64)
+    return (subtotals * ppm + RATE_SCALE // 2) // RATE_SCALE
+
+
+def _recalculate_chunk(cursor, invoices, tax_rate):
+    invoice_ids = np.array([row[0] for row in invoices], dtype=np.int64)
+    stored = np.array([row[2:] for row in invoices], dtype=np.int64).reshape(-1, 3)
+    if tax_rate is None:
+        tax_rates = np.array([row[1] or 0.0 for row in invoices], dtype=np.float64)
+    else:
+        tax_rates = np.full(len(invoices), tax_rate, dtype=np.float64)
+
+    cursor.execute('''
+        SELECT id, invoice_id, quantity, unit_price, total_price
+        FROM invoice_items
+        WHERE invoice_id BETWEEN ? AND ?
+        ORDER BY invoice_id, id
+    ''', (int(invoice_ids[0]), int(invoice_ids[-1])))
+    items = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 5)
+
+    # Keep only items of the selected invoices (a status filter leaves gaps in the id range)
+    items = items[np.isin(items[:, 1], invoice_ids)]
+    line_totals = items[:, 2] * items[:, 3]
+
+    changed_items = np.flatnonzero(line_totals != items[:, 4])
+    cursor.executemany(
+        'UPDATE invoice_items SET total_price = ? WHERE id = ?',
+        zip(line_totals[changed_items].tolist(), items[changed_items, 0].tolist())
+    )
+
+    subtotals = np.zeros(len(invoice_ids), dtype=np.int64)
+    if len(items):
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(items[:, 1])) + 1))
+        positions = np.searchsorted(invoice_ids, items[starts, 1])
+        subtotals[positions] = np.add.reduceat(line_totals, starts)
+
+    tax_amounts = _tax_amounts(subtotals, tax_rates)
+    totals = subtotals + tax_amounts
+
+    changed = (subtotals != stored[:, 0]) | (tax_amounts != stored[:, 1]) | (totals != stored[:, 2])
+    if tax_rate is not None:
+        stored_rates = np.array([row[1] if row[1] is not None else np.nan for row in invoices], dtype=np.float64)
+        changed |= ~np.isclose(stored_rates, tax_rate)
+    changed_invoices = np.flatnonzero(changed)
+    cursor.executemany(
+        'UPDATE invoices SET subtotal = ?, tax_rate = ?, tax_amount = ?, total = ? WHERE id = ?',
+        zip(subtotals[changed_invoices].tolist(), tax_rates[changed_invoices].tolist(),
+            tax_amounts[changed_invoices].tolist(), totals[changed_invoices].tolist(),
+            invoice_ids[changed_invoices].tolist())
+    )
+
+    return len(changed_invoices), len(changed_items)
+
+
+def recalculate_invoices(db, tax_rate=None, status=None, chunk_size=RECALC_CHUNK_SIZE,
+                         progress_callback=None):
+    """Recompute item totals and invoice subtotal/tax/total from quantity x unit price.
+
+    ``tax_rate`` (a fraction, 0.11 = 11%) replaces the stored rate of every
+    selected invoice; when None each invoice keeps its own rate. ``status``
+    limits the run to invoices with that status.
+    """
+    conn = sqlite3.connect(db.db_name)
+    cursor = conn.cursor()
+
+    query = "SELECT id, tax_rate, subtotal, tax_amount, total FROM invoices WHERE id > ?"
+    params = []
+    if status:
+        query += " AND status = ?"
+        params.append(status)
+    query += " ORDER BY id LIMIT ?"
+
+    invoices_updated = 0
+    items_updated = 0
+    processed = 0
+    last_id = 0
+    try:
+        while True:
+            cursor.execute(query, [last_id] + params + [chunk_size])
+            invoices = [(row[0], row[1], row[2] or 0, row[3] or 0, row[4] or 0) for row in cursor.fetchall()]
+            if not invoices:
+                break
+
+            chunk_invoices, chunk_items = _recalculate_chunk(cursor, invoices, tax_rate)
+            conn.commit()
+
+            invoices_updated += chunk_invoices
+            items_updated += chunk_items
+            processed += len(invoices)
+            last_id = invoices[-1][0]
+            if progress_callback:
+                progress_callback(processed)
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return {
+            'success': False,
+            'message': f"Error menghitung ulang invoice: {str(e)}"
+        }
+
+    conn.close()
+    return {
+        'success': True,
+        'message': f"{processed} invoice diperiksa, {invoices_updated} invoice dan {items_updated} item diperbarui",
+        'invoices_updated': invoices_updated,
+        'items_updated': items_updated
+    }
+
+
+def main():
+    from database import Database
+
+    parser = argparse.ArgumentParser(description="Hitung ulang total invoice")
+    parser.add_argument('--db', default="invoice_system.db", help="Path database SQLite")
+    parser.add_argument('--tax-rate', type=float, help="Tarif pajak baru dalam PERSEN, misalnya 12")
+    parser.add_argument('--status', help="Hanya invoice dengan status ini, misalnya Draft")
+    parser.add_argument('--chunk-size', type=int, default=RECALC_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    tax_rate = args.tax_rate / 100 if args.tax_rate is not None else None
+    result = recalculate_invoices(Database(args.db), tax_rate=tax_rate, status=args.status,
+                                  chunk_size=args.chunk_size)
+    print(("✅ " if result['success'] else "❌ ") + result['message'])
+
+
+if __name__ == "__main__":
+    main()
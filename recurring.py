@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Pembuatan invoice berulang (langganan bulanan) secara massal.
+
+Setiap jadwal di ``recurring_schedules`` menagih item yang sama setiap
+``interval_months`` bulan. Satu kali jalan mengambil semua jadwal yang sudah
+jatuh tempo, mengalokasikan ID dan nomor invoice sekaligus, lalu menulis
+semua invoice dan itemnya dengan ``executemany`` dalam satu transaksi,
+sehingga puluhan ribu langganan selesai dalam hitungan detik. Periode yang
+terlewat (misalnya aplikasi tidak dijalankan dua bulan) ikut dibuatkan.
+
+Jalankan:  python recurring.py --as-of 2025-03-01
+           python recurring.py --benchmark 10000
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+
+from money import invoice_totals
+
+
+def _run_date(start_date, interval_months, run):
+    # Always counted from the start date, so the 31st does not drift to the 28th
+    return start_date + relativedelta(months=interval_months * run)
+
+
+def generate_recurring_invoices(db, as_of=None):
+    """Create invoices for every period of every active schedule due on or before ``as_of``.
+
+    Returns the usual result dict with the IDs of the created invoices.
+    """
+    as_of = date.fromisoformat(str(as_of)) if as_of else date.today()
+    conn = sqlite3.connect(db.db_name)
+    cursor = conn.cursor()
+
+    try:
+        # Take the write lock first so the allocated ID range cannot be claimed by another writer
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('''
+            SELECT id, customer_id, start_date, interval_months, end_date, runs, due_days, tax_rate, notes
+            FROM recurring_schedules
+            WHERE active = 1 AND next_run_date <= ?
+            ORDER BY id
+        ''', (as_of.isoformat(),))
+        schedules = cursor.fetchall()
+
+        cursor.execute('''
+            SELECT si.schedule_id, si.product_id, si.product_name, si.quantity, si.unit_price
+            FROM recurring_schedule_items si
+            JOIN recurring_schedules s ON si.schedule_id = s.id
+            WHERE s.active = 1 AND s.next_run_date <= ?
+            ORDER BY si.schedule_id, si.id
+        ''', (as_of.isoformat(),))
+        items_by_schedule = {}
+        for schedule_id, product_id, product_name, quantity, unit_price in cursor.fetchall():
+            items_by_schedule.setdefault(schedule_id, []).append({
+                'product_id': product_id, 'product_name': product_name,
+                'quantity': quantity, 'unit_price': unit_price
+            })
+
+        # Invoice numbers derive from the row id, as in Database.create_invoice;
+        # sqlite_sequence also covers ids of invoices moved to the archive
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'invoices'")
+        sequence = cursor.fetchone()
+        cursor.execute('SELECT MAX(id) FROM invoices')
+        next_id = max(sequence[0] if sequence else 0, cursor.fetchone()[0] or 0) + 1
+        number_date = datetime.now().strftime('%Y%m%d')
+
+        invoice_rows, item_rows, schedule_rows = [], [], []
+        for (schedule_id, customer_id, start_date, interval_months, end_date,
+             runs, due_days, tax_rate, notes) in schedules:
+            items = items_by_schedule.get(schedule_id)
+            start_date = date.fromisoformat(start_date)
+            end_date = date.fromisoformat(end_date) if end_date else None
+            last_invoice_id = None
+
+            if items:
+                subtotal, tax_amount, total = invoice_totals(items, tax_rate or 0)
+                while True:
+                    run_date = _run_date(start_date, interval_months, runs)
+                    if run_date > as_of or (end_date and run_date > end_date):
+                        break
+                    last_invoice_id = next_id
+                    next_id += 1
+                    invoice_rows.append((
+                        last_invoice_id, f"INV-{number_date}-{last_invoice_id:06d}", customer_id,
+                        run_date.isoformat(), (run_date + timedelta(days=due_days)).isoformat(),
+                        subtotal, tax_rate, tax_amount, total, notes
+                    ))
+                    item_rows.extend(
+                        (last_invoice_id, item['product_name'], item['quantity'], item['unit_price'],
+                         item['quantity'] * item['unit_price'], item['product_id'])
+                        for item in items
+                    )
+                    runs += 1
+
+            next_run_date = _run_date(start_date, interval_months, runs)
+            active = 0 if end_date and next_run_date > end_date else 1
+            schedule_rows.append((runs, next_run_date.isoformat(), active, last_invoice_id, schedule_id))
+
+        cursor.executemany('''
+            INSERT INTO invoices (id, invoice_number, customer_id, issue_date, due_date,
+                                  subtotal, tax_rate, tax_amount, total, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', invoice_rows)
+        cursor.executemany('''
+            INSERT INTO invoice_items (invoice_id, product_name, quantity, unit_price, total_price, product_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', item_rows)
+        cursor.executemany('''
+            UPDATE recurring_schedules
+            SET runs = ?, next_run_date = ?, active = ?, last_invoice_id = COALESCE(?, last_invoice_id)
+            WHERE id = ?
+        ''', schedule_rows)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return {
+            'success': False,
+            'message': f"Error membuat invoice berulang: {str(e)}"
+        }
+
+    conn.close()
+    invoice_ids = [row[0] for row in invoice_rows]
+    return {
+        'success': True,
+        'message': f"{len(invoice_ids)} invoice berulang dibuat dari {len(schedules)} jadwal",
+        'invoice_ids': invoice_ids
+    }
+
+
+def run_benchmark(schedules=10000, items=3, baseline=500):
+    """Seconds to generate one month of ``schedules`` subscriptions, versus create_invoice one by one"""
+    from database import Database
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, "benchmark.db"))
+        line_items = [{'product_name': f"Layanan {line + 1}", 'quantity': 1 + line % 3,
+                       'unit_price': 150000 + line * 25000} for line in range(items)]
+
+        conn = sqlite3.connect(db.db_name)
+        conn.executemany("INSERT INTO customers (name, email) VALUES (?, ?)",
+                         ((f"Pelanggan {number}", f"p{number}@example.com") for number in range(schedules)))
+        conn.executemany('''
+            INSERT INTO recurring_schedules (customer_id, start_date, next_run_date, due_days, tax_rate)
+            VALUES (?, '2025-01-01', '2025-01-01', 30, 0.11)
+        ''', ((number + 1,) for number in range(schedules)))
+        conn.executemany('''
+            INSERT INTO recurring_schedule_items (schedule_id, product_name, quantity, unit_price)
+            VALUES (?, ?, ?, ?)
+        ''', ((schedule_id, item['product_name'], item['quantity'], item['unit_price'])
+              for schedule_id in range(1, schedules + 1) for item in line_items))
+        conn.commit()
+        conn.close()
+
+        started = time.perf_counter()
+        result = generate_recurring_invoices(db, as_of='2025-01-01')
+        batch_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for number in range(baseline):
+            db.create_invoice(number % schedules + 1, line_items, '2025-01-01', '2025-01-31')
+        single_seconds = (time.perf_counter() - started) / baseline
+
+    return {
+        'invoices': len(result['invoice_ids']),
+        'batch_seconds': batch_seconds,
+        'one_by_one_seconds': single_seconds * schedules
+    }
+
+
+def main():
+    from database import Database
+
+    parser = argparse.ArgumentParser(description="Buat invoice berulang yang sudah jatuh tempo")
+    parser.add_argument('--db', default="invoice_system.db", help="Path database SQLite")
+    parser.add_argument('--as-of', help="Tanggal acuan YYYY-MM-DD (default: hari ini)")
+    parser.add_argument('--benchmark', type=int, metavar='JADWAL', help="Ukur waktu untuk sejumlah jadwal")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        result = run_benchmark(args.benchmark)
+        print(f"🔁 {result['invoices']:,} invoice dalam {result['batch_seconds']:.2f} detik "
+              f"(satu per satu lewat create_invoice: ±{result['one_by_one_seconds']:.1f} detik)")
+        return
+
+    result = generate_recurring_invoices(Database(args.db), args.as_of)
+    print(("✅ " if result['success'] else "❌ ") + result['message'])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Metrik render PDF invoice.
+
+Setiap ``create_invoice_pdf`` mengukur tiga fase: penyusunan story
+(flowable), layout ``doc.build`` dan serialisasi byte PDF (``canvas.save``),
+beserta ukuran hasilnya. Data diagregasi di proses ini per template dan
+kelompok jumlah item, lalu diekspor dalam format teks Prometheus: lewat
+endpoint ``GET /metrics`` di ``api_server.py`` atau file teks untuk
+textfile collector node_exporter bila environment variable
+``INVOICE_RENDER_METRICS_FILE`` diisi.
+
+Contoh p95 render per template di Prometheus:
+    histogram_quantile(0.95, sum by (template, le) (rate(invoice_pdf_render_seconds_bucket[5m])))
+"""
+
+import os
+import threading
+import time
+
+RENDER_PHASES = ('story', 'layout', 'serialize')
+
+# Histogram bucket upper bounds
+DURATION_BUCKETS_SECONDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+SIZE_BUCKETS_BYTES = (2048, 4096, 8192, 16384, 32768, 65536, 131072, 262144, 524288, 1048576, float('inf'))
+
+# Item counts are grouped so the label set stays small
+ITEM_COUNT_BUCKETS = (5, 20, 50, 100)
+
+RENDER_METRICS_FILE = os.environ.get('INVOICE_RENDER_METRICS_FILE')
+EXPORT_INTERVAL_SECONDS = 15
+
+
+def item_count_label(item_count):
+    """Label of the item-count group, e.g. ``6-20``"""
+    lower = 1
+    for upper in ITEM_COUNT_BUCKETS:
+        if item_count <= upper:
+            return f"{lower}-{upper}"
+        lower = upper + 1
+    return f"{ITEM_COUNT_BUCKETS[-1]}+"
+
+
+class _Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * len(bounds)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for index, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.buckets[index] += 1
+                break
+
+    def percentile(self, fraction):
+        target = self.count * fraction
+        seen = 0
+        for bound, count in zip(self.bounds, self.buckets):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def cumulative(self):
+        seen = 0
+        for bound, count in zip(self.bounds, self.buckets):
+            seen += count
+            yield bound, seen
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else f"{bound:g}"
+
+
+def _format_labels(labels):
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+class RenderStats:
+    """Thread-safe render phase and output size histograms per template and item-count group"""
+
+    def __init__(self, metrics_file=RENDER_METRICS_FILE, export_interval=EXPORT_INTERVAL_SECONDS):
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._series = {}
+        self.metrics_file = metrics_file
+        self.export_interval = export_interval
+        self._last_export = 0.0
+
+    def record(self, template, item_count, phases, size_bytes):
+        """Add one render; ``phases`` maps each of ``RENDER_PHASES`` to seconds"""
+        key = (template, item_count_label(item_count))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    'phases': {phase: _Histogram(DURATION_BUCKETS_SECONDS) for phase in RENDER_PHASES},
+                    'total': _Histogram(DURATION_BUCKETS_SECONDS),
+                    'size': _Histogram(SIZE_BUCKETS_BYTES)
+                }
+            for phase in RENDER_PHASES:
+                series['phases'][phase].observe(phases.get(phase, 0.0))
+            series['total'].observe(sum(phases.get(phase, 0.0) for phase in RENDER_PHASES))
+            series['size'].observe(size_bytes)
+
+        if self.metrics_file and time.monotonic() - self._last_export >= self.export_interval:
+            self._export()
+
+    def _export(self):
+        # Another thread already writing the file is good enough
+        if not self._export_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_export = time.monotonic()
+            self.write_prometheus_file(self.metrics_file)
+        except OSError:
+            pass
+        finally:
+            self._export_lock.release()
+
+    def summary(self):
+        """One row per template and item-count group, slowest p95 first"""
+        with self._lock:
+            rows = [
+                {
+                    'template': template,
+                    'items': items,
+                    'renders': series['total'].count,
+                    'story_ms': round(series['phases']['story'].sum / series['total'].count * 1000, 2),
+                    'layout_ms': round(series['phases']['layout'].sum / series['total'].count * 1000, 2),
+                    'serialize_ms': round(series['phases']['serialize'].sum / series['total'].count * 1000, 2),
+                    'p95_ms': round(series['total'].percentile(0.95) * 1000, 2),
+                    'max_ms': round(series['total'].max * 1000, 2),
+                    'avg_kb': round(series['size'].sum / series['size'].count / 1024, 1)
+                }
+                for (template, items), series in self._series.items()
+            ]
+        return sorted(rows, key=lambda row: row['p95_ms'], reverse=True)
+
+    def prometheus_text(self):
+        """All series in the Prometheus text exposition format"""
+        phase_lines, total_lines, size_lines, count_lines = [], [], [], []
+        with self._lock:
+            for (template, items), series in sorted(self._series.items()):
+                labels = [('template', template), ('items', items)]
+                for phase in RENDER_PHASES:
+                    self._histogram_lines(phase_lines, 'invoice_pdf_render_phase_seconds',
+                                          labels + [('phase', phase)], series['phases'][phase])
+                self._histogram_lines(total_lines, 'invoice_pdf_render_seconds', labels, series['total'])
+                self._histogram_lines(size_lines, 'invoice_pdf_size_bytes', labels, series['size'])
+                count_lines.append(f"invoice_pdf_renders_total{_format_labels(labels)} {series['total'].count}")
+
+        sections = [
+            ('invoice_pdf_render_phase_seconds', 'histogram',
+             'PDF render time per phase (story, layout, serialize)', phase_lines),
+            ('invoice_pdf_render_seconds', 'histogram', 'Total PDF render time', total_lines),
+            ('invoice_pdf_size_bytes', 'histogram', 'Rendered PDF size', size_lines),
+            ('invoice_pdf_renders_total', 'counter', 'Rendered invoice PDFs', count_lines),
+        ]
+        lines = []
+        for name, metric_type, help_text, metric_lines in sections:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(metric_lines)
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _histogram_lines(lines, name, labels, histogram):
+        for bound, count in histogram.cumulative():
+            lines.append(f"{name}_bucket{_format_labels(labels + [('le', _format_bound(bound))])} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+    def write_prometheus_file(self, path):
+        """Atomically write the metrics for node_exporter's textfile collector"""
+        partial_path = f"{path}.{os.getpid()}.tmp"
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(partial_path, path)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+render_stats = RenderStats()
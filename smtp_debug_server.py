@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Server SMTP lokal (asyncio) untuk mencoba dan menguji pengiriman email invoice.
+
+Email tidak diteruskan ke mana pun: setiap pesan disimpan di memori
+(``server.messages``) dan, bila dijalankan dari command line, ringkasannya
+dicetak ke terminal. Untuk menguji retry, server bisa diminta menolak
+penerima tertentu secara permanen (550) atau menunda beberapa pesan
+pertama (451).
+
+Jalankan:  python smtp_debug_server.py --port 8025
+lalu:      INVOICE_SMTP_HOST=127.0.0.1 INVOICE_SMTP_PORT=8025 python email_dispatcher.py send --status Sent
+"""
+
+import argparse
+import asyncio
+import threading
+from email import message_from_bytes, policy
+
+# Lines longer than this (RFC 5321 allows 1000) are rejected rather than buffered
+MAX_LINE_BYTES = 4096
+
+
+class SMTPDebugServer:
+    """Minimal SMTP server that keeps every accepted message in memory"""
+
+    def __init__(self, host="127.0.0.1", port=8025, reject_recipients=(), defer_messages=0, echo=False):
+        self.host = host
+        self.port = port
+        self.reject_recipients = {address.lower() for address in reject_recipients}
+        # The first ``defer_messages`` messages get a temporary 451 after DATA
+        self.defer_messages = defer_messages
+        self.echo = echo
+        self.messages = []
+        self.connections = 0
+        self.server = None
+
+    async def handle_connection(self, reader, writer):
+        self.connections += 1
+
+        async def reply(line):
+            writer.write(f"{line}\r\n".encode('ascii'))
+            await writer.drain()
+
+        mail_from, rcpt_tos = None, []
+        try:
+            await reply("220 invoice-debug SMTP siap")
+            while True:
+                line = await reader.readuntil(b'\n')
+                if len(line) > MAX_LINE_BYTES:
+                    await reply("500 Baris terlalu panjang")
+                    continue
+                command, _, argument = line.decode('utf-8', 'replace').strip().partition(' ')
+                command = command.upper()
+
+                if command in ('EHLO', 'HELO'):
+                    await reply("250-invoice-debug\r\n250-8BITMIME\r\n250 SMTPUTF8" if command == 'EHLO'
+                                else "250 invoice-debug")
+                elif command == 'MAIL':
+                    mail_from, rcpt_tos = argument.partition(':')[2].strip().split(' ')[0].strip('<>'), []
+                    await reply("250 OK")
+                elif command == 'RCPT':
+                    if mail_from is None:
+                        await reply("503 MAIL dulu")
+                        continue
+                    recipient = argument.partition(':')[2].strip().split(' ')[0].strip('<>')
+                    if recipient.lower() in self.reject_recipients:
+                        await reply("550 Mailbox tidak ada")
+                    else:
+                        rcpt_tos.append(recipient)
+                        await reply("250 OK")
+                elif command == 'DATA':
+                    if not rcpt_tos:
+                        await reply("503 RCPT dulu")
+                        continue
+                    await reply("354 Akhiri dengan <CRLF>.<CRLF>")
+                    data = await self._read_data(reader)
+                    if self.defer_messages > 0:
+                        self.defer_messages -= 1
+                        await reply("451 Coba lagi nanti")
+                    else:
+                        self._store(mail_from, rcpt_tos, data)
+                        await reply(f"250 OK pesan {len(self.messages)}")
+                    mail_from, rcpt_tos = None, []
+                elif command == 'RSET':
+                    mail_from, rcpt_tos = None, []
+                    await reply("250 OK")
+                elif command == 'NOOP':
+                    await reply("250 OK")
+                elif command == 'QUIT':
+                    await reply("221 Sampai jumpa")
+                    break
+                else:
+                    await reply("502 Perintah tidak didukung")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_data(self, reader):
+        lines = []
+        while True:
+            line = await reader.readuntil(b'\n')
+            if line in (b'.\r\n', b'.\n'):
+                break
+            # Undo dot-stuffing
+            lines.append(line[1:] if line.startswith(b'..') else line)
+        return b''.join(lines)
+
+    def _store(self, mail_from, rcpt_tos, data):
+        self.messages.append({'mail_from': mail_from, 'rcpt_tos': list(rcpt_tos), 'data': data})
+        if self.echo:
+            message = message_from_bytes(data, policy=policy.default)
+            attachments = [part.get_filename() for part in message.iter_attachments()]
+            print(f"📨 {mail_from} -> {', '.join(rcpt_tos)}: {message['Subject']} "
+                  f"({len(data):,} byte, lampiran: {', '.join(attachments) or '-'})")
+
+    def parsed_messages(self):
+        """Accepted messages as ``email.message.EmailMessage`` objects"""
+        return [message_from_bytes(message['data'], policy=policy.default) for message in self.messages]
+
+    async def start(self):
+        """Start listening; returns the bound port"""
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                 limit=MAX_LINE_BYTES * 2)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+
+def start_in_thread(server):
+    """Run ``server`` on its own event loop thread; returns a function that stops it"""
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        started.set()
+        loop.run_forever()
+        loop.run_until_complete(server.close())
+        loop.close()
+
+    thread = threading.Thread(target=run, name="smtp-debug", daemon=True)
+    thread.start()
+    started.wait()
+
+    def stop():
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server SMTP lokal untuk debugging email invoice")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--reject', action='append', default=[], help="Alamat yang ditolak permanen (550)")
+    parser.add_argument('--defer', type=int, default=0, help="Jumlah pesan pertama yang ditunda (451)")
+    args = parser.parse_args()
+
+    server = SMTPDebugServer(args.host, args.port, args.reject, args.defer, echo=True)
+
+    async def run():
+        port = await server.start()
+        print(f"📮 SMTP debug server berjalan di {args.host}:{port}")
+        async with server.server:
+            await server.server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print(f"\n👋 Server dihentikan ({len(server.messages)} pesan diterima)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,77 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, cm
 from reportlab.pdfgen import canvas
+from reportlab.pdfbase.pdfdoc import PDFDictionary, PDFInfo, PDFString
 from datetime import datetime
+from functools import partial
 import io
+import os
+import time
+
+from font_registry import BASE14_FAMILY, apply_font_family, get_font_family
+from logo_cache import LogoImage, logo_cache
+from render_metrics import render_stats
+
+# SimpleDocTemplate options per output profile. 'compact' also drops placeholder
+# metadata and uses the base-14 fonts whenever the invoice text fits WinAnsi.
+PDF_PROFILES = {
+    'default': {},
+    'compact': {'pageCompression': 1, 'invariant': 1},
+}
+PDF_PROFILE = os.environ.get('INVOICE_PDF_PROFILE', 'default')
+
+
+class _CompactInfo(PDFInfo):
+    """Document info without dates, producer or placeholder fields"""
+
+    _placeholders = ('', 'untitled', 'anonymous', 'unspecified', '(anonymous)', '(unspecified)')
+
+    def format(self, document):
+        fields = {
+            name: PDFString(value)
+            for name, value in (('Title', self.title), ('Author', self.author),
+                                ('Subject', self.subject), ('Keywords', self.keywords))
+            if value not in self._placeholders
+        }
+        return PDFDictionary(fields).format(document)
+
+
+class _TimedCanvas(canvas.Canvas):
+    """Canvas that records how long writing the PDF bytes takes"""
+
+    def __init__(self, *args, timings=None, compact=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._timings = timings if timings is not None else {}
+        if compact:
+            self._doc.info = _CompactInfo()
+
+    def save(self):
+        started = time.perf_counter()
+        super().save()
+        self._timings['serialize'] = time.perf_counter() - started
+
+
+def _fits_winansi(texts):
+    try:
+        '\n'.join(texts).encode('cp1252')
+    except UnicodeEncodeError:
+        return False
+    return True
+
 
 class TemplatedInvoicePDFGenerator:
-    def __init__(self):
+    def __init__(self, metrics=render_stats, font_family=None, profile=PDF_PROFILE):
+        if profile not in PDF_PROFILES:
+            raise ValueError(f"Profil PDF tidak dikenal: {profile}")
         self.page_size = A4
-        self.styles = getSampleStyleSheet()
+        self.profile = profile
+        # Render timings are recorded here unless None; last_render always holds the latest one
+        self.metrics = metrics
+        self.last_render = None
+        # TrueType fonts are registered once per process and embedded as glyph subsets
+        self.default_fonts = font_family or get_font_family()
+        self._stylesheets = {}
+        self._use_fonts(self.default_fonts)
         self.templates = {
             'classic': 'Template Klasik Profesional',
             'modern': 'Template Modern Minimalis',
@@ -22,18 +86,40 @@ class TemplatedInvoicePDFGenerator:
             'service': 'Template Jasa & Konsultasi'
         }
     
+    def _use_fonts(self, family):
+        """Switch fonts and the matching stylesheet for the next render"""
+        if family.name not in self._stylesheets:
+            self._stylesheets[family.name] = apply_font_family(getSampleStyleSheet(), family)
+        self.fonts = family
+        self.styles = self._stylesheets[family.name]
+    
+    def _profile_fonts(self, profile, invoice_data, items_data, company_info):
+        """Fonts for a render: compact PDFs skip embedding when the base-14 fonts can show all text"""
+        if profile != 'compact' or not self.default_fonts.embedded:
+            return self.default_fonts
+        texts = [value for _, value in invoice_data.items() if isinstance(value, str)]
+        texts += [value for value in company_info.values() if isinstance(value, str)]
+        if len(items_data):
+            texts += items_data['product_name'].astype(str).tolist()
+        return BASE14_FAMILY if _fits_winansi(texts) else self.default_fonts
+    
     def get_available_templates(self):
         """Get list of available templates"""
         return self.templates
     
-    def create_invoice_pdf(self, invoice_data, items_data, company_info=None, template='classic'):
-        """Generate PDF invoice with selected template"""
+    def create_invoice_pdf(self, invoice_data, items_data, company_info=None, template='classic', profile=None):
+        """Generate PDF invoice with selected template and output profile"""
+        started = time.perf_counter()
+        profile = profile or self.profile
+        if profile not in PDF_PROFILES:
+            raise ValueError(f"Profil PDF tidak dikenal: {profile}")
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=self.page_size, 
-                               topMargin=0.5*inch, bottomMargin=0.5*inch)
+                               topMargin=0.5*inch, bottomMargin=0.5*inch, **PDF_PROFILES[profile])
         
         # Format company info
         company_info = self._format_company_info(company_info)
+        self._use_fonts(self._profile_fonts(profile, invoice_data, items_data, company_info))
         
         # Generate story based on template
         if template == 'classic':
@@ -55,13 +141,31 @@ class TemplatedInvoicePDFGenerator:
         else:
             story = self._create_classic_template(invoice_data, items_data, company_info)
         
-        # Build PDF
-        doc.build(story)
+        story_done = time.perf_counter()
+        
+        # Build PDF; the canvas reports the serialization part of the build
+        timings = {}
+        doc.build(story, canvasmaker=partial(_TimedCanvas, timings=timings, compact=profile == 'compact'))
+        build_seconds = time.perf_counter() - story_done
         
         # Get PDF data
         pdf_data = buffer.getvalue()
         buffer.close()
         
+        serialize_seconds = timings.get('serialize', 0.0)
+        self.last_render = {
+            'template': template if template in self.templates else 'classic',
+            'item_count': len(items_data),
+            'phases': {
+                'story': story_done - started,
+                'layout': build_seconds - serialize_seconds,
+                'serialize': serialize_seconds
+            },
+            'size_bytes': len(pdf_data)
+        }
+        if self.metrics is not None:
+            self.metrics.record(**self.last_render)
+        
         return pdf_data
     
     def _format_company_info(self, company_info):
@@ -85,12 +189,27 @@ class TemplatedInvoicePDFGenerator:
             formatted_info['website'] = company_info['website']
         if company_info.get('npwp'):
             formatted_info['npwp'] = company_info['npwp']
+        if company_info.get('logo'):
+            formatted_info['logo'] = company_info['logo']
+            formatted_info['logo_version'] = company_info.get('logo_version')
             
         return formatted_info
     
+    def _create_logo(self, company_info, h_align='CENTER', max_width=2*inch, max_height=0.9*inch):
+        """Company logo flowables, empty when no logo is set"""
+        if not company_info.get('logo'):
+            return []
+        try:
+            reader, width, height = logo_cache.get(company_info['logo'], company_info.get('logo_version'),
+                                                   max_width, max_height)
+        except Exception:
+            # A broken logo must not stop the invoice from rendering
+            return []
+        return [LogoImage(reader, width, height, h_align), Spacer(1, 10)]
+    
     def _create_classic_template(self, invoice_data, items_data, company_info):
         """Classic Professional Template - Traditional business style"""
-        story = []
+        story = self._create_logo(company_info, 'CENTER')
         
         # Header
         header_style = ParagraphStyle(
@@ -140,8 +259,8 @@ class TemplatedInvoicePDFGenerator:
         
         info_table = Table(info_data, colWidths=[1.5*inch, 2*inch, 1*inch, 2.5*inch])
         info_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (1, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (2, 0), (3, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 0), (1, -1), self.fonts.bold),
+            ('FONTNAME', (2, 0), (3, -1), self.fonts.bold),
             ('FONTSIZE', (0, 0), (-1, -1), 10),
             ('VALIGN', (0, 0), (-1, -1), 'TOP'),
             ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
@@ -167,7 +286,7 @@ class TemplatedInvoicePDFGenerator:
     
     def _create_modern_template(self, invoice_data, items_data, company_info):
         """Modern Minimalist Template - Clean and contemporary"""
-        story = []
+        story = self._create_logo(company_info, 'LEFT')
         
         # Header with line separator
         header_style = ParagraphStyle(
@@ -221,7 +340,7 @@ class TemplatedInvoicePDFGenerator:
         info_card_table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#ECF0F1')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#2C3E50')),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 0), (-1, 0), self.fonts.bold),
             ('FONTSIZE', (0, 0), (-1, -1), 10),
             ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
@@ -258,7 +377,7 @@ class TemplatedInvoicePDFGenerator:
     
     def _create_creative_template(self, invoice_data, items_data, company_info):
         """Creative Colorful Template - For creative industries"""
-        story = []
+        story = self._create_logo(company_info, 'CENTER')
         
         # Creative header with gradient-like effect
         header_style = ParagraphStyle(
@@ -275,7 +394,7 @@ class TemplatedInvoicePDFGenerator:
         border_table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (0, 0), colors.HexColor('#E67E22')),
             ('BACKGROUND', (2, 0), (2, 0), colors.HexColor('#E67E22')),
-            ('FONTNAME', (1, 0), (1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (1, 0), (1, 0), self.fonts.bold),
             ('FONTSIZE', (1, 0), (1, 0), 30),
             ('TEXTCOLOR', (1, 0), (1, 0), colors.HexColor('#8E44AD')),
             ('ALIGN', (1, 0), (1, 0), 'CENTER'),
@@ -294,7 +413,7 @@ class TemplatedInvoicePDFGenerator:
         company_table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#3498DB')),
             ('TEXTCOLOR', (0, 0), (-1, -1), colors.white),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTNAME', (0, 0), (-1, -1), self.fonts.regular),
             ('FONTSIZE', (0, 0), (-1, -1), 10),
             ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
@@ -346,7 +465,7 @@ class TemplatedInvoicePDFGenerator:
                 section[0].setStyle(TableStyle([
                     ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#9B59B6')),
                     ('TEXTCOLOR', (0, 0), (-1, -1), colors.white),
-                    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+                    ('FONTNAME', (0, 0), (-1, -1), self.fonts.bold),
                     ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
                     ('TOPPADDING', (0, 0), (-1, -1), 8),
                     ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
@@ -354,21 +473,21 @@ class TemplatedInvoicePDFGenerator:
                 section[1].setStyle(TableStyle([
                     ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#E67E22')),
                     ('TEXTCOLOR', (0, 0), (-1, -1), colors.white),
-                    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+                    ('FONTNAME', (0, 0), (-1, -1), self.fonts.bold),
                     ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
                     ('TOPPADDING', (0, 0), (-1, -1), 8),
                     ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
                 ]))
             else:
                 section[0].setStyle(TableStyle([
-                    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+                    ('FONTNAME', (0, 0), (0, -1), self.fonts.bold),
                     ('FONTSIZE', (0, 0), (-1, -1), 9),
                     ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#BDC3C7')),
                     ('TOPPADDING', (0, 0), (-1, -1), 6),
                     ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
                 ]))
                 section[1].setStyle(TableStyle([
-                    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+                    ('FONTNAME', (0, 0), (0, -1), self.fonts.bold),
                     ('FONTSIZE', (0, 0), (-1, -1), 9),
                     ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#BDC3C7')),
                     ('TOPPADDING', (0, 0), (-1, -1), 6),
@@ -420,13 +539,13 @@ class TemplatedInvoicePDFGenerator:
             items_table.setStyle(TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
                 ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTNAME', (0, 0), (-1, 0), self.fonts.bold),
                 ('FONTSIZE', (0, 0), (-1, 0), 12),
                 ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 1), (-1, -4), 'Helvetica'),
+                ('FONTNAME', (0, 1), (-1, -4), self.fonts.regular),
                 ('FONTSIZE', (0, 1), (-1, -4), 10),
                 ('GRID', (0, 0), (-1, -4), 1, colors.black),
-                ('FONTNAME', (0, -3), (-1, -1), 'Helvetica-Bold'),
+                ('FONTNAME', (0, -3), (-1, -1), self.fonts.bold),
                 ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
                 ('GRID', (2, -3), (-1, -1), 1, colors.black),
                 ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
@@ -435,13 +554,13 @@ class TemplatedInvoicePDFGenerator:
             items_table.setStyle(TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495E')),
                 ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTNAME', (0, 0), (-1, 0), self.fonts.bold),
                 ('FONTSIZE', (0, 0), (-1, 0), 11),
                 ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 1), (-1, -4), 'Helvetica'),
+                ('FONTNAME', (0, 1), (-1, -4), self.fonts.regular),
                 ('FONTSIZE', (0, 1), (-1, -4), 10),
                 ('GRID', (0, 0), (-1, -4), 1, colors.HexColor('#BDC3C7')),
-                ('FONTNAME', (0, -3), (-1, -1), 'Helvetica-Bold'),
+                ('FONTNAME', (0, -3), (-1, -1), self.fonts.bold),
                 ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#3498DB')),
                 ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
                 ('GRID', (2, -3), (-1, -1), 1, colors.HexColor('#BDC3C7')),
@@ -452,13 +571,13 @@ class TemplatedInvoicePDFGenerator:
             items_table.setStyle(TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#8E44AD')),
                 ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTNAME', (0, 0), (-1, 0), self.fonts.bold),
                 ('FONTSIZE', (0, 0), (-1, 0), 11),
                 ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 1), (-1, -4), 'Helvetica'),
+                ('FONTNAME', (0, 1), (-1, -4), self.fonts.regular),
                 ('FONTSIZE', (0, 1), (-1, -4), 10),
                 ('GRID', (0, 0), (-1, -4), 2, colors.HexColor('#9B59B6')),
-                ('FONTNAME', (0, -3), (-1, -1), 'Helvetica-Bold'),
+                ('FONTNAME', (0, -3), (-1, -1), self.fonts.bold),
                 ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#E74C3C')),
                 ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
                 ('GRID', (2, -3), (-1, -1), 2, colors.HexColor('#C0392B')),
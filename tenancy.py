@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Mode multi-tenant: satu proses melayani banyak perusahaan (UMKM).
+
+Setiap tenant punya file SQLite sendiri ``<tenant_dir>/<tenant_id>.db``,
+sehingga ``company_settings``, nomor invoice, arsip, dan backup tetap
+terpisah per perusahaan tanpa mengubah skema.
+
+``TenantRegistry`` menyimpan tenant yang terakhir dipakai dalam LRU: objek
+``Database`` (migrasi skema hanya dijalankan saat tenant pertama dibuka),
+pengaturan perusahaan beserta logo, index pencarian produk, dan mirror
+analitik DuckDB bila diaktifkan. Cache divalidasi lewat ``table_versions``,
+jadi perubahan dari proses lain tetap terlihat. Bila jumlah tenant terbuka
+melebihi ``max_open``, tenant yang paling lama tidak dipakai ditutup; tenant
+yang sedang melayani request tidak pernah ditutup. Koneksi SQLite tetap
+dibuka per pemanggilan seperti di ``Database``, sehingga file yang terbuka
+terus hanyalah mirror DuckDB milik tenant di dalam LRU.
+
+Jalankan:  python tenancy.py create <tenant_id>
+           python tenancy.py list
+           python tenancy.py benchmark --tenants 300
+"""
+
+import argparse
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from database import Database
+from product_index import ProductIndex
+
+TENANT_DIR = os.environ.get('INVOICE_TENANT_DIR', "tenants")
+
+# Tenants kept open with their caches; the least recently used idle one is closed beyond this
+TENANT_MAX_OPEN = int(os.environ.get('INVOICE_TENANT_MAX_OPEN', 64))
+
+# Lowercase letters, digits, '-' and '_': safe as a file name, no path traversal
+TENANT_ID_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,62}$')
+
+
+def validate_tenant_id(tenant_id):
+    if not isinstance(tenant_id, str) or not TENANT_ID_PATTERN.match(tenant_id):
+        raise ValueError(f"ID tenant tidak valid: {tenant_id!r} (huruf kecil, angka, '-' atau '_')")
+    return tenant_id
+
+
+def tenant_db_path(tenant_id, tenant_dir=TENANT_DIR):
+    return os.path.join(tenant_dir, f"{validate_tenant_id(tenant_id)}.db")
+
+
+class Tenant:
+    """One company's database with the caches worth keeping between requests"""
+
+    def __init__(self, tenant_id, db):
+        self.tenant_id = tenant_id
+        self.db = db
+        self.users = 0
+        self._lock = threading.Lock()
+        self._settings = (None, None)
+        self._product_index = None
+        self._analytics = None
+
+    def company_settings(self):
+        """Company settings (including the logo), read again only after they change"""
+        version = self.db.get_table_version('company_settings')
+        with self._lock:
+            cached_version, settings = self._settings
+        if cached_version != version:
+            settings = self.db.get_company_settings()
+            with self._lock:
+                self._settings = (version, settings)
+        return dict(settings) if settings else settings
+
+    def product_index(self):
+        """Product picker index, rebuilt only when the products table changes"""
+        version = self.db.get_table_version('products')
+        index = self._product_index
+        if index is None or index.version != version:
+            index = ProductIndex(self.db.get_products(), version)
+            self._product_index = index
+        return index
+
+    def analytics(self):
+        """Report engine of this tenant (see ``analytics_engine.open_analytics``)"""
+        with self._lock:
+            if self._analytics is None:
+                from analytics_engine import open_analytics
+                self._analytics = open_analytics(self.db)
+            return self._analytics
+
+    def close(self):
+        with self._lock:
+            analytics, self._analytics = self._analytics, None
+            self._settings = (None, None)
+            self._product_index = None
+        if analytics is not None and analytics is not self.db:
+            analytics.close()
+
+
+class TenantRegistry:
+    """LRU of open tenants, at most ``max_open`` of them idle at a time"""
+
+    def __init__(self, tenant_dir=TENANT_DIR, max_open=TENANT_MAX_OPEN):
+        self.tenant_dir = tenant_dir
+        self.max_open = max(int(max_open), 1)
+        self._tenants = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.opened = 0
+        self.evicted = 0
+
+    def list_tenants(self):
+        """IDs of all tenants that have a database file"""
+        if not os.path.isdir(self.tenant_dir):
+            return []
+        return sorted(name[:-3] for name in os.listdir(self.tenant_dir)
+                      if name.endswith('.db') and TENANT_ID_PATTERN.match(name[:-3]))
+
+    def create_tenant(self, tenant_id):
+        """Create the database of a new tenant"""
+        try:
+            path = tenant_db_path(tenant_id, self.tenant_dir)
+        except ValueError as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
+        if os.path.exists(path):
+            return {
+                'success': False,
+                'message': f"Tenant '{tenant_id}' sudah ada"
+            }
+
+        os.makedirs(self.tenant_dir, exist_ok=True)
+        Database(path)
+        return {
+            'success': True,
+            'message': f"Tenant '{tenant_id}' berhasil dibuat"
+        }
+
+    def acquire(self, tenant_id):
+        """Open (or reuse) a tenant and mark it in use until ``release``.
+
+        Raises ``ValueError`` for a malformed ID and ``KeyError`` for an unknown tenant.
+        """
+        path = tenant_db_path(tenant_id, self.tenant_dir)
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is not None:
+                self._tenants.move_to_end(tenant_id)
+                tenant.users += 1
+                self.hits += 1
+                return tenant
+
+        if not os.path.exists(path):
+            raise KeyError(tenant_id)
+        # Runs the schema checks, so outside the lock; a concurrent opener of the same tenant is harmless
+        db = Database(path)
+
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is None:
+                tenant = self._tenants[tenant_id] = Tenant(tenant_id, db)
+                self.opened += 1
+            self._tenants.move_to_end(tenant_id)
+            tenant.users += 1
+            evicted = self._evict_idle()
+        self._close(evicted)
+        return tenant
+
+    def release(self, tenant):
+        with self._lock:
+            tenant.users -= 1
+            evicted = self._evict_idle()
+        self._close(evicted)
+
+    @contextmanager
+    def tenant(self, tenant_id):
+        """``with registry.tenant('toko-maju') as tenant: tenant.db.get_invoices()``"""
+        tenant = self.acquire(tenant_id)
+        try:
+            yield tenant
+        finally:
+            self.release(tenant)
+
+    def _evict_idle(self):
+        # Called with the lock held; tenants serving a request stay until released
+        evicted = []
+        for tenant_id in list(self._tenants):
+            if len(self._tenants) <= self.max_open:
+                break
+            if self._tenants[tenant_id].users == 0:
+                evicted.append(self._tenants.pop(tenant_id))
+        self.evicted += len(evicted)
+        return evicted
+
+    def _close(self, tenants):
+        for tenant in tenants:
+            tenant.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'open': len(self._tenants),
+                'max_open': self.max_open,
+                'hits': self.hits,
+                'opened': self.opened,
+                'evicted': self.evicted
+            }
+
+    def close(self):
+        with self._lock:
+            tenants = list(self._tenants.values())
+            self._tenants.clear()
+        self._close(tenants)
+
+
+def run_benchmark(tenants=300, requests=3000, max_open=TENANT_MAX_OPEN, products=200):
+    """Seconds per request (settings + product search) through the registry, versus a new Database per request"""
+    with tempfile.TemporaryDirectory() as directory:
+        registry = TenantRegistry(directory, max_open=max_open)
+        tenant_ids = [f"umkm-{number:04d}" for number in range(tenants)]
+        for tenant_id in tenant_ids:
+            registry.create_tenant(tenant_id)
+            db = Database(tenant_db_path(tenant_id, directory))
+            db.update_company_settings(f"Toko {tenant_id}", "Jl. Merdeka 1", "021-555", f"{tenant_id}@example.com")
+            conn = db._connect()
+            conn.executemany("INSERT INTO products (name, price) VALUES (?, ?)",
+                             ((f"Produk {tenant_id} {number}", 1000 + number) for number in range(products)))
+            conn.commit()
+            conn.close()
+
+        # A few busy tenants and a long tail, as with real customers
+        rng = random.Random(42)
+        picks = rng.choices(tenant_ids, weights=[1 / (rank + 1) for rank in range(tenants)], k=requests)
+
+        started = time.perf_counter()
+        for tenant_id in picks:
+            with registry.tenant(tenant_id) as tenant:
+                tenant.company_settings()
+                tenant.product_index().search("produk 1")
+        registry_seconds = (time.perf_counter() - started) / requests
+        stats = registry.stats()
+        registry.close()
+
+        sample = picks[:max(requests // 10, 1)]
+        started = time.perf_counter()
+        for tenant_id in sample:
+            db = Database(tenant_db_path(tenant_id, directory))
+            db.get_company_settings()
+            ProductIndex(db.get_products()).search("produk 1")
+        uncached_seconds = (time.perf_counter() - started) / len(sample)
+
+    return {
+        'tenants': tenants,
+        'requests': requests,
+        'registry_ms': registry_seconds * 1000,
+        'uncached_ms': uncached_seconds * 1000,
+        **stats
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kelola tenant (satu database per perusahaan)")
+    parser.add_argument('--tenant-dir', default=TENANT_DIR, help="Folder database tenant")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    create_parser = subparsers.add_parser('create', help="Buat tenant baru")
+    create_parser.add_argument('tenant_id')
+    subparsers.add_parser('list', help="Daftar tenant")
+    benchmark_parser = subparsers.add_parser('benchmark', help="Ukur waktu request dengan dan tanpa LRU tenant")
+    benchmark_parser.add_argument('--tenants', type=int, default=300)
+    benchmark_parser.add_argument('--requests', type=int, default=3000)
+    benchmark_parser.add_argument('--max-open', type=int, default=TENANT_MAX_OPEN)
+    args = parser.parse_args()
+
+    registry = TenantRegistry(args.tenant_dir)
+    if args.command == 'create':
+        result = registry.create_tenant(args.tenant_id)
+        print(("✅ " if result['success'] else "❌ ") + result['message'])
+    elif args.command == 'list':
+        for tenant_id in registry.list_tenants():
+            print(tenant_id)
+    else:
+        result = run_benchmark(args.tenants, args.requests, args.max_open)
+        print(f"🏢 {result['tenants']} tenant, {result['requests']:,} request, maks {result['max_open']} terbuka: "
+              f"{result['registry_ms']:.2f} ms/request lewat registry "
+              f"(tanpa cache: {result['uncached_ms']:.2f} ms), "
+              f"{result['opened']} kali dibuka, {result['evicted']} kali ditutup")
+
+
+if __name__ == "__main__":
+    main()
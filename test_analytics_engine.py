@@ -0,0 +1,74 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from archive import archive_closed_invoices
+from database import Database
+
+pytest.importorskip('duckdb')
+
+from analytics_engine import DuckDBAnalytics, open_analytics  # noqa: E402
+
+
+def _assert_same_reports(db, analytics):
+    reports = {
+        'get_sales_summary': lambda engine: engine.get_sales_summary('2025-01-01', '2025-12-31'),
+        'get_product_sales': lambda engine: engine.get_product_sales(),
+        'get_product_sales_by_month': lambda engine: engine.get_product_sales_by_month(product_ids=[1, 2]),
+        'get_receivables_aging': lambda engine: engine.get_receivables_aging('2025-05-15'),
+        'get_cash_flow_forecast': lambda engine: engine.get_cash_flow_forecast(8, '2025-03-01'),
+    }
+    for name, report in reports.items():
+        expected = report(db)
+        assert len(expected) > 0, name
+        pd.testing.assert_frame_equal(report(analytics), expected, check_dtype=False, obj=name)
+
+
+def test_duckdb_mirror_matches_sqlite_and_refreshes_incrementally(tmp_path):
+    """Laporan dari mirror DuckDB sama dengan SQLite dan diperbarui tanpa salin ulang penuh"""
+    db = Database(str(tmp_path / "analytics.db"))
+    kopi = db.add_product("Kopi", 25000)['product_id']
+    teh = db.add_product("Teh", 15000)['product_id']
+    customers = [db.add_customer(name) for name in ("PT Maju", "CV Jaya", "Toko Sejahtera")]
+    invoice_ids = []
+    for number in range(12):
+        items = [{'product_name': 'Kopi', 'quantity': 1 + number % 3, 'unit_price': 25000, 'product_id': kopi},
+                 {'product_name': 'Teh', 'quantity': 2, 'unit_price': 15000, 'product_id': teh},
+                 {'product_name': f"Ongkir {number % 2}", 'quantity': 1, 'unit_price': 10000}]
+        invoice_ids.append(db.create_invoice(customers[number % 3], items, f"2025-{1 + number % 4:02d}-{10 + number}",
+                                             f"2025-{2 + number % 4:02d}-{10 + number}")[0])
+    db.bulk_update_invoice_status('Sent', invoice_ids=invoice_ids[:6])
+
+    analytics = DuckDBAnalytics(db, str(tmp_path / "analytics.duckdb"))
+    _assert_same_reports(db, analytics)
+    assert analytics.last_refresh['mode'] == 'full'
+    assert analytics.refresh()['mode'] == 'current'
+
+    # A new invoice is appended; the existing rows are not copied again
+    db.create_invoice(customers[0], [{'product_name': 'Kopi', 'quantity': 5, 'unit_price': 25000}],
+                      '2025-03-20', '2025-04-20')
+    refresh = analytics.refresh()
+    assert (refresh['mode'], refresh['rows']) == ('append', 2)
+    _assert_same_reports(db, analytics)
+
+    # A status change reloads the invoices, not the line items
+    db.bulk_update_invoice_status('Paid', invoice_ids=invoice_ids[:3])
+    assert analytics.refresh()['mode'] == 'invoices'
+    _assert_same_reports(db, analytics)
+
+    # Archived invoices leave the mirror with their items; the summary still includes them
+    assert archive_closed_invoices(db, older_than_months=1, today=date(2025, 3, 1))['archived'] == {2025: 1}
+    assert analytics.refresh()['mode'] == 'invoices'
+    _assert_same_reports(db, analytics)
+    analytics.close()
+
+    # The mirror file survives a restart
+    reopened = DuckDBAnalytics(db, str(tmp_path / "analytics.duckdb"))
+    assert reopened.refresh()['mode'] == 'current'
+    reopened.close()
+
+
+def test_open_analytics_falls_back_to_sqlite(tmp_path):
+    db = Database(str(tmp_path / "analytics.db"))
+    assert open_analytics(db, engine='sqlite') is db
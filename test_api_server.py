@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test untuk HTTP API lokal (api_server.py)
+"""
+
+import asyncio
+import json
+
+from api_server import InvoiceAPIServer
+from database import Database
+from tenancy import TenantRegistry, tenant_db_path
+
+# A hung render or locked database must fail the test instead of blocking the suite
+TEST_TIMEOUT = 120
+
+
+async def _request(port, method, path, payload=None, tenant=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    tenant_header = f"X-Tenant-ID: {tenant}\r\n" if tenant else ""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n{tenant_header}"
+        f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+
+    head, _, content = response.partition(b'\r\n\r\n')
+    status = int(head.split()[1])
+    if b'application/json' in head:
+        content = json.loads(content)
+    return status, content
+
+
+def test_invoice_api_roundtrip(tmp_path):
+    """Buat invoice via API lalu ambil detail, daftar, dan PDF-nya"""
+    db_name = str(tmp_path / "api_test.db")
+    customer_id = Database(db_name).add_customer("PT Maju", "maju@example.com")
+
+    async def scenario():
+        server = InvoiceAPIServer(db_name, port=0, render_workers=1)
+        port = await server.start()
+        try:
+            payload = {
+                'customer_id': customer_id,
+                'items': [{'product_name': 'Jasa Desain', 'quantity': 2, 'unit_price': 150000}],
+                'issue_date': '2025-03-01',
+                'due_date': '2025-03-31',
+                'tax_rate': 11.0
+            }
+            created = await asyncio.gather(*[
+                _request(port, 'POST', '/invoices', payload) for _ in range(5)
+            ])
+            assert all(status == 201 for status, _ in created)
+            assert len({body['invoice_number'] for _, body in created}) == 5
+
+            invoice_id = created[0][1]['id']
+            status, invoice = await _request(port, 'GET', f'/invoices/{invoice_id}')
+            assert status == 200
+            assert invoice['customer_name'] == "PT Maju"
+            assert invoice['items'][0]['quantity'] == 2
+
+            status, listing = await _request(port, 'GET', '/invoices?page=2&per_page=2')
+            assert status == 200
+            assert listing['total'] == 5
+            assert len(listing['invoices']) == 2
+
+            status, pdf = await _request(port, 'GET', f'/invoices/{invoice_id}/pdf?template=modern')
+            assert status == 200
+            assert pdf.startswith(b'%PDF')
+
+            status, metrics = await _request(port, 'GET', '/metrics')
+            assert status == 200
+            assert b'invoice_pdf_render_phase_seconds_bucket{template="modern",items="1-5",phase="layout"' in metrics
+
+            status, error = await _request(port, 'GET', '/invoices/9999')
+            assert status == 404
+
+            status, error = await _request(port, 'POST', '/invoices', {'customer_id': customer_id, 'items': []})
+            assert status == 400
+
+            bad_payload = dict(payload, due_date='31-03-2025')
+            status, error = await _request(port, 'POST', '/invoices', bad_payload)
+            assert status == 400
+            assert 'due_date' in error['error']
+
+            status, error = await _request(port, 'POST', '/invoices', dict(payload, tax_rate='sebelas'))
+            assert status == 400
+            assert 'tax_rate' in error['error']
+        finally:
+            await server.close()
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=TEST_TIMEOUT))
+
+
+def test_hundreds_of_concurrent_requests(tmp_path):
+    """Server melayani ratusan request create dan GET secara bersamaan"""
+    db_name = str(tmp_path / "api_load_test.db")
+    customer_id = Database(db_name).add_customer("CV Sejahtera")
+
+    async def scenario():
+        server = InvoiceAPIServer(db_name, port=0, render_workers=1)
+        port = await server.start()
+        try:
+            payload = {
+                'customer_id': customer_id,
+                'items': [{'product_name': 'Beras 5kg', 'quantity': 1, 'unit_price': 75000}]
+            }
+            results = await asyncio.gather(*(
+                [_request(port, 'POST', '/invoices', payload) for _ in range(200)] +
+                [_request(port, 'GET', '/invoices?per_page=5') for _ in range(200)]
+            ))
+
+            assert all(status in (200, 201) for status, _ in results)
+            numbers = {body['invoice_number'] for status, body in results if status == 201}
+            assert len(numbers) == 200
+
+            status, listing = await _request(port, 'GET', '/invoices?per_page=1')
+            assert listing['total'] == 200
+        finally:
+            await server.close()
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=TEST_TIMEOUT))
+
+
+def test_tenant_header_selects_the_company_database(tmp_path):
+    """Mode multi-tenant: setiap perusahaan punya database dan nomor invoice sendiri"""
+    tenant_dir = str(tmp_path / "tenants")
+    registry = TenantRegistry(tenant_dir)
+    customers = {}
+    for tenant_id in ('toko-a', 'toko-b'):
+        registry.create_tenant(tenant_id)
+        customers[tenant_id] = Database(tenant_db_path(tenant_id, tenant_dir)).add_customer(f"Pelanggan {tenant_id}")
+
+    async def scenario():
+        server = InvoiceAPIServer(port=0, render_workers=1, tenant_dir=tenant_dir, max_open_tenants=1)
+        port = await server.start()
+        try:
+            payload = {'items': [{'product_name': 'Kopi', 'quantity': 1, 'unit_price': 25000}]}
+            created = await asyncio.gather(*[
+                _request(port, 'POST', '/invoices', dict(payload, customer_id=customers[tenant_id]), tenant=tenant_id)
+                for tenant_id in ('toko-a', 'toko-b', 'toko-a')
+            ])
+            assert [status for status, _ in created] == [201, 201, 201]
+
+            status, listing = await _request(port, 'GET', '/invoices', tenant='toko-a')
+            assert listing['total'] == 2
+            assert {invoice['customer_name'] for invoice in listing['invoices']} == {"Pelanggan toko-a"}
+
+            assert (await _request(port, 'GET', '/invoices'))[0] == 400
+            assert (await _request(port, 'GET', '/invoices', tenant='../rahasia'))[0] == 400
+            assert (await _request(port, 'GET', '/invoices', tenant='toko-c'))[0] == 404
+            assert server.tenants.stats()['open'] == 1
+        finally:
+            await server.close()
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=TEST_TIMEOUT))
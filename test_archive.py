@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test untuk arsip invoice per tahun (archive.py)
+"""
+
+import os
+from datetime import date
+
+from archive import archive_closed_invoices
+from database import Database
+
+
+def test_archive_moves_closed_invoices_and_attaches_on_read(tmp_path):
+    """Invoice lama yang sudah lunas pindah ke file tahunan dan tetap bisa dibaca"""
+    db = Database(str(tmp_path / "hot.db"))
+    customer_id = db.add_customer("Andi")
+    product_id = db.add_product("Kopi", 10000)['product_id']
+    item = [{'product_name': 'Kopi', 'quantity': 2, 'unit_price': 10000}]
+
+    old_paid, _ = db.create_invoice(customer_id, item, '2022-03-01', '2022-03-31', tax_rate=0)
+    old_paid_2023, _ = db.create_invoice(customer_id, item, '2023-06-01', '2023-06-30', tax_rate=0)
+    old_open, _ = db.create_invoice(customer_id, item, '2022-04-01', '2022-04-30', tax_rate=0)
+    recent, _ = db.create_invoice(customer_id, item, '2025-05-01', '2025-05-31', tax_rate=0)
+    db.bulk_update_invoice_status('Paid', invoice_ids=[old_paid, old_paid_2023, recent])
+
+    result = archive_closed_invoices(db, older_than_months=12, today=date(2025, 6, 15))
+    assert result['success']
+    assert result['archived'] == {2022: 1, 2023: 1}
+    assert os.path.exists(db.archive_path(2022)) and os.path.exists(db.archive_path(2023))
+
+    # Hot database keeps only open and recent invoices
+    assert sorted(db.get_invoices()['id']) == [old_open, recent]
+
+    invoice, items_df = db.get_invoice_details(old_paid)
+    assert invoice['customer_name'] == "Andi"
+    assert items_df['total_price'].tolist() == [20000]
+
+    summary = db.get_sales_summary('2022-01-01', '2023-12-31')
+    assert summary['invoice_count'].sum() == 3
+    assert summary['total_sales'].sum() == 60000
+    assert db.get_sales_summary('2025-01-01', '2025-12-31')['total_sales'].sum() == 20000
+
+    # Archived invoices still protect their customer and product
+    assert not db.delete_customer(customer_id)['success']
+    assert not db.delete_product(product_id)['success']
+
+    # Running again finds nothing new
+    assert archive_closed_invoices(db, older_than_months=12, today=date(2025, 6, 15))['archived'] == {}
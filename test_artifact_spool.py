@@ -0,0 +1,41 @@
+import os
+import time
+
+from artifact_spool import ArtifactSpool
+
+
+def test_put_and_read_per_owner(tmp_path):
+    """Handle hanya bisa dibaca oleh sesi pemiliknya"""
+    spool = ArtifactSpool(str(tmp_path / "spool"))
+    handle = spool.put("sesi-a", b"%PDF-1.4 contoh", "sample_invoice_classic.pdf")
+
+    assert handle['size'] == len(b"%PDF-1.4 contoh")
+    assert spool.read("sesi-a", handle) == b"%PDF-1.4 contoh"
+    assert spool.read("sesi-b", handle) is None
+    assert spool.read("sesi-a", {'id': '../../etc/passwd'}) is None
+
+    spool.discard("sesi-a", handle)
+    assert spool.read("sesi-a", handle) is None
+    assert spool.usage() == {'files': 0, 'bytes': 0}
+
+
+def test_ttl_and_size_eviction(tmp_path):
+    spool = ArtifactSpool(str(tmp_path / "spool"), ttl_seconds=60, max_bytes=2500)
+    expired = spool.put("sesi-a", b"x" * 1000, "lama.pdf")
+    old_path = os.path.join(spool._owner_dir("sesi-a"), expired['id'])
+    os.utime(old_path, (time.time() - 120, time.time() - 120))
+
+    first = spool.put("sesi-b", b"y" * 1000, "pertama.pdf")
+    second = spool.put("sesi-c", b"z" * 1000, "kedua.pdf")
+    assert spool.read("sesi-a", expired) is None
+
+    # Reading the first file makes the second the least recently used one
+    past = time.time() - 30
+    os.utime(os.path.join(spool._owner_dir("sesi-c"), second['id']), (past, past))
+    assert spool.read("sesi-b", first) is not None
+    third = spool.put("sesi-d", b"w" * 1000, "ketiga.pdf")
+
+    assert spool.read("sesi-c", second) is None
+    assert spool.read("sesi-b", first) is not None
+    assert spool.read("sesi-d", third) is not None
+    assert spool.usage() == {'files': 2, 'bytes': 2000}
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Test untuk backup dan restore database (backup.py)
+"""
+
+from backup import create_snapshot, list_snapshots, restore_snapshot, verify_snapshot
+from database import Database
+
+
+def test_snapshot_verify_rotate_and_restore(tmp_path):
+    """Snapshot terverifikasi, dirotasi, dan bisa dipakai untuk restore"""
+    db_name = str(tmp_path / "live.db")
+    backup_dir = str(tmp_path / "backups")
+    db = Database(db_name)
+    db.add_customer("Andi")
+
+    first = create_snapshot(db_name, backup_dir, keep=2, pages=1)
+    assert first['success']
+    assert verify_snapshot(first['path'])['success']
+
+    db.add_customer("Budi")
+    create_snapshot(db_name, backup_dir, keep=2)
+    create_snapshot(db_name, backup_dir, keep=2)
+    snapshots = list_snapshots(db_name, backup_dir)
+    assert len(snapshots) == 2
+    assert first['path'] not in [snapshot['path'] for snapshot in snapshots]
+
+    # A corrupted snapshot is refused
+    with open(snapshots[0]['path'], 'r+b') as f:
+        f.seek(200)
+        f.write(b'rusak')
+    assert not verify_snapshot(snapshots[0]['path'])['success']
+    assert not restore_snapshot(snapshots[0]['path'], db_name, backup_dir)['success']
+
+    db.add_customer("Citra")
+    result = restore_snapshot(snapshots[1]['path'], db_name, backup_dir)
+    assert result['success']
+    assert list(db.get_customers()['name']) == ["Andi", "Budi"]
+    assert any('pre-restore' in snapshot['name'] for snapshot in list_snapshots(db_name, backup_dir))
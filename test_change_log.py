@@ -0,0 +1,67 @@
+from datetime import date
+
+from archive import archive_closed_invoices
+from database import Database
+
+
+def _entries(df):
+    return list(zip(df['table_name'], df['row_id'], df['operation']))
+
+
+def test_changes_are_read_in_batches_from_the_consumer_offset(tmp_path):
+    """Perubahan customer, produk, dan invoice dibaca per batch dari offset consumer"""
+    db = Database(str(tmp_path / "changes.db"))
+    assert db.register_change_consumer('erp')['success']
+
+    customer_id = db.add_customer("PT Maju")
+    product_id = db.add_product("Kopi", 25000)['product_id']
+    invoice_id, _ = db.create_invoice(customer_id, [{'product_name': 'Kopi', 'quantity': 2, 'unit_price': 25000}],
+                                      '2025-01-10', '2025-02-10')
+    db.update_product(product_id, "Kopi Arabika", 30000)
+
+    changes = db.get_changes('erp', limit=3)
+    assert _entries(changes) == [('customers', customer_id, 'insert'), ('products', product_id, 'insert'),
+                                 ('invoices', invoice_id, 'insert')]
+    # Reading does not move the offset until the batch is acknowledged
+    assert db.get_changes('erp', limit=3)['id'].tolist() == changes['id'].tolist()
+    assert db.ack_changes('erp', changes['id'].iloc[-1])['success']
+
+    changes = db.get_changes('erp')
+    assert _entries(changes) == [('invoice_items', 1, 'insert'), ('products', product_id, 'update')]
+    assert changes['parent_id'].iloc[0] == invoice_id
+    db.ack_changes('erp', changes['id'].iloc[-1])
+    assert db.get_changes('erp').empty
+
+    # Archived invoices are reported as archived, not deleted
+    db.update_invoice_status(invoice_id, 'Paid')
+    archive_closed_invoices(db, older_than_months=1, today=date(2025, 6, 1))
+    assert _entries(db.get_changes('erp')) == [('invoices', invoice_id, 'update'), ('invoices', invoice_id, 'archive'),
+                                               ('invoice_items', 1, 'archive')]
+
+    assert not db.ack_changes('unknown', 1)['success']
+
+
+def test_compaction_keeps_entries_a_consumer_still_needs(tmp_path):
+    db = Database(str(tmp_path / "changes.db"))
+    for number in range(5):
+        db.add_customer(f"Customer {number}")
+    # Nothing is removed while no consumer has registered
+    assert db.compact_change_log() == 0
+
+    db.register_change_consumer('erp')
+    db.register_change_consumer('crm')
+    db.register_change_consumer('late', from_latest=True)
+    assert db.get_changes('late').empty
+
+    db.ack_changes('erp', 4)
+    db.ack_changes('crm', 2)
+    assert db.compact_change_log(batch_size=1) == 2
+    assert db.get_changes('crm')['id'].tolist() == [3, 4, 5]
+
+    consumers = db.get_change_consumers().set_index('consumer')
+    assert consumers.loc['erp', 'pending'] == 1
+
+    db.unregister_change_consumer('crm')
+    db.unregister_change_consumer('late')
+    assert db.compact_change_log() == 2
+    assert db.get_changes('erp')['id'].tolist() == [5]
@@ -0,0 +1,61 @@
+import io
+
+import pandas as pd
+import pytest
+from PIL import Image as PILImage
+
+from database import Database
+from logo_cache import LOGO_MAX_PIXELS, logo_cache, normalize_logo
+from template_pdf_generator import TemplatedInvoicePDFGenerator
+
+
+def _png(width, height):
+    output = io.BytesIO()
+    PILImage.new('RGBA', (width, height), (200, 30, 30, 255)).save(output, format='PNG')
+    return output.getvalue()
+
+
+def test_normalize_logo():
+    normalized = PILImage.open(io.BytesIO(normalize_logo(_png(2400, 1200))))
+    assert normalized.format == 'PNG'
+    assert normalized.size == (LOGO_MAX_PIXELS, LOGO_MAX_PIXELS // 2)
+
+    with pytest.raises(ValueError):
+        normalize_logo(b"bukan gambar")
+
+
+def test_logo_stored_and_decoded_once(tmp_path):
+    """Logo di-decode sekali per versi lalu dipakai ulang untuk semua render"""
+    db = Database(str(tmp_path / "logo.db"))
+    assert db.get_company_settings()['logo'] is None
+
+    assert db.update_company_logo(normalize_logo(_png(600, 300)))['success']
+    settings = db.get_company_settings()
+    assert settings['logo_version']
+    assert settings['invoice_template'] == 'classic'
+
+    generator = TemplatedInvoicePDFGenerator(metrics=None)
+    invoice_data = {
+        'invoice_number': 'INV-20250101-0001', 'issue_date': '2025-01-01', 'due_date': '2025-01-31',
+        'customer_name': 'PT Maju', 'subtotal': 25000, 'tax_rate': 0.11, 'tax_amount': 2750, 'total': 27750,
+        'notes': '', 'status': 'Draft'
+    }
+    items_data = pd.DataFrame([{'product_name': 'Kopi', 'quantity': 1, 'unit_price': 25000, 'total_price': 25000}])
+
+    decodes = logo_cache.decodes
+    for template in ('classic', 'classic', 'creative'):
+        pdf_data = generator.create_invoice_pdf(invoice_data, items_data, settings, template)
+        assert b'/Subtype /Image' in pdf_data
+    assert logo_cache.decodes == decodes + 1
+
+    # A new logo gets a new version, so it is decoded again
+    db.update_company_logo(normalize_logo(_png(300, 300)))
+    new_settings = db.get_company_settings()
+    assert new_settings['logo_version'] != settings['logo_version']
+    generator.create_invoice_pdf(invoice_data, items_data, new_settings, 'classic')
+    assert logo_cache.decodes == decodes + 2
+
+    assert db.update_company_logo(None)['success']
+    assert db.get_company_settings()['logo'] is None
+    pdf_data = generator.create_invoice_pdf(invoice_data, items_data, db.get_company_settings(), 'modern')
+    assert b'/Subtype /Image' not in pdf_data
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from database import Database
+from email_dispatcher import EmailDispatcher, RateLimiter
+from smtp_debug_server import SMTPDebugServer, start_in_thread
+
+
+@pytest.fixture
+def smtp_server():
+    server = SMTPDebugServer(port=0)
+    stop = start_in_thread(server)
+    yield server
+    stop()
+
+
+def _invoices(db, emails):
+    db.update_company_settings("CV Maju", "Bandung", "022-555", "tagihan@maju.co.id")
+    item = [{'product_name': 'Kopi', 'quantity': 2, 'unit_price': 25000}]
+    invoice_ids = []
+    for number, email in enumerate(emails):
+        customer_id = db.add_customer(f"Customer {number}", email)
+        invoice_ids.append(db.create_invoice(customer_id, item, '2025-03-01', '2025-03-31')[0])
+    return invoice_ids
+
+
+def test_dispatch_reuses_pooled_connections(tmp_path, smtp_server):
+    """Banyak invoice terkirim lewat beberapa koneksi SMTP yang dipakai ulang"""
+    db = Database(str(tmp_path / "email.db"))
+    invoice_ids = _invoices(db, [f"c{number}@example.com" for number in range(8)] + [""])
+
+    dispatcher = EmailDispatcher(db, '127.0.0.1', smtp_server.port, pool_size=2, rate_per_second=0)
+    outcome = dispatcher.dispatch(invoice_ids)
+    dispatcher.close()
+
+    assert outcome['success']
+    assert (outcome['sent'], outcome['failed'], outcome['skipped']) == (8, 0, 1)
+    assert outcome['messages_per_second'] > 0
+    assert smtp_server.connections == 2
+
+    message = smtp_server.parsed_messages()[0]
+    assert message['From'].addresses[0].addr_spec == "tagihan@maju.co.id"
+    attachment, = message.iter_attachments()
+    assert attachment.get_content_type() == 'application/pdf'
+    assert attachment.get_content().startswith(b'%PDF')
+
+    log_df = db.get_email_log(limit=20)
+    assert sorted(log_df['status']) == ['sent'] * 8 + ['skipped']
+
+    # Sent invoices are skipped on the next run unless a resend is requested
+    again = EmailDispatcher(db, '127.0.0.1', smtp_server.port, rate_per_second=0).dispatch(invoice_ids[:3])
+    assert (again['sent'], again['skipped']) == (0, 3)
+    resent = EmailDispatcher(db, '127.0.0.1', smtp_server.port, rate_per_second=0).dispatch(
+        invoice_ids[:1], resend=True, pdfs={invoice_ids[0]: b'%PDF-1.4 cached'})
+    assert resent['sent'] == 1
+    assert smtp_server.parsed_messages()[-1].get_payload()[1].get_content() == b'%PDF-1.4 cached'
+
+
+def test_dispatch_retries_transient_and_fails_permanent_errors(tmp_path, smtp_server):
+    db = Database(str(tmp_path / "email.db"))
+    invoice_ids = _invoices(db, ["ok@example.com", "hilang@example.com"])
+    smtp_server.defer_messages = 1
+    smtp_server.reject_recipients = {"hilang@example.com"}
+
+    dispatcher = EmailDispatcher(db, '127.0.0.1', smtp_server.port, pool_size=1,
+                                 rate_per_second=0, retry_delay=0.01)
+    outcome = dispatcher.dispatch(invoice_ids)
+    dispatcher.close()
+
+    results = {result['recipient']: result for result in outcome['results']}
+    assert not outcome['success']
+    assert results['ok@example.com']['status'] == 'sent'
+    assert results['ok@example.com']['attempts'] == 2
+    assert results['hilang@example.com']['status'] == 'failed'
+    assert results['hilang@example.com']['attempts'] == 1
+    assert '550' in results['hilang@example.com']['error']
+
+
+def test_rate_limiter_spaces_messages():
+    limiter = RateLimiter(50, burst=1)
+    started = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    assert time.monotonic() - started >= 0.09
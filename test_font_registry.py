@@ -0,0 +1,33 @@
+import os
+
+import pandas as pd
+
+from font_registry import BASE14_FAMILY, find_font_file, get_font_family
+from template_pdf_generator import TemplatedInvoicePDFGenerator
+
+
+def test_font_family_registered_once():
+    family = get_font_family('auto')
+    assert family.embedded
+    assert get_font_family('auto') is family
+    assert get_font_family('Helvetica') is BASE14_FAMILY
+
+
+def test_pdf_embeds_font_subset():
+    """Karakter di luar Latin-1 dirender dengan font TrueType yang di-subset"""
+    family = get_font_family('Vera')
+    generator = TemplatedInvoicePDFGenerator(metrics=None, font_family=family)
+    invoice_data = {
+        'invoice_number': 'INV-20250101-0001', 'issue_date': '2025-01-01', 'due_date': '2025-01-31',
+        'customer_name': 'Toko Šukses — Ibu Siti', 'customer_address': 'Jl. Merdeka № 17',
+        'subtotal': 25000, 'tax_rate': 0.11, 'tax_amount': 2750, 'total': 27750, 'notes': '', 'status': 'Draft'
+    }
+    items_data = pd.DataFrame([{'product_name': 'Kopi', 'quantity': 1, 'unit_price': 25000, 'total_price': 25000}])
+
+    pdf_data = generator.create_invoice_pdf(invoice_data, items_data, None, 'classic')
+
+    assert b'/FontFile2' in pdf_data
+    assert b'Vera' in pdf_data
+    # Only used glyphs are embedded, so the PDF is smaller than the font files themselves
+    full_fonts = os.path.getsize(find_font_file('Vera.ttf')) + os.path.getsize(find_font_file('VeraBd.ttf'))
+    assert len(pdf_data) < full_fonts
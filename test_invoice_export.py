@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test untuk bulk export invoice PDF ke ZIP
+"""
+
+import io
+import sqlite3
+import zipfile
+
+from database import Database
+from invoice_export import build_invoice_zip, iter_invoice_zip
+from template_pdf_generator import TemplatedInvoicePDFGenerator
+
+
+def _make_db(tmp_path):
+    db = Database(str(tmp_path / "export_test.db"))
+    andi = db.add_customer("Andi", "andi@example.com")
+    budi = db.add_customer("Budi", "budi@example.com")
+    items = [{'product_name': 'Kopi', 'quantity': 2, 'unit_price': 25000}]
+    db.create_invoice(andi, items, '2025-01-10', '2025-02-09')
+    db.create_invoice(budi, items, '2025-01-20', '2025-02-19', notes="kedua")
+    return db, andi
+
+
+def test_zip_contains_filtered_invoices(tmp_path):
+    """ZIP hanya berisi invoice yang sesuai filter customer"""
+    db, andi = _make_db(tmp_path)
+    spool, count = build_invoice_zip(db, TemplatedInvoicePDFGenerator(), customer_id=andi)
+
+    assert count == 1
+    with zipfile.ZipFile(spool) as archive:
+        names = archive.namelist()
+        assert len(names) == 1
+        assert archive.read(names[0]).startswith(b'%PDF')
+
+
+def test_stream_yields_before_archive_is_complete(tmp_path):
+    """Byte ZIP sudah keluar sebelum invoice terakhir dirender"""
+    db, _ = _make_db(tmp_path)
+    invoices_df = db.get_invoices()
+    chunks = list(iter_invoice_zip(db, TemplatedInvoicePDFGenerator(), invoices_df))
+
+    # One chunk per rendered invoice plus the central directory
+    assert len(chunks) == len(invoices_df) + 1
+    with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+        assert archive.testzip() is None
+        assert len(archive.namelist()) == 2
+
+
+def test_zip_respects_date_window(tmp_path):
+    """Invoice di luar rentang tanggal tidak ikut diexport"""
+    db, _ = _make_db(tmp_path)
+    spool, count = build_invoice_zip(db, TemplatedInvoicePDFGenerator(),
+                                     start_date='2025-01-15', end_date='2025-01-31')
+
+    assert count == 1
+    with zipfile.ZipFile(spool) as archive:
+        assert len(archive.namelist()) == 1
+
+
+def test_zip_respects_status_filter(tmp_path):
+    """Filter status yang tidak cocok menghasilkan ZIP kosong"""
+    db, _ = _make_db(tmp_path)
+    assert db.get_invoice_statuses() == ['Draft']
+
+    spool, count = build_invoice_zip(db, TemplatedInvoicePDFGenerator(), status='Paid')
+    assert count == 0
+    with zipfile.ZipFile(spool) as archive:
+        assert archive.namelist() == []
+
+    _, count = build_invoice_zip(db, TemplatedInvoicePDFGenerator(), status='Draft')
+    assert count == 2
+
+
+def test_count_excludes_skipped_invoices(tmp_path):
+    """Jumlah invoice hanya menghitung PDF yang benar-benar ditulis"""
+    db, _ = _make_db(tmp_path)
+    invoices_df = db.get_invoices()
+
+    conn = sqlite3.connect(db.db_name)
+    conn.execute("DELETE FROM invoices WHERE id = ?", (int(invoices_df['id'].iloc[0]),))
+    conn.commit()
+    conn.close()
+
+    stream = iter_invoice_zip(db, TemplatedInvoicePDFGenerator(), invoices_df)
+    chunks = []
+    while True:
+        try:
+            chunks.append(next(stream))
+        except StopIteration as finished:
+            assert finished.value == 1
+            break
+    with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+        assert len(archive.namelist()) == 1
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Test untuk perubahan status invoice massal
+"""
+
+from database import Database
+
+
+def _make_db(tmp_path):
+    db = Database(str(tmp_path / "status_test.db"))
+    customer_id = db.add_customer("Andi")
+    item = [{'product_name': 'Jasa', 'quantity': 1, 'unit_price': 100000}]
+    ids = [db.create_invoice(customer_id, item, f'2025-01-{day:02d}', '2025-02-28')[0] for day in (5, 15, 25)]
+    return db, ids
+
+
+def test_bulk_update_by_ids_respects_transitions(tmp_path):
+    """Invoice terpilih diubah sekaligus; transisi yang tidak valid dilewati"""
+    db, ids = _make_db(tmp_path)
+
+    result = db.bulk_update_invoice_status('Paid', invoice_ids=ids[:2])
+    assert result['success'] and result['updated'] == 2
+
+    # Paid -> Draft is not an allowed transition
+    result = db.bulk_update_invoice_status('Draft', invoice_ids=ids)
+    assert not result['success']
+    assert result['skipped'] == 3
+    assert db.get_invoice_status_counts() == {'Draft': 1, 'Paid': 2}
+
+    assert not db.bulk_update_invoice_status('Lunas', invoice_ids=ids)['success']
+    assert db.update_invoice_status(ids[2], 'Cancelled')['success']
+
+
+def test_bulk_update_by_filter(tmp_path):
+    """Invoice yang cocok dengan filter tanggal dan status diubah dalam satu UPDATE"""
+    db, ids = _make_db(tmp_path)
+    db.update_invoice_status(ids[0], 'Sent')
+
+    result = db.bulk_update_invoice_status('Paid', start_date='2025-01-10', end_date='2025-01-31', status='Draft')
+    assert result['updated'] == 2
+    assert db.get_invoice_status_counts() == {'Paid': 2, 'Sent': 1}
+
+    result = db.bulk_update_invoice_status('Paid', start_date='2026-01-01')
+    assert not result['success'] and result['updated'] == 0
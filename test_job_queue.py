@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test untuk background job (job_queue.py)
+"""
+
+import os
+import sqlite3
+import zipfile
+
+from database import Database
+from job_queue import JobManager, run_job
+
+
+def _make_db(tmp_path):
+    db = Database(str(tmp_path / "job_test.db"))
+    customer_id = db.add_customer("Andi", "andi@example.com")
+    items = [{'product_name': 'Kopi', 'quantity': 2, 'unit_price': 25000}]
+    invoice_id, _ = db.create_invoice(customer_id, items, '2025-01-10', '2025-02-09')
+    return db, invoice_id
+
+
+def _age_job(db, job_id, seconds):
+    conn = sqlite3.connect(db.db_name)
+    conn.execute("UPDATE jobs SET updated_at = datetime('now', ?), created_at = datetime('now', ?) WHERE id = ?",
+                 (f'-{seconds} seconds', f'-{seconds} seconds', job_id))
+    conn.commit()
+    conn.close()
+
+
+def test_run_job_renders_pdf(tmp_path):
+    """Job render yang sukses berstatus done dan file PDF-nya ada"""
+    db, invoice_id = _make_db(tmp_path)
+    job_id = db.create_job('render_invoice', {'invoice_id': invoice_id}, owner='sesi-a')
+
+    run_job(db.db_name, job_id, str(tmp_path))
+
+    job = db.get_job(job_id)
+    assert job['status'] == 'done'
+    assert job['progress'] == job['total'] == 1
+    with open(job['result_path'], 'rb') as f:
+        assert f.read().startswith(b'%PDF')
+
+
+def test_run_job_export_zip(tmp_path):
+    """Job export ZIP menghasilkan arsip berisi PDF invoice"""
+    db, _ = _make_db(tmp_path)
+    job_id = db.create_job('export_zip', {})
+
+    run_job(db.db_name, job_id, str(tmp_path))
+
+    job = db.get_job(job_id)
+    assert job['status'] == 'done'
+    with zipfile.ZipFile(job['result_path']) as archive:
+        assert len(archive.namelist()) == 1
+
+
+def test_failed_job_records_error_and_leaves_no_file(tmp_path):
+    """Job yang gagal berstatus failed, menyimpan error, dan tidak meninggalkan file"""
+    db, _ = _make_db(tmp_path)
+    job_id = db.create_job('render_invoice', {'invoice_id': 9999})
+
+    run_job(db.db_name, job_id, str(tmp_path))
+
+    job = db.get_job(job_id)
+    assert job['status'] == 'failed'
+    assert '9999' in job['error']
+    assert job['result_path'] is None
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(job_id)]
+
+
+def test_claim_job_only_once(tmp_path):
+    """Job yang sudah diklaim tidak bisa diklaim worker lain"""
+    db, invoice_id = _make_db(tmp_path)
+    job_id = db.create_job('render_invoice', {'invoice_id': invoice_id})
+
+    assert db.claim_job(job_id) is True
+    assert db.claim_job(job_id) is False
+
+    # A second worker picking up the same job leaves it untouched
+    run_job(db.db_name, job_id, str(tmp_path))
+    assert db.get_job(job_id)['status'] == 'running'
+
+
+def test_only_stale_jobs_are_requeued(tmp_path):
+    """Hanya job yang lama tidak ada update yang dijalankan ulang"""
+    db, invoice_id = _make_db(tmp_path)
+    stale_id = db.create_job('render_invoice', {'invoice_id': invoice_id})
+    fresh_id = db.create_job('render_invoice', {'invoice_id': invoice_id})
+    db.claim_job(stale_id)
+    db.claim_job(fresh_id)
+    _age_job(db, stale_id, 600)
+
+    assert db.requeue_interrupted_jobs(stale_seconds=300) == [stale_id]
+    assert db.get_job(stale_id)['status'] == 'queued'
+    assert db.get_job(fresh_id)['status'] == 'running'
+
+
+def test_manager_restart_finishes_interrupted_job(tmp_path):
+    """Manager baru menyelesaikan job yang terputus, tanpa menyentuh job yang masih aktif"""
+    db, invoice_id = _make_db(tmp_path)
+    stale_id = db.create_job('render_invoice', {'invoice_id': invoice_id})
+    fresh_id = db.create_job('render_invoice', {'invoice_id': invoice_id})
+    db.claim_job(stale_id)
+    db.claim_job(fresh_id)
+    _age_job(db, stale_id, 600)
+
+    manager = JobManager(db.db_name, output_dir=str(tmp_path / "out"))
+    manager.shutdown()
+
+    assert db.get_job(stale_id)['status'] == 'done'
+    assert db.get_job(fresh_id)['status'] == 'running'
+    assert manager.is_stale(db.get_job(fresh_id)) is False
+
+
+def test_jobs_are_scoped_to_owner(tmp_path):
+    """Job sesi lain tidak terlihat dan tidak bisa dibuka"""
+    db, invoice_id = _make_db(tmp_path)
+    manager = JobManager(db.db_name, output_dir=str(tmp_path / "out"))
+    job_id = manager.submit('render_invoice', {'invoice_id': invoice_id}, owner='sesi-a')
+    manager.shutdown()
+
+    assert manager.get_job(job_id, owner='sesi-a')['status'] == 'done'
+    assert manager.get_job(job_id, owner='sesi-b') is None
+    assert len(manager.get_recent_jobs(owner='sesi-a')) == 1
+    assert len(manager.get_recent_jobs(owner='sesi-b')) == 0
+
+
+def test_retention_removes_old_jobs_and_files(tmp_path):
+    """Job lama dan file hasilnya dihapus oleh maintenance"""
+    db, invoice_id = _make_db(tmp_path)
+    old_id = db.create_job('render_invoice', {'invoice_id': invoice_id})
+    run_job(db.db_name, old_id, str(tmp_path))
+    old_path = db.get_job(old_id)['result_path']
+    _age_job(db, old_id, 10 * 86400)
+
+    recent_id = db.create_job('render_invoice', {'invoice_id': invoice_id})
+    run_job(db.db_name, recent_id, str(tmp_path))
+
+    manager = JobManager(db.db_name, output_dir=str(tmp_path / "out"), retention_days=7)
+    manager.shutdown()
+
+    assert db.get_job(old_id) is None
+    assert not os.path.exists(old_path)
+    assert db.get_job(recent_id)['status'] == 'done'
+    assert os.path.exists(db.get_job(recent_id)['result_path'])
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test untuk penyimpanan uang dalam Rupiah bulat (money.py)
+"""
+
+import sqlite3
+
+from database import Database
+from money import compute_tax, invoice_totals, to_rupiah
+
+
+def test_tax_is_exact_integer():
+    """Pajak dihitung eksak dan dibulatkan setengah ke atas"""
+    assert to_rupiah(1234.5) == 1235
+    assert compute_tax(1_000_000, 0.11) == 110_000
+    assert compute_tax(5, 0.11) == 1  # 0.55 -> 1
+    assert invoice_totals([{'quantity': 3, 'unit_price': 33333.3}], 0.11) == (99999, 11000, 110999)
+
+
+def test_sales_summary_sums_exactly(tmp_path):
+    """SUM laporan berupa integer eksak, bukan float yang bergeser"""
+    db = Database(str(tmp_path / "money_test.db"))
+    customer_id = db.add_customer("Andi")
+    items = [{'product_name': 'Pulsa', 'quantity': 1, 'unit_price': 0.1}]
+    for _ in range(10):
+        db.create_invoice(customer_id, [{'product_name': 'Kopi', 'quantity': 3, 'unit_price': 10000.4}],
+                          '2025-01-10', '2025-02-09', tax_rate=0.11)
+    db.create_invoice(customer_id, items, '2025-01-10', '2025-02-09', tax_rate=0)
+
+    summary = db.get_sales_summary()
+    assert summary['total_sales'].dtype.kind == 'i'
+    assert int(summary['total_sales'].sum()) == 10 * (30000 + 3300)
+    assert int(summary['total_tax'].sum()) == 33000
+
+
+def test_migrates_real_columns_to_integer(tmp_path):
+    """Database lama dengan kolom REAL dikonversi ke INTEGER Rupiah"""
+    db_name = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_name)
+    conn.executescript('''
+        CREATE TABLE invoices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            invoice_number TEXT UNIQUE NOT NULL,
+            customer_id INTEGER,
+            issue_date DATE,
+            due_date DATE,
+            subtotal REAL,
+            tax_rate REAL DEFAULT 0,
+            tax_amount REAL,
+            total REAL,
+            status TEXT DEFAULT 'Draft',
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE invoice_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            invoice_id INTEGER,
+            product_name TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price REAL NOT NULL,
+            total_price REAL NOT NULL
+        );
+        INSERT INTO invoices (invoice_number, subtotal, tax_rate, tax_amount, total)
+        VALUES ('INV-LAMA-1', 30001.2, 0.11, 3300.132, 33301.332);
+        INSERT INTO invoice_items (invoice_id, product_name, quantity, unit_price, total_price)
+        VALUES (1, 'Kopi', 3, 10000.4, 30001.2);
+    ''')
+    conn.close()
+
+    db = Database(db_name)
+
+    conn = sqlite3.connect(db_name)
+    types = {row[1]: row[2] for row in conn.execute('PRAGMA table_info(invoices)')}
+    assert types['total'] == 'INTEGER' and types['tax_rate'] == 'REAL'
+    assert conn.execute('SELECT subtotal, tax_amount, total FROM invoices').fetchone() == (30001, 3300, 33301)
+    assert conn.execute('SELECT unit_price, total_price FROM invoice_items').fetchone() == (10000, 30001)
+    conn.close()
+
+    invoice_data, items_data = db.get_invoice_details(1)
+    assert invoice_data['invoice_number'] == 'INV-LAMA-1'
+    assert len(items_data) == 1
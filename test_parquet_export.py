@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from database import Database
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+from parquet_export import export_parquet, read_export_state  # noqa: E402
+
+
+def test_export_appends_only_new_rows_per_month_partition(tmp_path):
+    """Export kedua hanya menulis invoice baru ke partisi tahun/bulan"""
+    db = Database(str(tmp_path / "export.db"))
+    customer_id = db.add_customer("PT Maju")
+    items = [{'product_name': 'Kopi', 'quantity': 2, 'unit_price': 25000},
+             {'product_name': 'Teh', 'quantity': 1, 'unit_price': 15000}]
+    for issue_date in ('2025-01-10', '2025-01-20', '2025-02-05'):
+        db.create_invoice(customer_id, items, issue_date, '2025-03-31')
+
+    out_dir = str(tmp_path / "lake")
+    first = export_parquet(db.db_name, out_dir, batch_rows=1)
+    assert first['success']
+    assert first['rows'] == {'invoices': 3, 'invoice_items': 6}
+    assert sorted(os.path.relpath(path, out_dir) for path in first['files']) == [
+        os.path.join('invoice_items', 'year=2025', 'month=01', 'part-000001.parquet'),
+        os.path.join('invoice_items', 'year=2025', 'month=02', 'part-000001.parquet'),
+        os.path.join('invoices', 'year=2025', 'month=01', 'part-000001.parquet'),
+        os.path.join('invoices', 'year=2025', 'month=02', 'part-000001.parquet'),
+    ]
+    # One row group per fetched batch keeps memory bounded
+    assert pq.ParquetFile(first['files'][0]).metadata.num_row_groups == 2
+
+    assert export_parquet(db.db_name, out_dir)['files'] == []
+
+    db.create_invoice(customer_id, items[:1], '2025-02-15', '2025-03-31')
+    second = export_parquet(db.db_name, out_dir)
+    assert second['rows'] == {'invoices': 1, 'invoice_items': 1}
+    assert read_export_state(out_dir)['tables']['invoices']['max_id'] == 4
+
+    invoices = pq.read_table(os.path.join(out_dir, 'invoices')).to_pandas()
+    assert sorted(invoices['id']) == [1, 2, 3, 4]
+    assert invoices['subtotal'].sum() == 3 * 65000 + 50000
+    assert str(invoices.loc[invoices['id'] == 4, 'issue_date'].iloc[0]) == '2025-02-15'
+    assert list(invoices.loc[invoices['id'] == 4, 'month'].astype(str)) == ['2']
+
+    invoice_items = pq.read_table(os.path.join(out_dir, 'invoice_items')).to_pandas()
+    assert len(invoice_items) == 7
+    assert not any(name.startswith('.') for _, _, files in os.walk(out_dir) for name in files)
@@ -0,0 +1,34 @@
+import pytest
+
+from pdf_size_benchmark import SAMPLE_COMPANY, sample_invoices
+from template_pdf_generator import TemplatedInvoicePDFGenerator
+
+
+def test_compact_profile_is_smaller_and_deterministic():
+    """Profil compact: tanpa font tertanam untuk teks WinAnsi, tanpa tanggal, byte identik"""
+    generator = TemplatedInvoicePDFGenerator(metrics=None)
+    (invoice_data, items_data), = sample_invoices(1, 10)
+
+    default_pdf = generator.create_invoice_pdf(invoice_data, items_data, SAMPLE_COMPANY, 'modern')
+    compact_pdf = generator.create_invoice_pdf(invoice_data, items_data, SAMPLE_COMPANY, 'modern', profile='compact')
+
+    assert len(compact_pdf) < len(default_pdf) / 4
+    assert b'/FontFile2' not in compact_pdf
+    assert b'/CreationDate' not in compact_pdf
+    assert b'/Producer' not in compact_pdf
+    assert generator.create_invoice_pdf(invoice_data, items_data, SAMPLE_COMPANY, 'modern',
+                                        profile='compact') == compact_pdf
+
+    # The default profile keeps its embedded fonts after a compact render
+    assert b'/FontFile2' in generator.create_invoice_pdf(invoice_data, items_data, SAMPLE_COMPANY, 'modern')
+
+
+def test_compact_profile_embeds_fonts_for_non_winansi_text():
+    generator = TemplatedInvoicePDFGenerator(metrics=None, profile='compact')
+    (invoice_data, items_data), = sample_invoices(1, 3, unicode_text=True)
+
+    pdf_data = generator.create_invoice_pdf(invoice_data, items_data, SAMPLE_COMPANY, 'classic')
+    assert b'/FontFile2' in pdf_data
+
+    with pytest.raises(ValueError):
+        TemplatedInvoicePDFGenerator(profile='tiny')
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Test untuk laporan analisis produk
+"""
+
+from database import Database
+
+
+def test_product_sales_groups_by_product(tmp_path):
+    """Pendapatan, jumlah, dan invoice dihitung per produk dalam rentang tanggal"""
+    db = Database(str(tmp_path / "analytics_test.db"))
+    kopi_id = db.add_product("Kopi", 20000)['product_id']
+    customer_id = db.add_customer("Andi")
+    db.create_invoice(customer_id, [
+        {'product_name': 'Kopi', 'quantity': 2, 'unit_price': 20000},
+        {'product_name': 'Ongkir', 'quantity': 1, 'unit_price': 10000},
+    ], '2025-01-10', '2025-02-09')
+    db.create_invoice(customer_id, [{'product_name': 'Kopi', 'quantity': 1, 'unit_price': 23000}],
+                      '2025-02-05', '2025-03-07')
+    db.create_invoice(customer_id, [{'product_name': 'Kopi', 'quantity': 9, 'unit_price': 20000}],
+                      '2025-04-01', '2025-05-01')
+
+    # Renaming the product still groups its items together under the new name
+    db.update_product(kopi_id, "Kopi Arabika", 21000)
+    sales = db.get_product_sales('2025-01-01', '2025-02-28')
+
+    assert list(sales['product_name']) == ['Kopi Arabika', 'Ongkir']
+    kopi = sales.iloc[0]
+    assert (kopi['revenue'], kopi['quantity'], kopi['invoice_count'], kopi['avg_price']) == (63000, 3, 2, 21000)
+
+    monthly = db.get_product_sales_by_month('2025-01-01', '2025-02-28', [kopi_id])
+    assert list(monthly['month']) == ['2025-01', '2025-02']
+    assert list(monthly['revenue']) == [40000, 23000]
+
+
+def test_invoice_version_changes_with_invoices(tmp_path):
+    """Versi tabel invoice naik saat invoice dibuat sehingga cache laporan diperbarui"""
+    db = Database(str(tmp_path / "analytics_version.db"))
+    before = db.get_table_version('invoices')
+    db.create_invoice(db.add_customer("Budi"), [{'product_name': 'Teh', 'quantity': 1, 'unit_price': 5000}],
+                      '2025-01-10', '2025-02-09')
+    assert db.get_table_version('invoices') > before
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Test untuk index pencarian produk (product_index.py)
+"""
+
+from database import Database
+from product_index import ProductIndex
+
+
+def test_search_prefix_then_substring(tmp_path):
+    """Pencarian mengutamakan prefix lalu substring, harga dicari per ID"""
+    db = Database(str(tmp_path / "index_test.db"))
+    for name, price in [("Kopi Susu", 18000), ("Kopi Hitam", 15000), ("Es Kopi", 20000), ("Teh Manis", 8000)]:
+        db.add_product(name, price)
+    index = ProductIndex(db.get_products())
+
+    names = [index.get(product_id)['name'] for product_id in index.search("kopi")]
+    assert names == ["Kopi Hitam", "Kopi Susu", "Es Kopi"]
+    assert [index.get(product_id)['name'] for product_id in index.search("ko")] == ["Kopi Hitam", "Kopi Susu"]
+    assert index.search("susu teh") == []
+    assert len(index.search("", limit=2)) == 2
+
+    teh_id = index.search("manis")[0]
+    assert index.get(teh_id)['price'] == 8000
+    assert index.display_name(teh_id) == "Teh Manis - Rp 8,000"
+
+
+def test_products_version_changes_on_write(tmp_path):
+    """Versi tabel produk naik setiap ada perubahan sehingga index dibangun ulang"""
+    db = Database(str(tmp_path / "index_version.db"))
+    start = db.get_table_version('products')
+
+    product_id = db.add_product("Gula", 14000)['product_id']
+    db.update_product(product_id, "Gula Pasir", 15000)
+    db.delete_product(product_id)
+
+    assert db.get_table_version('products') == start + 3
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test untuk relasi product_id pada invoice_items
+"""
+
+import sqlite3
+
+import pandas as pd
+
+from database import Database
+
+
+def test_backfill_links_existing_items_by_name(tmp_path):
+    """Item lama dihubungkan ke produk berdasarkan nama saat migrasi"""
+    db_name = str(tmp_path / "link_test.db")
+    db = Database(db_name)
+    kopi_id = db.add_product("Kopi", 25000)['product_id']
+    customer_id = db.add_customer("Andi")
+    invoice_id, _ = db.create_invoice(customer_id, [
+        {'product_name': 'kopi', 'quantity': 1, 'unit_price': 25000},
+        {'product_name': 'Jasa Antar', 'quantity': 1, 'unit_price': 5000},
+    ], '2025-01-10', '2025-02-09')
+
+    # Simulate a database from before the product_id column was filled
+    conn = sqlite3.connect(db_name)
+    conn.execute("UPDATE invoice_items SET product_id = NULL")
+    conn.execute("DELETE FROM schema_meta WHERE key = 'invoice_items_product_id_backfilled'")
+    conn.commit()
+    conn.close()
+
+    Database(db_name)
+    _, items_df = db.get_invoice_details(invoice_id)
+    linked = dict(zip(items_df['product_name'], items_df['product_id']))
+    assert linked['kopi'] == kopi_id
+    assert pd.isna(linked['Jasa Antar'])
+
+
+def test_renamed_product_stays_linked(tmp_path):
+    """Produk yang diganti nama tetap tidak bisa dihapus jika sudah dipakai"""
+    db = Database(str(tmp_path / "rename_test.db"))
+    product_id = db.add_product("Teh", 8000)['product_id']
+    customer_id = db.add_customer("Budi")
+    db.create_invoice(customer_id, [{'product_name': 'Teh', 'quantity': 2, 'unit_price': 8000,
+                                     'product_id': product_id}], '2025-01-10', '2025-02-09')
+
+    db.update_product(product_id, "Teh Melati", 9000)
+    result = db.delete_product(product_id)
+    assert not result['success']
+    assert "1 invoice" in result['message']
+
+    unused_id = db.add_product("Gula", 14000)['product_id']
+    assert db.delete_product(unused_id)['success']
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Test untuk instrumentasi query dan slow-query log (query_metrics.py)
+"""
+
+import query_metrics
+from database import Database
+
+
+def test_queries_are_timed_per_method_and_slow_ones_logged(tmp_path, monkeypatch):
+    """Latensi dan jumlah baris tercatat per method; query lambat masuk log dengan query plan"""
+    db = Database(str(tmp_path / "metrics_test.db"))
+    for name in ("Andi", "Budi", "Citra"):
+        db.add_customer(name)
+
+    query_metrics.query_stats.reset()
+    monkeypatch.setattr(query_metrics.InstrumentedConnection, 'slow_query_ms', 0.0)
+
+    assert len(db.get_customers()) == 3
+    db.get_invoice_statuses()
+
+    summary = {row['method']: row for row in query_metrics.query_stats.summary()}
+    assert summary['get_customers']['calls'] == 1
+    assert summary['get_customers']['avg_rows'] == 3
+    assert sum(count for _, count in query_metrics.query_stats.histogram('get_customers')) == 1
+    assert 'get_invoice_statuses' in summary
+
+    slow = query_metrics.read_slow_queries(db.db_name)
+    methods = {entry['method'] for entry in slow}
+    assert {'get_customers', 'get_invoice_statuses'} <= methods
+    statuses_entry = next(entry for entry in slow if entry['method'] == 'get_invoice_statuses')
+    assert statuses_entry['sql'].startswith('SELECT DISTINCT status')
+    assert statuses_entry['plan']
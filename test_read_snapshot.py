@@ -0,0 +1,32 @@
+import sqlite3
+
+import pytest
+
+from database import Database
+
+
+def test_report_snapshot_does_not_block_writes(tmp_path):
+    """Koneksi laporan read-only melihat satu snapshot dan tidak menahan penulisan invoice"""
+    db = Database(str(tmp_path / "snapshot.db"))
+    customer_id = db.add_customer("PT Maju")
+    item = [{'product_name': 'Kopi', 'quantity': 1, 'unit_price': 10000}]
+    db.create_invoice(customer_id, item, '2025-03-01', '2025-03-31')
+
+    conn = db._connect_readonly()
+    cursor = conn.cursor()
+    assert cursor.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    cursor.execute('SELECT COUNT(*) FROM invoices')
+    assert cursor.fetchone()[0] == 1
+
+    # The writer commits while the snapshot is still open
+    db.create_invoice(customer_id, item, '2025-03-02', '2025-04-01')
+    cursor.execute('SELECT COUNT(*) FROM invoices')
+    assert cursor.fetchone()[0] == 1
+
+    with pytest.raises(sqlite3.OperationalError):
+        cursor.execute("DELETE FROM invoices")
+    conn.close()
+
+    assert len(db.get_invoices()) == 2
+    assert db.get_invoice_status_counts() == {'Draft': 2}
+    assert db.get_sales_summary()['invoice_count'].sum() == 2
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Test untuk hitung ulang total invoice massal (recalculation.py)
+"""
+
+import sqlite3
+
+from database import Database
+from recalculation import recalculate_invoices
+
+
+def test_recalculate_fixes_totals_and_applies_new_rate(tmp_path):
+    """Total item dan invoice dihitung ulang, tarif baru hanya untuk status terpilih"""
+    db = Database(str(tmp_path / "recalc_test.db"))
+    customer_id = db.add_customer("Andi")
+    items = [
+        {'product_name': 'Kopi', 'quantity': 2, 'unit_price': 25000},
+        {'product_name': 'Teh', 'quantity': 1, 'unit_price': 10000},
+    ]
+    draft_id, _ = db.create_invoice(customer_id, items, '2025-01-10', '2025-02-09', tax_rate=0.11)
+    paid_id, _ = db.create_invoice(customer_id, items, '2025-01-11', '2025-02-10', tax_rate=0.11)
+    empty_id, _ = db.create_invoice(customer_id, [], '2025-01-12', '2025-02-11', tax_rate=0.11)
+
+    conn = sqlite3.connect(db.db_name)
+    conn.execute("UPDATE invoice_items SET total_price = 1 WHERE invoice_id = ?", (draft_id,))
+    conn.execute("UPDATE invoices SET subtotal = 5, total = 5 WHERE id = ?", (empty_id,))
+    conn.execute("UPDATE invoices SET status = 'Paid' WHERE id = ?", (paid_id,))
+    conn.commit()
+    conn.close()
+
+    result = recalculate_invoices(db, chunk_size=2)
+    assert result['success']
+    assert result['items_updated'] == 2
+    assert result['invoices_updated'] == 1
+
+    invoice, items_df = db.get_invoice_details(draft_id)
+    assert list(items_df['total_price']) == [50000, 10000]
+    assert (invoice['subtotal'], invoice['tax_amount'], invoice['total']) == (60000, 6600, 66600)
+    assert db.get_invoice_details(empty_id)[0]['total'] == 0
+
+    result = recalculate_invoices(db, tax_rate=0.12, status='Draft')
+    assert result['invoices_updated'] == 2
+
+    invoice, _ = db.get_invoice_details(draft_id)
+    assert (invoice['tax_rate'], invoice['tax_amount'], invoice['total']) == (0.12, 7200, 67200)
+    assert db.get_invoice_details(paid_id)[0]['tax_amount'] == 6600
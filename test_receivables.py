@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Test untuk laporan umur piutang dan proyeksi arus kas
+"""
+
+import sqlite3
+
+from database import Database
+
+
+def test_aging_buckets_and_cash_flow(tmp_path):
+    """Piutang dikelompokkan per umur dan per minggu jatuh tempo"""
+    db = Database(str(tmp_path / "aging_test.db"))
+    andi = db.add_customer("Andi")
+    budi = db.add_customer("Budi")
+    item = [{'product_name': 'Jasa', 'quantity': 1, 'unit_price': 100000}]
+
+    db.create_invoice(andi, item, '2025-03-01', '2025-03-31', tax_rate=0)   # current
+    db.create_invoice(andi, item, '2025-02-01', '2025-03-05', tax_rate=0)   # 10 days overdue
+    db.create_invoice(budi, item, '2024-11-01', '2024-12-01', tax_rate=0)   # 104 days overdue
+    paid_id, _ = db.create_invoice(budi, item, '2025-01-01', '2025-01-31', tax_rate=0)
+
+    conn = sqlite3.connect(db.db_name)
+    conn.execute("UPDATE invoices SET status = 'Paid' WHERE id = ?", (paid_id,))
+    conn.commit()
+    conn.close()
+
+    aging = db.get_receivables_aging(as_of='2025-03-15').set_index('customer_name')
+    assert aging.loc['Andi', 'current'] == 100000
+    assert aging.loc['Andi', 'overdue_1_30'] == 100000
+    assert aging.loc['Budi', 'overdue_90_plus'] == 100000
+    assert aging.loc['Budi', 'invoice_count'] == 1
+    assert aging['total_outstanding'].sum() == 300000
+
+    # 2025-03-15 is a Saturday; 2025-03-31 falls in the week starting Monday 2025-03-31
+    cash_flow = db.get_cash_flow_forecast(weeks=4, as_of='2025-03-15')
+    assert list(cash_flow['week_start']) == ['2025-03-31']
+    assert list(cash_flow['amount_due']) == [100000]
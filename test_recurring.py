@@ -0,0 +1,53 @@
+import sqlite3
+
+from database import Database
+from recurring import generate_recurring_invoices
+
+
+def test_generate_due_schedules_in_one_batch(tmp_path):
+    """Jadwal yang jatuh tempo dibuatkan invoice, termasuk periode yang terlewat"""
+    db = Database(str(tmp_path / "recurring.db"))
+    customer_id = db.add_customer("PT Langganan")
+    product_id = db.add_product("Hosting", 150000)['product_id']
+    items = [{'product_name': 'hosting', 'quantity': 1, 'unit_price': 150000},
+             {'product_name': 'Domain', 'quantity': 2, 'unit_price': 12500}]
+
+    monthly = db.add_recurring_schedule(customer_id, items, '2025-01-31', tax_rate=0.11)['schedule_id']
+    ending = db.add_recurring_schedule(customer_id, items[:1], '2025-01-15', end_date='2025-02-20')['schedule_id']
+    db.add_recurring_schedule(customer_id, items, '2025-06-01')
+    paused = db.add_recurring_schedule(customer_id, items, '2025-01-01')['schedule_id']
+    db.set_recurring_schedule_active(paused, False)
+
+    # An invoice created normally in between keeps its own number
+    existing_id, _ = db.create_invoice(customer_id, items, '2025-01-02', '2025-02-01')
+
+    result = generate_recurring_invoices(db, as_of='2025-03-31')
+    assert result['success']
+    assert len(result['invoice_ids']) == 5
+    assert min(result['invoice_ids']) > existing_id
+
+    invoices_df = db.get_invoices_by_ids(result['invoice_ids'])
+    # Monthly dates are counted from the start date, so they do not drift after February
+    assert sorted(invoices_df['issue_date']) == [
+        '2025-01-15', '2025-01-31', '2025-02-15', '2025-02-28', '2025-03-31'
+    ]
+    assert all(number.endswith(f"{invoice_id:06d}")
+               for number, invoice_id in zip(invoices_df['invoice_number'], invoices_df['id']))
+
+    invoice_data, items_data = db.get_invoice_details(result['invoice_ids'][0])
+    assert invoice_data['subtotal'] == 175000
+    assert invoice_data['tax_amount'] == 19250
+    assert invoice_data['due_date'] == '2025-03-02'
+    assert set(items_data['product_id'].dropna()) == {product_id}
+
+    schedules = db.get_recurring_schedules().set_index('id')
+    assert schedules.loc[monthly, 'next_run_date'] == '2025-04-30'
+    assert schedules.loc[ending, 'active'] == 0
+
+    # Nothing is due twice
+    assert generate_recurring_invoices(db, as_of='2025-03-31')['invoice_ids'] == []
+
+    conn = sqlite3.connect(db.db_name)
+    assert conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'invoices'").fetchone()[0] == max(result['invoice_ids'])
+    conn.close()
+    assert db.create_invoice(customer_id, items, '2025-04-01', '2025-05-01')[0] == max(result['invoice_ids']) + 1
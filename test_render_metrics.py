@@ -0,0 +1,64 @@
+import pandas as pd
+
+from render_metrics import RenderStats, item_count_label
+from template_pdf_generator import TemplatedInvoicePDFGenerator
+
+
+def _invoice():
+    invoice_data = {
+        'invoice_number': 'INV-20250101-0001', 'issue_date': '2025-01-01', 'due_date': '2025-01-31',
+        'customer_name': 'PT Maju', 'customer_email': '', 'customer_phone': '', 'customer_address': '',
+        'subtotal': 30000, 'tax_rate': 0.11, 'tax_amount': 3300, 'total': 33300, 'notes': '', 'status': 'Draft'
+    }
+    items_data = pd.DataFrame([
+        {'product_name': f"Produk {i}", 'quantity': 1, 'unit_price': 1000, 'total_price': 1000}
+        for i in range(30)
+    ])
+    return invoice_data, items_data
+
+
+def test_item_count_label():
+    assert item_count_label(1) == "1-5"
+    assert item_count_label(6) == "6-20"
+    assert item_count_label(100) == "51-100"
+    assert item_count_label(101) == "100+"
+
+
+def test_generator_records_render_phases(tmp_path):
+    """Setiap render tercatat per fase dan diekspor sebagai histogram Prometheus"""
+    stats = RenderStats()
+    generator = TemplatedInvoicePDFGenerator(metrics=stats)
+    invoice_data, items_data = _invoice()
+
+    pdf_data = generator.create_invoice_pdf(invoice_data, items_data, None, 'modern')
+    generator.create_invoice_pdf(invoice_data, items_data, None, 'unknown')
+
+    render = generator.last_render
+    assert render['template'] == 'classic'
+    assert render['item_count'] == 30
+    assert all(render['phases'][phase] > 0 for phase in ('story', 'layout', 'serialize'))
+
+    summary = {row['template']: row for row in stats.summary()}
+    assert set(summary) == {'modern', 'classic'}
+    assert summary['modern']['renders'] == 1
+    assert summary['modern']['items'] == "21-50"
+    assert summary['modern']['avg_kb'] == round(len(pdf_data) / 1024, 1)
+
+    text = stats.prometheus_text()
+    assert '# TYPE invoice_pdf_render_seconds histogram' in text
+    assert 'invoice_pdf_render_seconds_bucket{template="modern",items="21-50",le="+Inf"} 1' in text
+    assert 'invoice_pdf_renders_total{template="classic",items="21-50"} 1' in text
+
+    metrics_path = tmp_path / "invoice_render.prom"
+    stats.write_prometheus_file(str(metrics_path))
+    assert metrics_path.read_text(encoding='utf-8') == text
+
+
+def test_metrics_file_written_on_record(tmp_path):
+    metrics_path = tmp_path / "invoice_render.prom"
+    stats = RenderStats(metrics_file=str(metrics_path), export_interval=0)
+    stats.record('classic', 3, {'story': 0.002, 'layout': 0.004, 'serialize': 0.001}, 3800)
+
+    text = metrics_path.read_text(encoding='utf-8')
+    assert 'invoice_pdf_size_bytes_bucket{template="classic",items="1-5",le="4096"} 1' in text
+    assert 'invoice_pdf_render_phase_seconds_sum{template="classic",items="1-5",phase="layout"} 0.004000' in text
@@ -0,0 +1,60 @@
+import pytest
+
+from tenancy import TenantRegistry, tenant_db_path
+
+
+def test_registry_evicts_least_recently_used_idle_tenants(tmp_path):
+    """Tenant terbuka dibatasi; yang paling lama tidak dipakai ditutup lebih dulu"""
+    registry = TenantRegistry(str(tmp_path), max_open=2)
+    for tenant_id in ('toko-a', 'toko-b', 'toko-c'):
+        assert registry.create_tenant(tenant_id)['success']
+    assert not registry.create_tenant('toko-a')['success']
+    assert not registry.create_tenant('../etc')['success']
+    assert registry.list_tenants() == ['toko-a', 'toko-b', 'toko-c']
+
+    with registry.tenant('toko-a') as tenant_a:
+        # Each tenant has its own company settings
+        tenant_a.db.update_company_settings("Toko A", "Bandung", "022-1", "a@example.com")
+        with registry.tenant('toko-b'):
+            pass
+        with registry.tenant('toko-c'):
+            # toko-a is still serving, so the idle toko-b is closed
+            assert registry.stats()['open'] == 2
+            assert registry.stats()['evicted'] == 1
+            with registry.tenant('toko-b') as tenant_b:
+                # All three in use: the cap is exceeded until one is released
+                assert registry.stats()['open'] == 3
+                assert tenant_b.company_settings()['name'] != "Toko A"
+        assert registry.stats()['open'] == 2
+
+    with registry.tenant('toko-a') as tenant:
+        assert tenant is tenant_a
+    assert registry.stats()['opened'] == 4
+
+    with pytest.raises(KeyError):
+        registry.acquire('toko-x')
+    with pytest.raises(ValueError):
+        registry.acquire('Toko A')
+    registry.close()
+    assert registry.stats()['open'] == 0
+
+
+def test_tenant_caches_follow_changes(tmp_path):
+    """Cache pengaturan dan index produk diperbarui saat datanya berubah"""
+    registry = TenantRegistry(str(tmp_path))
+    registry.create_tenant('toko-a')
+
+    with registry.tenant('toko-a') as tenant:
+        settings = tenant.company_settings()
+        assert tenant.company_settings() == settings
+        index = tenant.product_index()
+        assert tenant.product_index() is index
+
+        tenant.db.update_company_settings("Toko A", "Bandung", "022-1", "a@example.com")
+        tenant.db.add_product("Kopi Susu", 18000)
+        assert tenant.company_settings()['name'] == "Toko A"
+        index = tenant.product_index()
+        assert [index.get(product_id)['name'] for product_id in index.search("kopi")] == ["Kopi Susu"]
+        assert tenant.analytics() is tenant.db
+
+    assert tenant_db_path('toko-a', str(tmp_path)).endswith('toko-a.db')